@@ -4,7 +4,8 @@ CREATE TABLE IF NOT EXISTS APIs (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     name TEXT NOT NULL,
     url TEXT NOT NULL UNIQUE,
-    created_at DATETIME DEFAULT (datetime('now','-3 hours'))
+    created_at DATETIME DEFAULT (datetime('now','-3 hours')),
+    probe TEXT NOT NULL DEFAULT 'http'   -- http | head | tcp | tls | dns (ver core/checker.py)
 );
 
 CREATE TABLE IF NOT EXISTS logs (
@@ -15,6 +16,7 @@ CREATE TABLE IF NOT EXISTS logs (
     latency REAL,
     response TEXT,
     timestamp DATETIME DEFAULT (datetime('now','-3 hours')),
+    body_id INTEGER REFERENCES response_bodies(id),
     FOREIGN KEY (api_id) REFERENCES APIs(id) ON DELETE CASCADE
 );
 
@@ -25,6 +27,10 @@ CREATE TABLE IF NOT EXISTS api_state (
     last_latency REAL,
     last_checked_at DATETIME,
     last_alert_at DATETIME,
+    last_latency_bucket TEXT,
+    next_due_epoch REAL,   -- próximo check agendado por el runner (se retoma al reiniciar)
+    timeout_connect REAL,  -- timeouts adaptativos (core/timeouts.py); NULL = default
+    timeout_read REAL,
     FOREIGN KEY (api_id) REFERENCES APIs(id) ON DELETE CASCADE
 );
 
@@ -37,5 +43,361 @@ CREATE TABLE IF NOT EXISTS subscribers (
     subscribed_at DATETIME DEFAULT (datetime('now','-3 hours'))
 );
 
+---- Follows del bot: qué APIs / grupos sigue cada chat (ninguno = todas) ----
+CREATE TABLE IF NOT EXISTS subscriber_apis (
+    chat_id TEXT NOT NULL,
+    api_id INTEGER NOT NULL,
+    PRIMARY KEY (chat_id, api_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_subapis_api ON subscriber_apis(api_id);
+CREATE INDEX IF NOT EXISTS idx_subapis_chat ON subscriber_apis(chat_id);
+
+CREATE TABLE IF NOT EXISTS subscriber_groups (
+    chat_id TEXT NOT NULL,
+    group_key TEXT NOT NULL,
+    PRIMARY KEY (chat_id, group_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_subgroups_group ON subscriber_groups(group_key);
+
+-- Seguir una API borrada no tiene sentido (y un chat que solo seguía esa
+-- pasa a recibir todas, como cualquiera sin follows).
+CREATE TRIGGER IF NOT EXISTS trg_apis_follow_del AFTER DELETE ON APIs
+BEGIN
+    DELETE FROM subscriber_apis WHERE api_id = old.id;
+END;
+
 CREATE INDEX IF NOT EXISTS idx_logs_api_id ON logs(api_id);
 CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs(timestamp);
+
+---- Contadores del overview (mantenidos por triggers, lectura O(1)) ----
+-- metric: 'total' | 'status' | 'status_code' | 'latency'
+CREATE TABLE IF NOT EXISTS overview_counters (
+    metric TEXT NOT NULL,
+    key TEXT NOT NULL,
+    n INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (metric, key)
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_apis_count_ins AFTER INSERT ON APIs
+BEGIN
+    INSERT INTO overview_counters (metric, key, n) VALUES ('total', 'all', 1)
+        ON CONFLICT(metric, key) DO UPDATE SET n = n + 1;
+END;
+
+-- Borra el estado aunque la conexión no tenga foreign_keys activado,
+-- así el overview nunca cuenta estados de APIs eliminadas.
+CREATE TRIGGER IF NOT EXISTS trg_apis_count_del AFTER DELETE ON APIs
+BEGIN
+    DELETE FROM api_state WHERE api_id = old.id;
+    INSERT INTO overview_counters (metric, key, n) VALUES ('total', 'all', -1)
+        ON CONFLICT(metric, key) DO UPDATE SET n = n - 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_state_count_ins AFTER INSERT ON api_state
+BEGIN
+    INSERT INTO overview_counters (metric, key, n) VALUES ('status', COALESCE(new.last_status, 'UNKNOWN'), 1)
+        ON CONFLICT(metric, key) DO UPDATE SET n = n + 1;
+    INSERT INTO overview_counters (metric, key, n) VALUES ('status_code', COALESCE(CAST(new.last_status_code AS TEXT), 'none'), 1)
+        ON CONFLICT(metric, key) DO UPDATE SET n = n + 1;
+    INSERT INTO overview_counters (metric, key, n) VALUES ('latency', COALESCE(new.last_latency_bucket, 'none'), 1)
+        ON CONFLICT(metric, key) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_state_count_del AFTER DELETE ON api_state
+BEGIN
+    INSERT INTO overview_counters (metric, key, n) VALUES ('status', COALESCE(old.last_status, 'UNKNOWN'), -1)
+        ON CONFLICT(metric, key) DO UPDATE SET n = n - 1;
+    INSERT INTO overview_counters (metric, key, n) VALUES ('status_code', COALESCE(CAST(old.last_status_code AS TEXT), 'none'), -1)
+        ON CONFLICT(metric, key) DO UPDATE SET n = n - 1;
+    INSERT INTO overview_counters (metric, key, n) VALUES ('latency', COALESCE(old.last_latency_bucket, 'none'), -1)
+        ON CONFLICT(metric, key) DO UPDATE SET n = n - 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_state_count_status AFTER UPDATE OF last_status ON api_state
+WHEN old.last_status IS NOT new.last_status
+BEGIN
+    INSERT INTO overview_counters (metric, key, n) VALUES ('status', COALESCE(old.last_status, 'UNKNOWN'), -1)
+        ON CONFLICT(metric, key) DO UPDATE SET n = n - 1;
+    INSERT INTO overview_counters (metric, key, n) VALUES ('status', COALESCE(new.last_status, 'UNKNOWN'), 1)
+        ON CONFLICT(metric, key) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_state_count_code AFTER UPDATE OF last_status_code ON api_state
+WHEN old.last_status_code IS NOT new.last_status_code
+BEGIN
+    INSERT INTO overview_counters (metric, key, n) VALUES ('status_code', COALESCE(CAST(old.last_status_code AS TEXT), 'none'), -1)
+        ON CONFLICT(metric, key) DO UPDATE SET n = n - 1;
+    INSERT INTO overview_counters (metric, key, n) VALUES ('status_code', COALESCE(CAST(new.last_status_code AS TEXT), 'none'), 1)
+        ON CONFLICT(metric, key) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_state_count_latency AFTER UPDATE OF last_latency_bucket ON api_state
+WHEN old.last_latency_bucket IS NOT new.last_latency_bucket
+BEGIN
+    INSERT INTO overview_counters (metric, key, n) VALUES ('latency', COALESCE(old.last_latency_bucket, 'none'), -1)
+        ON CONFLICT(metric, key) DO UPDATE SET n = n - 1;
+    INSERT INTO overview_counters (metric, key, n) VALUES ('latency', COALESCE(new.last_latency_bucket, 'none'), 1)
+        ON CONFLICT(metric, key) DO UPDATE SET n = n + 1;
+END;
+
+---- Transiciones de estado (base del motor de SLA) ----
+-- Cada fila guarda los acumulados (prefix sums) hasta el instante `at`, así
+-- cualquier ventana se calcula restando dos filas, sin recorrer el historial.
+CREATE TABLE IF NOT EXISTS status_transitions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    api_id INTEGER NOT NULL,
+    status TEXT NOT NULL CHECK (status IN ('UP', 'DOWN')),
+    at REAL NOT NULL,
+    cum_up REAL NOT NULL DEFAULT 0,
+    cum_down REAL NOT NULL DEFAULT 0,
+    cum_incidents INTEGER NOT NULL DEFAULT 0,
+    cum_repairs INTEGER NOT NULL DEFAULT 0,
+    cum_repair_seconds REAL NOT NULL DEFAULT 0,
+    FOREIGN KEY (api_id) REFERENCES APIs(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_transitions_api_at ON status_transitions(api_id, at);
+
+---- Incidentes (una fila por caída: UP -> DOWN ... -> UP) ----
+CREATE TABLE IF NOT EXISTS incidents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    api_id INTEGER NOT NULL,
+    opened_at DATETIME NOT NULL,
+    opened_epoch REAL NOT NULL,
+    closed_at DATETIME,
+    closed_epoch REAL,
+    duration_seconds REAL,
+    first_status_code INTEGER,
+    last_status_code INTEGER,
+    first_error TEXT,
+    last_error TEXT,
+    check_count INTEGER NOT NULL DEFAULT 1,
+    FOREIGN KEY (api_id) REFERENCES APIs(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_incidents_api_opened ON incidents(api_id, opened_at);
+CREATE INDEX IF NOT EXISTS idx_incidents_opened ON incidents(opened_at);
+-- A lo sumo un incidente abierto por API (y lookup directo del abierto).
+CREATE UNIQUE INDEX IF NOT EXISTS idx_incidents_open ON incidents(api_id) WHERE closed_epoch IS NULL;
+
+---- Cuerpos de respuesta deduplicados (logs.body_id -> response_bodies.id) ----
+CREATE TABLE IF NOT EXISTS response_bodies (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hash TEXT NOT NULL UNIQUE,
+    body BLOB NOT NULL,
+    compressed INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL
+);
+
+---- Cambios del catálogo de APIs (el runner aplica solo los diffs) ----
+-- version crece con cada alta/baja/edición; MAX(version) es la versión del catálogo.
+CREATE TABLE IF NOT EXISTS catalog_changes (
+    version INTEGER PRIMARY KEY AUTOINCREMENT,
+    api_id INTEGER NOT NULL,
+    op TEXT NOT NULL CHECK (op IN ('upsert', 'delete'))
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_catalog_ins AFTER INSERT ON APIs
+BEGIN
+    INSERT INTO catalog_changes (api_id, op) VALUES (new.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_catalog_upd AFTER UPDATE OF name, url ON APIs
+BEGIN
+    INSERT INTO catalog_changes (api_id, op) VALUES (new.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_catalog_probe_upd AFTER UPDATE OF probe ON APIs
+BEGIN
+    INSERT INTO catalog_changes (api_id, op) VALUES (new.id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_catalog_del AFTER DELETE ON APIs
+BEGIN
+    INSERT INTO catalog_changes (api_id, op) VALUES (old.id, 'delete');
+END;
+
+---- Assertions por API (spec JSON, ver core/assertions.py) ----
+CREATE TABLE IF NOT EXISTS api_assertions (
+    api_id INTEGER PRIMARY KEY,
+    spec TEXT NOT NULL,
+    updated_at DATETIME DEFAULT (datetime('now','-3 hours')),
+    FOREIGN KEY (api_id) REFERENCES APIs(id) ON DELETE CASCADE
+);
+
+-- Cambiar assertions cuenta como cambio del catálogo: el runner recompila solo esa API.
+CREATE TRIGGER IF NOT EXISTS trg_catalog_assert_ins AFTER INSERT ON api_assertions
+BEGIN
+    INSERT INTO catalog_changes (api_id, op) VALUES (new.api_id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_catalog_assert_upd AFTER UPDATE ON api_assertions
+BEGIN
+    INSERT INTO catalog_changes (api_id, op) VALUES (new.api_id, 'upsert');
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_catalog_assert_del AFTER DELETE ON api_assertions
+BEGIN
+    INSERT INTO catalog_changes (api_id, op) VALUES (old.api_id, 'upsert');
+END;
+
+---- Grupos / tags jerárquicos (team, env, region, ...) ----
+-- Un tag es "tipo:camino", p.ej. "team:pagos" o "region:us/east". Cada nivel
+-- del camino es un grupo: region:us contiene a region:us/east.
+CREATE TABLE IF NOT EXISTS api_groups (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,          -- "region:us/east"
+    kind TEXT NOT NULL,                -- "region"
+    parent_id INTEGER REFERENCES api_groups(id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_groups_kind ON api_groups(kind);
+CREATE INDEX IF NOT EXISTS idx_groups_parent ON api_groups(parent_id);
+
+-- Tags asignados a mano.
+CREATE TABLE IF NOT EXISTS api_tags (
+    api_id INTEGER NOT NULL,
+    group_id INTEGER NOT NULL,
+    PRIMARY KEY (api_id, group_id)
+) WITHOUT ROWID;
+
+-- Pertenencia materializada: el grupo del tag y todos sus ancestros. Las
+-- consultas por grupo (a cualquier nivel) son un rango del índice.
+CREATE TABLE IF NOT EXISTS api_group_members (
+    group_id INTEGER NOT NULL,
+    api_id INTEGER NOT NULL,
+    PRIMARY KEY (group_id, api_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_group_members_api ON api_group_members(api_id, group_id);
+
+-- Igual que overview_counters pero por grupo; lo mantienen los triggers de abajo.
+CREATE TABLE IF NOT EXISTS group_counters (
+    group_id INTEGER NOT NULL,
+    metric TEXT NOT NULL,
+    key TEXT NOT NULL,
+    n INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (group_id, metric, key)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS trg_apis_group_del AFTER DELETE ON APIs
+BEGIN
+    DELETE FROM api_tags WHERE api_id = old.id;
+    DELETE FROM api_group_members WHERE api_id = old.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_group_member_ins AFTER INSERT ON api_group_members
+BEGIN
+    INSERT INTO group_counters (group_id, metric, key, n)
+    SELECT new.group_id, 'total', 'all', 1 WHERE 1
+    UNION ALL
+    SELECT new.group_id, 'status', COALESCE(last_status, 'UNKNOWN'), 1 FROM api_state WHERE api_id = new.api_id
+    UNION ALL
+    SELECT new.group_id, 'status_code', COALESCE(CAST(last_status_code AS TEXT), 'none'), 1 FROM api_state WHERE api_id = new.api_id
+    UNION ALL
+    SELECT new.group_id, 'latency', COALESCE(last_latency_bucket, 'none'), 1 FROM api_state WHERE api_id = new.api_id
+    ON CONFLICT(group_id, metric, key) DO UPDATE SET n = n + excluded.n;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_group_member_del AFTER DELETE ON api_group_members
+BEGIN
+    INSERT INTO group_counters (group_id, metric, key, n)
+    SELECT old.group_id, 'total', 'all', -1 WHERE 1
+    UNION ALL
+    SELECT old.group_id, 'status', COALESCE(last_status, 'UNKNOWN'), -1 FROM api_state WHERE api_id = old.api_id
+    UNION ALL
+    SELECT old.group_id, 'status_code', COALESCE(CAST(last_status_code AS TEXT), 'none'), -1 FROM api_state WHERE api_id = old.api_id
+    UNION ALL
+    SELECT old.group_id, 'latency', COALESCE(last_latency_bucket, 'none'), -1 FROM api_state WHERE api_id = old.api_id
+    ON CONFLICT(group_id, metric, key) DO UPDATE SET n = n + excluded.n;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_group_state_ins AFTER INSERT ON api_state
+BEGIN
+    INSERT INTO group_counters (group_id, metric, key, n)
+    SELECT group_id, 'status', COALESCE(new.last_status, 'UNKNOWN'), 1 FROM api_group_members WHERE api_id = new.api_id
+    UNION ALL
+    SELECT group_id, 'status_code', COALESCE(CAST(new.last_status_code AS TEXT), 'none'), 1 FROM api_group_members WHERE api_id = new.api_id
+    UNION ALL
+    SELECT group_id, 'latency', COALESCE(new.last_latency_bucket, 'none'), 1 FROM api_group_members WHERE api_id = new.api_id
+    ON CONFLICT(group_id, metric, key) DO UPDATE SET n = n + excluded.n;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_group_state_del AFTER DELETE ON api_state
+BEGIN
+    INSERT INTO group_counters (group_id, metric, key, n)
+    SELECT group_id, 'status', COALESCE(old.last_status, 'UNKNOWN'), -1 FROM api_group_members WHERE api_id = old.api_id
+    UNION ALL
+    SELECT group_id, 'status_code', COALESCE(CAST(old.last_status_code AS TEXT), 'none'), -1 FROM api_group_members WHERE api_id = old.api_id
+    UNION ALL
+    SELECT group_id, 'latency', COALESCE(old.last_latency_bucket, 'none'), -1 FROM api_group_members WHERE api_id = old.api_id
+    ON CONFLICT(group_id, metric, key) DO UPDATE SET n = n + excluded.n;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_group_state_status AFTER UPDATE OF last_status ON api_state
+WHEN old.last_status IS NOT new.last_status
+BEGIN
+    INSERT INTO group_counters (group_id, metric, key, n)
+    SELECT group_id, 'status', COALESCE(old.last_status, 'UNKNOWN'), -1 FROM api_group_members WHERE api_id = new.api_id
+    UNION ALL
+    SELECT group_id, 'status', COALESCE(new.last_status, 'UNKNOWN'), 1 FROM api_group_members WHERE api_id = new.api_id
+    ON CONFLICT(group_id, metric, key) DO UPDATE SET n = n + excluded.n;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_group_state_code AFTER UPDATE OF last_status_code ON api_state
+WHEN old.last_status_code IS NOT new.last_status_code
+BEGIN
+    INSERT INTO group_counters (group_id, metric, key, n)
+    SELECT group_id, 'status_code', COALESCE(CAST(old.last_status_code AS TEXT), 'none'), -1 FROM api_group_members WHERE api_id = new.api_id
+    UNION ALL
+    SELECT group_id, 'status_code', COALESCE(CAST(new.last_status_code AS TEXT), 'none'), 1 FROM api_group_members WHERE api_id = new.api_id
+    ON CONFLICT(group_id, metric, key) DO UPDATE SET n = n + excluded.n;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_group_state_latency AFTER UPDATE OF last_latency_bucket ON api_state
+WHEN old.last_latency_bucket IS NOT new.last_latency_bucket
+BEGIN
+    INSERT INTO group_counters (group_id, metric, key, n)
+    SELECT group_id, 'latency', COALESCE(old.last_latency_bucket, 'none'), -1 FROM api_group_members WHERE api_id = new.api_id
+    UNION ALL
+    SELECT group_id, 'latency', COALESCE(new.last_latency_bucket, 'none'), 1 FROM api_group_members WHERE api_id = new.api_id
+    ON CONFLICT(group_id, metric, key) DO UPDATE SET n = n + excluded.n;
+END;
+
+---- Generación de estado: sube solo cuando cambia un status o la pertenencia ----
+-- a grupos, no en cada check. El bot la usa (junto con la versión del
+-- catálogo) como clave de cache de /groups y /my.
+CREATE TABLE IF NOT EXISTS state_generation (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    gen INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO state_generation (id, gen) VALUES (1, 0);
+
+CREATE TRIGGER IF NOT EXISTS trg_gen_state_ins AFTER INSERT ON api_state
+BEGIN
+    UPDATE state_generation SET gen = gen + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_gen_state_del AFTER DELETE ON api_state
+BEGIN
+    UPDATE state_generation SET gen = gen + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_gen_state_status AFTER UPDATE OF last_status ON api_state
+WHEN old.last_status IS NOT new.last_status
+BEGIN
+    UPDATE state_generation SET gen = gen + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_gen_member_ins AFTER INSERT ON api_group_members
+BEGIN
+    UPDATE state_generation SET gen = gen + 1 WHERE id = 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_gen_member_del AFTER DELETE ON api_group_members
+BEGIN
+    UPDATE state_generation SET gen = gen + 1 WHERE id = 1;
+END;
@@ -0,0 +1,139 @@
+"""
+Estado agregado por grupo: contadores incrementales (group_counters) vs.
+recorrer los miembros en cada request.
+
+Arma --apis APIs con tags team/env/region (region jerárquica) sobre una DB
+temporal y mide:
+
+- /groups y /stats/overview?group=... leyendo contadores vs. un GROUP BY
+  sobre api_group_members + api_state
+- /apis?group=... (rango del índice de pertenencia)
+- costo extra de los triggers en save_check_batch (tandas de checks)
+
+Uso:
+    python benchmarks/bench_groups.py [--apis 10000] [--reps 200]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+TEAMS = [f"team:t{i}" for i in range(20)]
+ENVS = ["env:prod", "env:staging", "env:dev"]
+REGIONS = [f"region:{c}/{z}" for c in ("us", "eu", "sa", "ap") for z in ("east", "west", "central")]
+
+
+def _scan_groups(conn):
+    return conn.execute(
+        """
+        SELECT g.key,
+               COUNT(*) AS total,
+               SUM(s.last_status = 'UP') AS up,
+               SUM(s.last_status = 'DOWN') AS down
+        FROM api_groups g
+        JOIN api_group_members m ON m.group_id = g.id
+        LEFT JOIN api_state s ON s.api_id = m.api_id
+        GROUP BY g.id
+        ORDER BY g.key;
+        """
+    ).fetchall()
+
+
+def _scan_group_overview(conn, key):
+    return conn.execute(
+        """
+        SELECT COALESCE(s.last_status, 'UNKNOWN'), COUNT(*)
+        FROM api_groups g
+        JOIN api_group_members m ON m.group_id = g.id
+        LEFT JOIN api_state s ON s.api_id = m.api_id
+        WHERE g.key = ?
+        GROUP BY 1;
+        """,
+        (key,),
+    ).fetchall()
+
+
+def _timeit(fn, reps):
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        fn()
+    return (time.perf_counter() - t0) / reps * 1000
+
+
+def _checks(logic, n_apis, rnd):
+    now = time.time()
+    out = []
+    for api_id in range(1, n_apis + 1):
+        st = "DOWN" if rnd.random() < 0.05 else "UP"
+        out.append({
+            "api_id": api_id,
+            "result": {"status": st, "status_code": 200 if st == "UP" else 503, "latency": rnd.uniform(0.05, 1.5), "response": "ok"},
+            "checked_at": logic.db_now(),
+            "checked_epoch": now,
+            "prev_status": None,
+            "alerted": False,
+        })
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--apis", type=int, default=10000)
+    ap.add_argument("--reps", type=int, default=200)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_groups_")
+    os.environ["DB_PATH"] = os.path.join(tmp, "bench.db")
+    from core import logic
+
+    rnd = random.Random(7)
+    logic.add_APIs_bulk([(f"api-{i}", f"https://api-{i}.example.com/") for i in range(args.apis)])
+    t0 = time.perf_counter()
+    for api_id in range(1, args.apis + 1):
+        logic.set_api_tags(api_id, [rnd.choice(TEAMS), rnd.choice(ENVS), rnd.choice(REGIONS)])
+    print(f"{args.apis} APIs taggeadas en {time.perf_counter() - t0:.2f}s ({len(logic.get_groups())} grupos)")
+
+    batch = _checks(logic, args.apis, rnd)
+    t0 = time.perf_counter()
+    logic.save_check_batch(batch)
+    print(f"save_check_batch de {args.apis} checks (con triggers de grupo): {time.perf_counter() - t0:.2f}s")
+
+    conn = logic._get_conn()
+    reps = args.reps
+    print(f"/groups     contadores {_timeit(logic.get_groups, reps):8.3f}ms   scan {_timeit(lambda: _scan_groups(conn), reps):8.3f}ms")
+    key = "region:us"
+    print(
+        f"overview {key}  contadores {_timeit(lambda: logic.get_overview_stats(key), reps):8.3f}ms   "
+        f"scan {_timeit(lambda: _scan_group_overview(conn, key), reps):8.3f}ms"
+    )
+    print(f"/apis?group=team:t3  {_timeit(lambda: logic.get_apis_with_state('team:t3'), max(1, reps // 10)):8.3f}ms")
+
+    # Costo de los triggers: la misma tanda con y sin pertenencias
+    batch = _checks(logic, args.apis, rnd)
+    t0 = time.perf_counter()
+    logic.save_check_batch(batch)
+    with_groups = time.perf_counter() - t0
+
+    # Los contadores incrementales tienen que coincidir con un recálculo desde cero
+    snap = lambda: sorted(map(tuple, conn.execute("SELECT * FROM group_counters WHERE n != 0;").fetchall()))
+    before = snap()
+    logic.rebuild_overview_counters()
+    print(f"contadores consistentes con un recálculo: {before == snap()}")
+
+    conn.execute("DELETE FROM api_group_members;")
+    conn.commit()
+    batch = _checks(logic, args.apis, rnd)
+    t0 = time.perf_counter()
+    logic.save_check_batch(batch)
+    without = time.perf_counter() - t0
+    print(f"tanda de {args.apis} checks: {with_groups:.3f}s con grupos vs {without:.3f}s sin grupos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Sparklines del dashboard: un /apis/{id}/logs por API vs. un solo /logs/batch.
+
+Arma una DB temporal con --apis APIs chequeadas cada --interval segundos
+durante las últimas --hours horas (así la ventana reciente es una parte chica
+de la tabla) y mide, con el servidor real vía TestClient:
+
+- "por API": N requests a /apis/{id}/logs?limit=<checks de la ventana>
+- "batch": GET /logs/batch?points=60&minutes=15 (todas las APIs)
+
+más los bytes de JSON de cada variante.
+
+Uso:
+    python benchmarks/bench_logs_batch.py [--apis 200] [--hours 6] [--interval 10]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _seed(logic, n_apis: int, hours: float, interval: int) -> int:
+    logic.add_APIs_bulk([(f"api-{i}", f"https://api-{i}.example.com/health") for i in range(n_apis)])
+    conn = logic._get_conn()
+    total = int(hours * 3600 / interval)
+    rows = []
+    for k in range(total):
+        ago = f"-{(total - k) * interval} seconds"
+        for api_id in range(1, n_apis + 1):
+            down = (k + api_id) % 50 == 0
+            rows.append((api_id, "DOWN" if down else "UP", 503 if down else 200, 0.1 + ((k + api_id) % 30) / 100, ago))
+        if len(rows) >= 100_000:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO logs (api_id, status, status_code, latency, timestamp) "
+                    "VALUES (?, ?, ?, ?, datetime('now', '-3 hours', ?));",
+                    rows,
+                )
+            rows = []
+    if rows:
+        with conn:
+            conn.executemany(
+                "INSERT INTO logs (api_id, status, status_code, latency, timestamp) "
+                "VALUES (?, ?, ?, ?, datetime('now', '-3 hours', ?));",
+                rows,
+            )
+    return total * n_apis
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--apis", type=int, default=200)
+    ap.add_argument("--hours", type=float, default=6)
+    ap.add_argument("--interval", type=int, default=10)
+    ap.add_argument("--points", type=int, default=60)
+    ap.add_argument("--minutes", type=int, default=15)
+    ap.add_argument("--reps", type=int, default=5)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_batch_")
+    os.environ["DB_PATH"] = os.path.join(tmp, "bench.db")
+    from core import logic
+
+    n = _seed(logic, args.apis, args.hours, args.interval)
+    print(f"{args.apis} APIs · {n} logs ({args.hours}h cada {args.interval}s) · ventana {args.minutes} min en {args.points} puntos")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        from fastapi.testclient import TestClient
+    from core.api_server import app
+
+    per_api = args.minutes * 60 // args.interval
+    with TestClient(app) as client:
+        def one_by_one():
+            size = 0
+            for api_id in range(1, args.apis + 1):
+                r = client.get(f"/apis/{api_id}/logs?limit={per_api}")
+                size += len(r.content)
+            return size
+
+        def batch():
+            r = client.get(f"/logs/batch?points={args.points}&minutes={args.minutes}")
+            data = r.json()
+            assert len(data["ids"]) == args.apis
+            assert all(any(v is not None for v in row) for row in data["latency"])
+            return len(r.content)
+
+        for label, fn, reqs in (("por API", one_by_one, args.apis), ("batch", batch, 1)):
+            fn()  # warmup
+            t0 = time.perf_counter()
+            for _ in range(args.reps):
+                size = fn()
+            dt = (time.perf_counter() - t0) / args.reps
+            print(f"{label:<8} {dt * 1000:9.1f}ms  {reqs:5d} requests  {size / 1024:8.1f} KiB de JSON")
+
+        # La consulta sola (sin HTTP)
+        t0 = time.perf_counter()
+        for _ in range(args.reps):
+            logic.get_logs_batch(points=args.points, minutes=args.minutes)
+        print(f"get_logs_batch sola: {(time.perf_counter() - t0) / args.reps * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
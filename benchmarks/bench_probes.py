@@ -0,0 +1,129 @@
+"""
+Costo de cada probe (core/checker.py) contra un server local de prueba.
+
+Levanta un ThreadingHTTPServer en 127.0.0.1 que responde un cuerpo de
+--body-kb KiB y compara latencia por check de http (GET), head, tcp y dns.
+Si hay `openssl` en el PATH también levanta un server TLS con un certificado
+autofirmado y mide el probe tls (el cert se pasa como CA vía TLS_CA_FILE).
+
+Uso:
+    python benchmarks/bench_probes.py [--checks 300] [--body-kb 64]
+"""
+import argparse
+import os
+import shutil
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from core import checker  # noqa: E402
+
+
+def _handler(body: bytes):
+    class H(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _head(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+
+        def do_GET(self):
+            self._head()
+            self.wfile.write(body)
+
+        def do_HEAD(self):
+            self._head()
+
+        def log_message(self, *args):
+            pass
+
+    return H
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 128  # con el default (5) el probe tcp llena el backlog y mide retransmisiones de SYN
+
+    def handle_error(self, request, client_address):
+        pass  # tcp/tls cierran sin pedir nada; GET corta el cuerpo: no es error
+
+
+def _serve(server: ThreadingHTTPServer) -> None:
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+
+def _self_signed(tmp: str):
+    if not shutil.which("openssl"):
+        return None
+    cert, key = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+    r = subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "30",
+            "-keyout", key, "-out", cert, "-subj", "/CN=localhost",
+            "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1",
+        ],
+        capture_output=True,
+    )
+    return (cert, key) if r.returncode == 0 else None
+
+
+def _bench(name: str, url: str, n: int) -> None:
+    fn = checker.PROBES[name]
+    fn(url)  # warmup
+    times = []
+    statuses = set()
+    for _ in range(n):
+        t0 = time.perf_counter()
+        res = fn(url)
+        times.append(time.perf_counter() - t0)
+        statuses.add(res["status"])
+    times.sort()
+    p95 = times[int(0.95 * (len(times) - 1))]
+    print(
+        f"{name:<5} {statistics.mean(times) * 1000:8.3f}ms media  {times[len(times) // 2] * 1000:8.3f}ms p50  "
+        f"{p95 * 1000:8.3f}ms p95  status={','.join(sorted(statuses))}  ejemplo: {res['response'][:60]!r}"
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--checks", type=int, default=300)
+    ap.add_argument("--body-kb", type=int, default=64)
+    args = ap.parse_args()
+
+    body = b"x" * (args.body_kb * 1024)
+    httpd = _Server(("127.0.0.1", 0), _handler(body))
+    _serve(httpd)
+    url = f"http://127.0.0.1:{httpd.server_port}/health"
+
+    print(f"{args.checks} checks por probe · cuerpo {args.body_kb} KiB · {url}")
+    for name in ("http", "head", "tcp"):
+        _bench(name, url, args.checks)
+    _bench("dns", f"http://localhost:{httpd.server_port}/", args.checks)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pair = _self_signed(tmp)
+        if pair is None:
+            print("tls   (sin openssl, se omite)")
+            return
+        tlsd = _Server(("127.0.0.1", 0), _handler(body))
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(*pair)
+        tlsd.socket = ctx.wrap_socket(tlsd.socket, server_side=True)
+        _serve(tlsd)
+        checker.TLS_CA_FILE = pair[0]
+        _bench("tls", f"https://127.0.0.1:{tlsd.server_port}/", args.checks)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Arranque en frío de cada subcomando de main.py (`python -X importtime`).
+
+Por subcomando corre un proceso nuevo contra una DB temporal y mide:
+
+- tiempo de pared hasta terminar (add, migrate-bodies, archive, help) o hasta
+  estar listo (run: primer print del runner; serve/both: "Uvicorn running"),
+  después de lo cual se le manda SIGTERM
+- tiempo total de imports y cantidad de módulos (según -X importtime)
+- los imports de primer nivel más caros
+
+Con --root se mide otro checkout (p.ej. un `git worktree` de una versión
+anterior) para comparar.
+
+Uso:
+    python benchmarks/bench_startup.py [--repeat 5] [--only add,serve] [--root PATH]
+"""
+import argparse
+import os
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# (nombre, argv, marca de "listo" o None si el comando termina solo)
+COMMANDS = [
+    ("help", ["help"], None),
+    ("add", ["add", "Bench", "https://bench.example.com/health"], None),
+    ("migrate-bodies", ["migrate-bodies"], None),
+    ("archive", ["archive", "7"], None),
+    ("run", ["run"], "Iniciando API Monitor"),
+    ("serve", ["serve"], "Uvicorn running"),
+    ("both", ["both"], "Uvicorn running"),
+]
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def _parse_importtime(lines):
+    """
+    -> (µs totales, módulos, [(µs, módulo de primer nivel)])
+    """
+    top = []
+    modules = 0
+    for line in lines:
+        m = _LINE.match(line)
+        if not m:
+            continue
+        modules += 1
+        if len(m.group(3)) == 1:  # sin sangría = import de primer nivel
+            top.append((int(m.group(2)), m.group(4)))
+    return sum(us for us, _ in top), modules, sorted(top, reverse=True)
+
+
+def _run_once(root: Path, argv, ready, env, timeout: float = 30.0):
+    cmd = [sys.executable, "-X", "importtime", str(root / "main.py"), *argv]
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        cmd, cwd=root, env=env, stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+    )
+    err_lines = []
+    ready_at = [None]
+    hit = threading.Event()
+
+    def pump(stream, sink):
+        for line in stream:
+            if sink is not None:
+                sink.append(line)
+            if ready and ready in line and ready_at[0] is None:
+                ready_at[0] = time.perf_counter() - t0
+                hit.set()
+
+    threads = [
+        threading.Thread(target=pump, args=(proc.stdout, None), daemon=True),
+        threading.Thread(target=pump, args=(proc.stderr, err_lines), daemon=True),
+    ]
+    for t in threads:
+        t.start()
+
+    if ready:
+        hit.wait(timeout)
+        proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+    wall = ready_at[0] if ready else time.perf_counter() - t0
+    for t in threads:
+        t.join(1)
+    return wall, _parse_importtime(err_lines)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--only", default="", help="subcomandos separados por coma")
+    ap.add_argument("--root", default=str(ROOT), help="checkout a medir (default: este)")
+    args = ap.parse_args()
+
+    root = Path(args.root).resolve()
+    only = {x.strip() for x in args.only.split(",") if x.strip()}
+    tmp = tempfile.mkdtemp(prefix="bench_startup_")
+    env = dict(
+        os.environ,
+        DB_PATH=os.path.join(tmp, "bench.db"),
+        LOG_ARCHIVE_DIR=os.path.join(tmp, "archive"),
+        PYTHONUNBUFFERED="1",
+        RUNNER_TELEGRAM_ENABLED="0",
+        SHUTDOWN_GRACE_SECONDS="3",
+    )
+    # La DB ya creada: se mide el arranque, no el schema inicial.
+    _run_once(root, ["add", "Warmup", "https://warmup.example.com/"], None, env)
+
+    print(f"{root} · mediana de {args.repeat} corridas")
+    print(f"{'subcomando':<15} {'pared':>9} {'imports':>9} {'módulos':>8}  imports más caros")
+    for name, argv, ready in COMMANDS:
+        if only and name not in only:
+            continue
+        walls, imports, mods = [], [], 0
+        top = []
+        for _ in range(args.repeat):
+            wall, (us, mods, top) = _run_once(root, argv, ready, env)
+            if wall is None:
+                print(f"{name:<15} no llegó a estar listo")
+                break
+            walls.append(wall)
+            imports.append(us)
+        else:
+            heavy = ", ".join(f"{m} {us / 1000:.0f}ms" for us, m in top[:3])
+            print(
+                f"{name:<15} {statistics.median(walls) * 1000:7.0f}ms {statistics.median(imports) / 1000:7.0f}ms "
+                f"{mods:8d}  {heavy}"
+            )
+
+
+if __name__ == "__main__":
+    main()
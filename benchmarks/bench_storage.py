@@ -0,0 +1,99 @@
+"""
+Backends de core/storage con la carga del runner: SQLite vs. memoria.
+
+Por backend da de alta --apis APIs y simula --cycles tandas: cada tanda es
+un save_check_batch de a FLUSH_MAX_PENDING checks (como el write-behind del
+runner) más el vistazo al catálogo que hace entre checks. Después mide las
+lecturas del dashboard/bot: overview, últimos logs de cada API y un export
+completo (iter_logs).
+
+Uso:
+    python benchmarks/bench_storage.py [--apis 1000] [--cycles 30] [--ring 1000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _batch(api_ids, cycle: int):
+    ts = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1_700_000_000 + cycle * 10))
+    out = []
+    for api_id in api_ids:
+        down = (api_id + cycle) % 40 == 0
+        out.append({
+            "api_id": api_id,
+            "result": {
+                "status": "DOWN" if down else "UP",
+                "status_code": 503 if down else 200,
+                "latency": 0.05 + (api_id % 20) / 100,
+                "response": '{"error": "upstream"}' if down else '{"ok": true}',
+            },
+            "checked_at": ts,
+            "checked_epoch": 1_700_000_000 + cycle * 10,
+            "prev_status": None,
+            "alerted": False,
+            "next_due": 1_700_000_000 + (cycle + 1) * 10,
+            "timeout": (1.0, 2.0),
+        })
+    return out
+
+
+def _run(store, args) -> None:
+    from core.runner import FLUSH_MAX_PENDING
+
+    ids = [store.add_api(f"api-{i}", f"https://api-{i}.example.com/health") for i in range(args.apis)]
+    version = store.get_catalog_version()
+
+    t0 = time.perf_counter()
+    for cycle in range(args.cycles):
+        batch = _batch(ids, cycle)
+        for i in range(0, len(batch), FLUSH_MAX_PENDING):
+            store.save_check_batch(batch[i:i + FLUSH_MAX_PENDING])
+            version = store.get_catalog_changes(version)[0]
+    write = time.perf_counter() - t0
+    checks = args.apis * args.cycles
+
+    t0 = time.perf_counter()
+    for _ in range(100):
+        store.get_overview_stats()
+    overview = (time.perf_counter() - t0) / 100
+
+    t0 = time.perf_counter()
+    for api_id in ids:
+        store.get_logs(api_id, limit=20)
+    logs = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    exported = sum(len(c) for c in store.iter_logs(with_response=False))
+    export = time.perf_counter() - t0
+
+    print(
+        f"{store.name:<7} {checks / write:10,.0f} checks/s  overview {overview * 1e6:7.1f}µs  "
+        f"get_logs×{args.apis} {logs * 1000:7.1f}ms  export {exported} logs {export * 1000:7.1f}ms"
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--apis", type=int, default=1000)
+    ap.add_argument("--cycles", type=int, default=30)
+    ap.add_argument("--ring", type=int, default=1000, help="logs por API del backend en memoria")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_storage_")
+    os.environ["DB_PATH"] = os.path.join(tmp, "bench.db")
+    from core.storage import MemoryStorage, SQLiteStorage
+
+    print(f"{args.apis} APIs · {args.cycles} tandas · lotes de write-behind como el runner")
+    _run(SQLiteStorage(), args)
+    _run(MemoryStorage(log_ring=args.ring, snapshot_path=None), args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Comandos del bot de Telegram contra un transporte simulado (sin red).
+
+Arma una DB temporal con --apis APIs y un grupo que sigue --follow de ellas,
+y dispara --commands comandos (/status, /my, /apis, /sla) midiendo tiempo y
+lecturas al storage del bot:
+
+- sin cache (cada comando arma la respuesta desde la DB)
+- con cache por (comando, follow set, versión de la DB)
+- /my armado con una consulta por API (N+1) vs. una consulta batch
+- rate limit: un chat que manda una ráfaga solo recibe COMMAND_BURST respuestas
+- snapshot inicial a --subs suscriptores: secuencial (como antes) vs. una
+  pasada + render por follow set + envíos en paralelo, con un transporte que
+  tarda --send-ms por mensaje y contesta algún 429
+
+Uso:
+    python benchmarks/bench_telegram_bot.py [--apis 500] [--follow 300] [--commands 2000]
+                                            [--subs 500] [--send-ms 20] [--rate 500]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+class FakeBot:
+    """
+    Transporte de mentira: guarda lo que se hubiera mandado a Telegram.
+    """
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        assert len(text) <= 4096, "mensaje más largo que el límite de Telegram"
+        self.sent.append((chat_id, text))
+
+
+class SlowBot(FakeBot):
+    """
+    Como FakeBot pero con latencia de red y un 429 cada `flood_every` envíos.
+    """
+
+    def __init__(self, send_ms: float, flood_every: int = 400):
+        super().__init__()
+        self.delay = send_ms / 1000
+        self.flood_every = flood_every
+        self.calls = 0
+        self.floods = 0
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        from telegram.error import RetryAfter
+
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.calls % self.flood_every == 0:
+            self.floods += 1
+            raise RetryAfter(1)
+        await super().send_message(chat_id, text, parse_mode)
+
+
+def _update(bot: FakeBot, chat_id: int, args=None):
+    async def reply_text(text, parse_mode=None):
+        await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+
+    update = SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id), message=SimpleNamespace(reply_text=reply_text))
+    context = SimpleNamespace(args=args or [], bot=bot, application=SimpleNamespace(bot=bot))
+    return update, context
+
+
+def _seed(n_apis: int) -> None:
+    from core import logic
+
+    logic.add_APIs_bulk([(f"api-{i}", f"https://api-{i}.example.com/health") for i in range(n_apis)])
+    checks = []
+    now = time.time()
+    for api_id in range(1, n_apis + 1):
+        status = "DOWN" if api_id % 17 == 0 else "UP"
+        checks.append({
+            "api_id": api_id,
+            "result": {"status": status, "status_code": 200 if status == "UP" else 503, "latency": 0.2, "response": "ok"},
+            "checked_at": logic.db_now(),
+            "checked_epoch": now,
+            "prev_status": None,
+            "alerted": False,
+        })
+    logic.save_check_batch(checks)
+
+
+class CountingStore:
+    """
+    Envuelve el storage del bot y cuenta las llamadas que le llegan.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self.calls = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._store, name)
+        if not callable(attr):
+            return attr
+
+        def counted(*a, **k):
+            self.calls += 1
+            return attr(*a, **k)
+
+        return counted
+
+
+class _NoCache:
+    def get_or_render(self, command, follow, version, render):
+        return render()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--apis", type=int, default=500)
+    ap.add_argument("--follow", type=int, default=300)
+    ap.add_argument("--commands", type=int, default=2000)
+    ap.add_argument("--subs", type=int, default=500)
+    ap.add_argument("--send-ms", type=float, default=20)
+    ap.add_argument("--rate", type=float, default=500, help="límite global de envíos/seg en el bootstrap")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_bot_")
+    os.environ["DB_PATH"] = os.path.join(tmp, "bench.db")
+    _seed(args.apis)
+
+    import telegram_bot as tb
+
+    tb.ensure_tables()
+    group = -100123
+    for api_id in range(1, args.follow + 1):
+        tb.follow_api(group, api_id)
+
+    real_store = tb._store
+    counting = CountingStore(real_store)
+    tb._store = counting
+    bot = FakeBot()
+    cmds = [tb.status_cmd, tb.my_cmd, tb.apis_cmd, tb.sla_cmd]
+
+    async def burst(n):
+        for i in range(n):
+            update, context = _update(bot, group)
+            await cmds[i % len(cmds)](update, context)
+
+    def run(label, cache):
+        tb._responses = cache
+        tb._limiter = tb.ChatRateLimiter(rate=1e9, burst=10**9)  # sin límite: se mide solo el cache
+        counting.calls = 0
+        bot.sent.clear()
+        t0 = time.perf_counter()
+        asyncio.run(burst(args.commands))
+        dt = time.perf_counter() - t0
+        print(
+            f"{label:<10} {dt * 1000:9.1f}ms total  {dt / args.commands * 1e6:8.1f}µs/comando  "
+            f"{counting.calls:6d} lecturas al storage  {len(bot.sent)} mensajes"
+        )
+
+    print(f"{args.apis} APIs · grupo que sigue {args.follow} · {args.commands} comandos")
+    run("sin cache", _NoCache())
+    cache = tb.ResponseCache()
+    run("con cache", cache)
+    print(f"           cache: {cache.hits} hits / {cache.misses} misses")
+
+    # /my: una consulta por API seguida vs. una sola
+    followed = tb.get_follows(group)
+    counting.calls = 0
+    t0 = time.perf_counter()
+    old = [tb.get_api_by_id(api_id) for api_id in sorted(followed)]
+    t_old, q_old = time.perf_counter() - t0, counting.calls
+    counting.calls = 0
+    t0 = time.perf_counter()
+    new = tb.get_apis_by_ids(followed)
+    t_new, q_new = time.perf_counter() - t0, counting.calls
+    assert len(old) == len(new)
+    print(f"/my N+1    {t_old * 1000:9.1f}ms  {q_old} consultas")
+    print(f"/my batch  {t_new * 1000:9.1f}ms  {q_new} consulta")
+
+    # Rate limit: ráfaga de un mismo chat
+    tb._limiter = tb.ChatRateLimiter()
+    bot.sent.clear()
+    asyncio.run(burst(100))
+    print(f"ráfaga de 100 comandos -> {len(bot.sent)} mensajes (burst={tb.COMMAND_BURST} + 1 aviso, con chunking)")
+
+    # Snapshot inicial: suscriptores repartidos en 5 follow sets (uno = todas)
+    tb._store = real_store
+    for i in range(args.subs):
+        chat_id = 10_000 + i
+        tb.ensure_subscriber(chat_id)
+        if i % 5:
+            for api_id in range(1 + (i % 5) * 10, 11 + (i % 5) * 10):
+                tb.follow_api(chat_id, api_id)
+    tb._store = counting
+    app = SimpleNamespace(bot=None)
+
+    async def sequential():
+        # Versión anterior: por chat, estados + follow set + render + envío
+        for chat_id in tb.get_all_subscribers():
+            rows = tb.get_current_states()
+            followed = tb.get_followed_api_ids(chat_id)
+            msg = tb.format_snapshot(rows, only_api_ids=followed or None)
+            try:
+                await tb.send_text(app.bot, chat_id, msg)
+            except Exception:
+                pass
+
+    for label, fn in (
+        ("secuencial", sequential),
+        ("paralelo", lambda: tb.broadcast_snapshots(app, tb.get_current_states())),
+    ):
+        app.bot = SlowBot(args.send_ms)
+        tb._broadcast_limiter = tb.AsyncRateLimiter(args.rate)
+        counting.calls = 0
+        t0 = time.perf_counter()
+        asyncio.run(fn())
+        dt = time.perf_counter() - t0
+        chats = len({c for c, _ in app.bot.sent})
+        print(
+            f"bootstrap {label:<10} {dt:7.2f}s  {counting.calls:5d} lecturas  {chats} chats  "
+            f"{len(app.bot.sent)} mensajes  {app.bot.floods} respuestas 429"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Timeouts fijos vs. adaptativos (core/timeouts.py) con checks HTTP reales.
+
+Levanta un server local con:
+- --fast APIs que responden en ~10ms pero a veces (--hang-pct) se cuelgan
+- --slow APIs "batch" que siempre tardan 1.25 × el timeout fijo
+
+y corre el runner (_check_one, secuencial como en producción) por --warmup
+tandas sin cuelgues (para que cada API junte su ventana de latencias) y
+--cycles tandas medidas. Compara tiempo de worker por tanda, cortes por
+timeout y DOWN falsos de las APIs lentas.
+
+Para que corra en segundos todo está escalado: el timeout fijo es --fixed
+(10s en producción) y el piso adaptativo --min (1s en producción).
+
+Uso:
+    python benchmarks/bench_timeouts.py [--fast 20] [--slow 2] [--hang-pct 10] [--fixed 2] [--min 0.2]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _handler(fixed: float, hang_pct: float, hanging: threading.Event, rnd: random.Random):
+    class H(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if self.path.startswith("/slow"):
+                time.sleep(fixed * 1.25)
+            else:
+                time.sleep(0.01)
+                if hanging.is_set() and rnd.random() * 100 < hang_pct:
+                    time.sleep(fixed * 3)
+            body = b'{"ok": true}'
+            try:
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except OSError:
+                pass  # el cliente ya cortó por timeout
+
+        def log_message(self, *args):
+            pass
+
+    return H
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+def _run(label, args, urls, hanging, adaptive: bool):
+    from core import checker, runner, timeouts
+    from core.state import ApiRuntimeState, RunnerState
+
+    # Escala: timeout fijo = --fixed, piso adaptativo = --min
+    checker.PROBE_TIMEOUT = runner.PROBE_TIMEOUT = args.fixed
+    checker.DEFAULT_TIMEOUT = (args.fixed, args.fixed)
+    timeouts.MIN_SECONDS = args.min
+    timeouts.ENABLED = adaptive
+
+    state = RunnerState()
+    for i, url in enumerate(urls, start=1):
+        state.add(ApiRuntimeState(i, f"api-{i}", url))
+
+    def cycle(metrics):
+        pending, samples = [], []
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for st in state:
+                runner._check_one(st, pending, samples, metrics, False, None)
+        return time.perf_counter() - t0, pending
+
+    hanging.clear()
+    for _ in range(args.warmup):
+        cycle(runner.CycleMetrics())
+
+    hanging.set()
+    total = 0.0
+    false_down = 0
+    cut = 0
+    saved = 0.0
+    last = None
+    for _ in range(args.cycles):
+        metrics = runner.CycleMetrics()
+        dt, pending = cycle(metrics)
+        total += dt
+        false_down += sum(1 for c in pending if "/slow" in c["result"]["api_url"] and c["result"]["status"] == "DOWN")
+        cut += sum(1 for c in pending if c["result"].get("timed_out"))
+        saved += metrics.timeout_saved
+        last = metrics
+
+    print(
+        f"{label:<11} {total / args.cycles:6.2f}s por tanda  {cut:4d} timeouts  "
+        f"{false_down:3d} DOWN falsos (lentas)  ahorro reportado {saved / args.cycles:5.2f}s/tanda"
+    )
+    if adaptive:
+        sample = [(st.name, st.timeout) for st in state][:1] + [(st.name, st.timeout) for st in state][-1:]
+        print(f"            timeouts aprendidos (connect, read): {sample}")
+        print(f"            última tanda: {last.summary()}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--fast", type=int, default=20)
+    ap.add_argument("--slow", type=int, default=2)
+    ap.add_argument("--hang-pct", type=float, default=10)
+    ap.add_argument("--fixed", type=float, default=2.0, help="timeout fijo (escalado; en producción 10s)")
+    ap.add_argument("--min", type=float, default=0.2, help="piso adaptativo (escalado; en producción 1s)")
+    ap.add_argument("--warmup", type=int, default=25)
+    ap.add_argument("--cycles", type=int, default=10)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_timeouts_")
+    os.environ["DB_PATH"] = os.path.join(tmp, "bench.db")
+
+    hanging = threading.Event()
+    httpd = _Server(("127.0.0.1", 0), _handler(args.fixed, args.hang_pct, hanging, random.Random(3)))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{httpd.server_port}"
+    urls = [f"{base}/fast/{i}" for i in range(args.fast)] + [f"{base}/slow/{i}" for i in range(args.slow)]
+
+    print(
+        f"{args.fast} APIs rápidas ({args.hang_pct:g}% de cuelgues) + {args.slow} lentas ({args.fixed * 1.25:g}s) · "
+        f"fijo {args.fixed:g}s · {args.warmup} tandas de warmup + {args.cycles} medidas"
+    )
+    _run("fijo", args, urls, hanging, adaptive=False)
+    _run("adaptativo", args, urls, hanging, adaptive=True)
+
+
+if __name__ == "__main__":
+    main()
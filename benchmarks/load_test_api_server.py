@@ -0,0 +1,174 @@
+"""
+Load test del servidor del dashboard: handlers sync (threadpool) vs async
+(hilo de DB dedicado).
+
+Levanta dos uvicorn de un worker sobre una DB temporal con datos sintéticos
+y dispara requests concurrentes contra /apis, /apis/{id}, /apis/{id}/logs y
+/stats/overview.
+
+Uso:
+    python benchmarks/load_test_api_server.py [--apis 200] [--logs 200] [--clients 64] [--requests 4000]
+"""
+import argparse
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+# -----------------------------------------------------------------------------
+# App "sync" equivalente a la versión anterior de core/api_server.py
+# -----------------------------------------------------------------------------
+
+def _build_sync_app():
+    from fastapi import FastAPI, HTTPException, Query
+    from core.logic import get_api, get_apis_with_state, get_logs, get_overview_stats
+
+    sync_app = FastAPI()
+
+    @sync_app.get("/stats/overview")
+    def overview():
+        return get_overview_stats()
+
+    @sync_app.get("/apis")
+    def list_apis():
+        return get_apis_with_state()
+
+    @sync_app.get("/apis/{api_id}")
+    def api_detail(api_id: int):
+        a = get_api(api_id)
+        if not a:
+            raise HTTPException(status_code=404, detail="API not found")
+        return a
+
+    @sync_app.get("/apis/{api_id}/logs")
+    def api_logs(api_id: int, limit: int = Query(200, ge=1, le=2000)):
+        if not get_api(api_id):
+            raise HTTPException(status_code=404, detail="API not found")
+        return get_logs(api_id, limit=limit)
+
+    return sync_app
+
+
+if os.getenv("LOAD_TEST_SYNC_APP") == "1":
+    sync_app = _build_sync_app()
+
+
+# -----------------------------------------------------------------------------
+# Datos y servidores
+# -----------------------------------------------------------------------------
+
+def _seed_db(n_apis: int, n_logs: int) -> None:
+    from core import logic
+
+    logic.add_APIs_bulk([(f"api-{i}", f"https://example.com/{i}") for i in range(n_apis)])
+    with logic._get_conn() as conn:
+        ids = [r["id"] for r in conn.execute("SELECT id FROM APIs;")]
+        conn.executemany(
+            """
+            INSERT INTO logs (api_id, status, status_code, latency, response)
+            VALUES (?, ?, ?, ?, ?);
+            """,
+            [
+                (api_id, "UP", 200, random.random(), "ok")
+                for api_id in ids
+                for _ in range(n_logs)
+            ],
+        )
+    for api_id in ids:
+        logic.update_state(api_id, "UP", 200, 0.1)
+
+
+def _start_server(app_ref: str, port: int, env: dict) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_ref, "--port", str(port), "--workers", "1", "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+    )
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{base}/stats/overview", timeout=1)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"uvicorn no levantó en {base}")
+
+
+def _run_load(base: str, n_apis: int, clients: int, total: int) -> dict:
+    paths = ["/apis", "/stats/overview"]
+    paths += [f"/apis/{i}" for i in range(1, n_apis + 1)]
+    paths += [f"/apis/{i}/logs?limit=100" for i in range(1, n_apis + 1)]
+    plan = [random.choice(paths) for _ in range(total)]
+
+    sessions = {}
+
+    def one(path: str) -> float:
+        import threading
+        s = sessions.setdefault(threading.get_ident(), requests.Session())
+        t0 = time.perf_counter()
+        r = s.get(base + path, timeout=30)
+        r.raise_for_status()
+        return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        lat = list(pool.map(one, plan))
+    elapsed = time.perf_counter() - t0
+
+    lat.sort()
+    return {
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(lat) * 1000,
+        "p95_ms": lat[int(len(lat) * 0.95) - 1] * 1000,
+        "max_ms": lat[-1] * 1000,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--apis", type=int, default=200)
+    ap.add_argument("--logs", type=int, default=200)
+    ap.add_argument("--clients", type=int, default=64)
+    ap.add_argument("--requests", type=int, default=4000)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="apimon-load-")
+    db_path = str(Path(tmp) / "load.db")
+    os.environ["DB_PATH"] = db_path
+    _seed_db(args.apis, args.logs)
+
+    env = dict(os.environ, DB_PATH=db_path, PYTHONPATH=str(ROOT))
+    modes = [
+        ("sync ", "benchmarks.load_test_api_server:sync_app", 8811, dict(env, LOAD_TEST_SYNC_APP="1")),
+        ("async", "core.api_server:app", 8812, env),
+    ]
+
+    print(f"APIs={args.apis} logs/API={args.logs} clients={args.clients} requests={args.requests}")
+    for label, app_ref, port, mode_env in modes:
+        proc = _start_server(app_ref, port, mode_env)
+        try:
+            _run_load(f"http://127.0.0.1:{port}", args.apis, args.clients, min(200, args.requests))  # warmup
+            r = _run_load(f"http://127.0.0.1:{port}", args.apis, args.clients, args.requests)
+        finally:
+            proc.terminate()
+            proc.wait()
+        print(
+            f"{label}: {r['rps']:8.1f} req/s | p50 {r['p50_ms']:7.1f} ms | "
+            f"p95 {r['p95_ms']:7.1f} ms | max {r['max_ms']:7.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Detección de anomalías de latencia (degradaciones lentas que no llegan a DOWN).
+
+Por cada API se mantiene, en arrays NumPy de tamaño fijo:
+- un ring buffer con las últimas WINDOW latencias "normales",
+- EWMA de media y varianza,
+- racha de muestras anómalas y si la API está DEGRADED.
+
+`update()` recibe las muestras de todo un ciclo y procesa todas las APIs a la
+vez (operaciones vectorizadas sobre filas), así que el costo es O(APIs) por
+ciclo y la memoria por API es constante.
+
+Necesita numpy: core/runner.py importa este módulo recién al arrancar y, si
+falta, sigue sin detector (como archive.py sin pyarrow/numpy).
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+WINDOW = 64            # muestras por API en el ring buffer
+ALPHA = 0.1            # peso de la muestra nueva en la EWMA
+Z_THRESHOLD = 4.0      # desvíos sobre la media para considerar anómala una muestra
+QUANTILE = 0.99        # además tiene que superar el p99 de la ventana
+MIN_DELTA = 0.05       # y estar al menos 50 ms por encima de la media
+MIN_SAMPLES = 20       # muestras necesarias antes de evaluar
+ENTER_STREAK = 3       # muestras anómalas seguidas para pasar a DEGRADED
+
+
+def _row_quantiles(buf: np.ndarray, n: np.ndarray, quantile: float) -> np.ndarray:
+    """
+    Cuantil por fila ignorando NaN (interpolación lineal, como np.quantile).
+    Ordena las filas una vez (los NaN quedan al final) y toma el índice según
+    cuántas muestras válidas tiene cada una; mucho más rápido que np.nanquantile.
+    """
+    s = np.sort(buf, axis=1)
+    pos = (np.maximum(n, 1) - 1) * quantile
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.minimum(lo + 1, np.maximum(n, 1) - 1)
+    frac = pos - lo
+    a = np.take_along_axis(s, lo[:, None], axis=1)[:, 0]
+    b = np.take_along_axis(s, hi[:, None], axis=1)[:, 0]
+    return a + (b - a) * frac
+
+
+class LatencyAnomalyDetector:
+    def __init__(self, capacity: int = 64, window: int = WINDOW):
+        self.window = window
+        self._row: Dict[int, int] = {}
+        self._free: List[int] = []
+        self._alloc(capacity)
+
+    def _alloc(self, capacity: int) -> None:
+        old = getattr(self, "_buf", None)
+        n = 0 if old is None else old.shape[0]
+
+        buf = np.full((capacity, self.window), np.nan, dtype=np.float32)
+        pos = np.zeros(capacity, dtype=np.int32)
+        count = np.zeros(capacity, dtype=np.int32)
+        mean = np.zeros(capacity, dtype=np.float64)
+        var = np.zeros(capacity, dtype=np.float64)
+        streak = np.zeros(capacity, dtype=np.int32)
+        degraded = np.zeros(capacity, dtype=bool)
+
+        if old is not None:
+            buf[:n] = self._buf
+            pos[:n] = self._pos
+            count[:n] = self._count
+            mean[:n] = self._mean
+            var[:n] = self._var
+            streak[:n] = self._streak
+            degraded[:n] = self._degraded
+
+        self._buf, self._pos, self._count = buf, pos, count
+        self._mean, self._var = mean, var
+        self._streak, self._degraded = streak, degraded
+        self._free.extend(range(capacity - 1, n - 1, -1))
+
+    def _rows_for(self, api_ids: Sequence[int]) -> np.ndarray:
+        rows = np.empty(len(api_ids), dtype=np.int64)
+        for i, api_id in enumerate(api_ids):
+            row = self._row.get(api_id)
+            if row is None:
+                if not self._free:
+                    self._alloc(self._buf.shape[0] * 2)
+                row = self._free.pop()
+                self._row[api_id] = row
+            rows[i] = row
+        return rows
+
+    def remove(self, api_id: int) -> None:
+        row = self._row.pop(api_id, None)
+        if row is None:
+            return
+        self._buf[row] = np.nan
+        self._pos[row] = self._count[row] = self._streak[row] = 0
+        self._mean[row] = self._var[row] = 0.0
+        self._degraded[row] = False
+        self._free.append(row)
+
+    def is_degraded(self, api_id: int) -> bool:
+        row = self._row.get(api_id)
+        return bool(row is not None and self._degraded[row])
+
+    def baseline(self, api_id: int) -> Optional[Tuple[float, float]]:
+        """
+        (media EWMA, p99 de la ventana) de una API, o None si no hay datos.
+        """
+        row = self._row.get(api_id)
+        if row is None or not self._count[row]:
+            return None
+        n = np.minimum(self._count[row:row + 1], self.window)
+        return float(self._mean[row]), float(_row_quantiles(self._buf[row:row + 1], n, QUANTILE)[0])
+
+    def update(self, api_ids: Sequence[int], latencies: Sequence[Optional[float]]):
+        """
+        Procesa las muestras del ciclo. Devuelve (degradadas, normalizadas):
+        listas de (api_id, latencia, media, p99) de las APIs que cambiaron de estado.
+        """
+        if not len(api_ids):
+            return [], []
+
+        rows = self._rows_for(api_ids)
+        x = np.asarray([np.nan if v is None else v for v in latencies], dtype=np.float64)
+        valid = ~np.isnan(x)
+        rows, x = rows[valid], x[valid]
+        if not rows.size:
+            return [], []
+
+        mean = self._mean[rows]
+        std = np.sqrt(self._var[rows])
+        count = self._count[rows]
+        ready = count >= MIN_SAMPLES
+
+        # p99 por fila de la ventana (solo filas con datos suficientes)
+        q = np.full(rows.size, np.inf)
+        if ready.any():
+            r = rows[ready]
+            q[ready] = _row_quantiles(self._buf[r], np.minimum(self._count[r], self.window), QUANTILE)
+
+        anomalous = ready & (x > mean + Z_THRESHOLD * std) & (x > q) & (x - mean > MIN_DELTA)
+
+        streak = np.where(anomalous, self._streak[rows] + 1, 0)
+        was = self._degraded[rows]
+        now = np.where(was, anomalous, streak >= ENTER_STREAK)
+        self._streak[rows] = streak
+        self._degraded[rows] = now
+
+        # Solo las muestras normales alimentan la línea base: una degradación
+        # sostenida no se "normaliza" sola.
+        ok = ~anomalous
+        r, v = rows[ok], x[ok]
+        first = self._count[r] == 0
+        delta = v - self._mean[r]
+        new_mean = np.where(first, v, self._mean[r] + ALPHA * delta)
+        new_var = np.where(first, 0.0, (1 - ALPHA) * (self._var[r] + ALPHA * delta * delta))
+        self._mean[r] = new_mean
+        self._var[r] = new_var
+        self._buf[r, self._pos[r]] = v
+        self._pos[r] = (self._pos[r] + 1) % self.window
+        self._count[r] = np.minimum(self._count[r] + 1, np.iinfo(np.int32).max)
+
+        entered = np.flatnonzero(now & ~was)
+        left = np.flatnonzero(was & ~now)
+        if not entered.size and not left.size:
+            return [], []
+
+        inv = {row: api_id for api_id, row in self._row.items()}
+        degraded = [(inv[int(rows[i])], float(x[i]), float(mean[i]), float(q[i])) for i in entered]
+        normalized = [(inv[int(rows[i])], float(x[i]), float(mean[i]), float(q[i])) for i in left]
+        return degraded, normalized
@@ -1,18 +1,26 @@
-from fastapi import FastAPI, HTTPException, Query, UploadFile, File
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Body
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from urllib.parse import urlparse
 
-from core.logic import (
-    add_API_database,
-    delete_api,
-    get_api,
-    get_apis_with_state,
-    get_logs,
-    get_overview_stats,
-)
+from core import async_logic as db
+from core import export, logic
+from core.checker import DEFAULT_PROBE, PROBES
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # uvicorn ya dejó de aceptar requests: se espera a que el hilo de DB
+    # termine lo que tenga en cola. Al runner (modo `both`) lo para
+    # main.cmd_both; acá no se toca el apagado del proceso.
+    db.shutdown()
+
 
-app = FastAPI(title="API Monitor Dashboard", version="1.0.0")
+app = FastAPI(title="API Monitor Dashboard", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,6 +34,24 @@ app.add_middleware(
 class ApiCreate(BaseModel):
     name: str
     url: str
+    probe: str | None = None  # http (default) | head | tcp | tls | dns
+
+
+class ProbeUpdate(BaseModel):
+    probe: str
+
+
+class TagsUpdate(BaseModel):
+    tags: list[str]
+
+
+def _parse_ids(ids: str | None) -> list[int] | None:
+    if not ids:
+        return None
+    try:
+        return [int(x) for x in ids.split(",") if x.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids debe ser una lista de enteros separada por comas")
 
 
 def _valid_url(u: str) -> bool:
@@ -42,51 +68,206 @@ def health():
 
 
 @app.get("/stats/overview")
-def overview():
-    return get_overview_stats()
+async def overview(group: str | None = None):
+    stats = await db.get_overview_stats(group)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return stats
+
+
+@app.get("/stats/latency")
+async def latency_stats(ids: str | None = None, since: str | None = None, until: str | None = None):
+    try:
+        return await db.get_latency_stats(_parse_ids(ids), since=since, until=until)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 
 @app.get("/apis")
-def list_apis():
-    return get_apis_with_state()
+async def list_apis(group: str | None = None):
+    apis = await db.get_apis_with_state(group)
+    if apis is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return apis
+
+
+@app.get("/groups")
+async def list_groups(kind: str | None = None):
+    return await db.get_groups(kind)
+
+
+@app.get("/apis/{api_id}/tags")
+async def api_tags(api_id: int):
+    a = await db.get_api(api_id)
+    if not a:
+        raise HTTPException(status_code=404, detail="API not found")
+    return await db.get_api_tags(api_id)
+
+
+@app.put("/apis/{api_id}/tags")
+async def put_api_tags(api_id: int, payload: TagsUpdate):
+    try:
+        ok = await db.set_api_tags(api_id, payload.tags)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not ok:
+        raise HTTPException(status_code=404, detail="API not found")
+    return {"ok": True}
 
 
 @app.get("/apis/{api_id}")
-def api_detail(api_id: int):
-    a = get_api(api_id)
+async def api_detail(api_id: int):
+    a = await db.get_api(api_id)
     if not a:
         raise HTTPException(status_code=404, detail="API not found")
     return a
 
 
 @app.get("/apis/{api_id}/logs")
-def api_logs(
+async def api_logs(
     api_id: int,
     limit: int = Query(200, ge=1, le=2000),
     since: str | None = None,
     until: str | None = None,
 ):
-    a = get_api(api_id)
+    a = await db.get_api(api_id)
+    if not a:
+        raise HTTPException(status_code=404, detail="API not found")
+    return await db.get_logs(api_id, limit=limit, since=since, until=until)
+
+
+@app.get("/logs/batch")
+async def logs_batch(
+    ids: str | None = None,
+    points: int = Query(60, ge=1, le=500),
+    minutes: int = Query(15, ge=1, le=1440),
+):
+    """
+    Series recientes de latencia/estado de varias APIs (todas sin `ids`) en
+    formato columnar, para los sparklines del dashboard en un solo request.
+    """
+    return await db.get_logs_batch(_parse_ids(ids), points=points, minutes=minutes)
+
+
+@app.get("/logs/export")
+def export_logs(
+    ids: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = True,
+    response: bool = True,
+):
+    """
+    Logs de una API, varias (?ids=1,2) o todas, en streaming y sin límite de
+    filas. El generador corre en el threadpool con su propia conexión, así que
+    un export largo no frena la cola del hilo de DB del dashboard.
+    """
+    chunks = logic.iter_logs(_parse_ids(ids), since=since, until=until, with_response=response)
+    media_type = "application/gzip" if gzip else export.FORMATS[format]
+    return StreamingResponse(
+        export.encode(chunks, format, gzip=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{export.filename(format, gzip)}"'},
+    )
+
+
+@app.get("/sla")
+async def sla_all():
+    return await db.get_sla()
+
+
+@app.get("/apis/{api_id}/sla")
+async def api_sla(api_id: int):
+    a = await db.get_api(api_id)
     if not a:
         raise HTTPException(status_code=404, detail="API not found")
-    return get_logs(api_id, limit=limit, since=since, until=until)
+    return (await db.get_sla([api_id]))[0]
+
+
+@app.get("/incidents")
+async def incidents(
+    limit: int = Query(100, ge=1, le=1000),
+    since: str | None = None,
+    until: str | None = None,
+    open_only: bool = False,
+):
+    return await db.get_incidents(limit=limit, since=since, until=until, open_only=open_only)
+
+
+@app.get("/apis/{api_id}/incidents")
+async def api_incidents(
+    api_id: int,
+    limit: int = Query(100, ge=1, le=1000),
+    since: str | None = None,
+    until: str | None = None,
+):
+    a = await db.get_api(api_id)
+    if not a:
+        raise HTTPException(status_code=404, detail="API not found")
+    return await db.get_incidents(api_id, limit=limit, since=since, until=until)
+
+
+@app.get("/apis/{api_id}/assertions")
+async def api_assertions(api_id: int):
+    a = await db.get_api(api_id)
+    if not a:
+        raise HTTPException(status_code=404, detail="API not found")
+    return await db.get_assertions(api_id) or {}
+
+
+@app.put("/apis/{api_id}/assertions")
+async def put_api_assertions(api_id: int, spec: dict = Body(...)):
+    a = await db.get_api(api_id)
+    if not a:
+        raise HTTPException(status_code=404, detail="API not found")
+    try:
+        await db.set_assertions(api_id, spec)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"ok": True}
+
+
+@app.delete("/apis/{api_id}/assertions")
+async def delete_api_assertions(api_id: int):
+    a = await db.get_api(api_id)
+    if not a:
+        raise HTTPException(status_code=404, detail="API not found")
+    await db.set_assertions(api_id, None)
+    return {"ok": True}
+
+
+@app.get("/probes")
+async def probes():
+    return {"default": DEFAULT_PROBE, "probes": sorted(PROBES)}
+
+
+@app.put("/apis/{api_id}/probe")
+async def put_api_probe(api_id: int, payload: ProbeUpdate):
+    try:
+        ok = await db.set_probe(api_id, payload.probe)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not ok:
+        raise HTTPException(status_code=404, detail="API not found")
+    return {"ok": True}
 
 
 @app.post("/apis")
-def create_api(payload: ApiCreate):
+async def create_api(payload: ApiCreate):
     try:
-        add_API_database(payload.name.strip(), payload.url.strip())
+        await db.add_API_database(payload.name.strip(), payload.url.strip(), payload.probe)
         return {"ok": True}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.delete("/apis/{api_id}")
-def remove_api(api_id: int):
-    a = get_api(api_id)
+async def remove_api(api_id: int):
+    a = await db.get_api(api_id)
     if not a:
         raise HTTPException(status_code=404, detail="API not found")
-    delete_api(api_id)
+    await db.delete_api(api_id)
     return {"ok": True}
 
 
@@ -100,6 +281,8 @@ async def upload_apis(file: UploadFile = File(...)):
     added = 0
     skipped = 0
     errors = []
+    # (lineno, valor original, name, url) que pasaron la validación de formato
+    candidates = []
 
     for lineno, line in enumerate(raw.splitlines(), start=1):
         s = line.strip()
@@ -121,16 +304,22 @@ async def upload_apis(file: UploadFile = File(...)):
             continue
 
         final_name = (name or url).strip()
+        candidates.append((lineno, s, final_name, url))
 
+    # Un solo viaje al hilo de DB (una transacción) para todo el archivo.
+    if candidates:
         try:
-            add_API_database(final_name, url)
-            added += 1
-        except ValueError as e:
-            skipped += 1
-            errors.append({"line": lineno, "value": s, "error": str(e)})
+            results = await db.add_APIs_bulk([(n, u) for _, _, n, u in candidates])
         except Exception as e:
-            skipped += 1
-            errors.append({"line": lineno, "value": s, "error": f"Unexpected: {e}"})
+            results = [f"Unexpected: {e}"] * len(candidates)
+
+        for (lineno, s, _, _), err in zip(candidates, results):
+            if err is None:
+                added += 1
+            else:
+                skipped += 1
+                errors.append({"line": lineno, "value": s, "error": err})
+        errors.sort(key=lambda x: x["line"])
 
     if added == 0:
         raise HTTPException(
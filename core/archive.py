@@ -0,0 +1,348 @@
+"""
+Archivo columnar de logs históricos (Parquet, un archivo por día y por shard).
+
+El runner mueve periódicamente los días "cerrados" (más viejos que
+ARCHIVE_KEEP_DAYS) de la tabla `logs` a:
+
+    <archivo>/day=YYYY-MM-DD/shard=NN.parquet      (shard = api_id % ARCHIVE_SHARDS)
+
+Así SQLite queda chico y el análisis de rangos largos (percentiles, tasa de
+error, histogramas) se hace vectorizado con Arrow/NumPy sin tocar la DB que el
+runner está escribiendo.
+
+pyarrow y numpy se importan recién al usar el archivo: sin ellos el monitor
+sigue funcionando, solo que no archiva.
+"""
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from core import bodies
+
+ARCHIVE_KEEP_DAYS = int(os.getenv("ARCHIVE_KEEP_DAYS", "7"))   # días que quedan en SQLite
+ARCHIVE_SHARDS = int(os.getenv("ARCHIVE_SHARDS", "4"))
+CHUNK_ROWS = 50_000
+
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+LATENCY_BINS = (0.0, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, float("inf"))
+
+COLUMNS = ("id", "api_id", "status", "status_code", "latency", "response", "timestamp")
+
+
+def _require_arrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("El archivo de logs necesita pyarrow (pip install pyarrow numpy).") from e
+    return pa, pq
+
+
+def _require_numpy():
+    try:
+        import numpy as np
+    except ImportError as e:
+        raise RuntimeError("El archivo de logs necesita numpy (pip install pyarrow numpy).") from e
+    return np
+
+
+def available() -> bool:
+    try:
+        _require_arrow()
+        _require_numpy()
+    except RuntimeError:
+        return False
+    return True
+
+
+def archive_root(db_path: Path) -> Path:
+    override = os.getenv("LOG_ARCHIVE_DIR")
+    if override:
+        return Path(override)
+    db_path = Path(db_path)
+    return db_path.parent / f"{db_path.stem}_archive"
+
+
+def _schema():
+    pa, _ = _require_arrow()
+    return pa.schema([
+        ("id", pa.int64()),
+        ("api_id", pa.int32()),
+        ("status", pa.string()),
+        ("status_code", pa.int32()),
+        ("latency", pa.float64()),
+        ("response", pa.string()),
+        ("timestamp", pa.string()),
+    ])
+
+
+def _shard_path(root: Path, day: str, shard: int) -> Path:
+    return root / f"day={day}" / f"shard={shard:02d}.parquet"
+
+
+def _days(root: Path, since: Optional[str] = None, until: Optional[str] = None) -> List[str]:
+    """
+    Días archivados (YYYY-MM-DD) dentro del rango, del más viejo al más nuevo.
+    """
+    if not root.exists():
+        return []
+    out = []
+    for p in root.iterdir():
+        if not p.is_dir() or not p.name.startswith("day="):
+            continue
+        day = p.name[4:]
+        if since and day < since[:10]:
+            continue
+        if until and day > until[:10]:
+            continue
+        out.append(day)
+    return sorted(out)
+
+
+def has_data(root: Path) -> bool:
+    return bool(_days(root))
+
+
+# ------ ESCRITURA ------
+
+def _archive_day(conn, root: Path, day: str, next_day: str, db_key: str) -> int:
+    pa, pq = _require_arrow()
+    schema = _schema()
+    tmp_paths: Dict[int, Path] = {}
+    writers: Dict[int, Any] = {}
+
+    # Si un archivado anterior se cortó entre escribir y borrar, el archivo ya
+    # existe: se reescribe con sus filas primero y se descartan ids repetidos.
+    seen_ids: Dict[int, set] = {}
+
+    def writer_for(shard: int):
+        if shard not in writers:
+            final = _shard_path(root, day, shard)
+            final.parent.mkdir(parents=True, exist_ok=True)
+            tmp = final.with_suffix(".parquet.tmp")
+            w = pq.ParquetWriter(tmp, schema, compression="zstd")
+            seen_ids[shard] = set()
+            if final.exists():
+                old = pq.read_table(final, schema=schema)
+                w.write_table(old)
+                seen_ids[shard] = set(old.column("id").to_pylist())
+            writers[shard] = w
+            tmp_paths[shard] = tmp
+        return writers[shard]
+
+    cur = conn.execute(
+        """
+        SELECT id, api_id, status, status_code, latency, response, body_id, timestamp
+        FROM logs
+        WHERE timestamp >= ? AND timestamp < ?
+        ORDER BY id;
+        """,
+        (day, next_day),
+    )
+    max_id = 0
+    total = 0
+    try:
+        while True:
+            chunk = cur.fetchmany(CHUNK_ROWS)
+            if not chunk:
+                break
+            rows = bodies.rehydrate(conn, [dict(r) for r in chunk], db_key)
+            by_shard: Dict[int, List[Dict[str, Any]]] = {}
+            for r in rows:
+                by_shard.setdefault(r["api_id"] % ARCHIVE_SHARDS, []).append(r)
+            for shard, shard_rows in by_shard.items():
+                w = writer_for(shard)
+                shard_rows = [r for r in shard_rows if r["id"] not in seen_ids[shard]]
+                if shard_rows:
+                    w.write_table(pa.Table.from_pylist(shard_rows, schema=schema))
+            max_id = max(max_id, chunk[-1]["id"])
+            total += len(chunk)
+    finally:
+        for w in writers.values():
+            w.close()
+
+    for shard, tmp in tmp_paths.items():
+        os.replace(tmp, _shard_path(root, day, shard))
+
+    with conn:
+        conn.execute(
+            "DELETE FROM logs WHERE timestamp >= ? AND timestamp < ? AND id <= ?;",
+            (day, next_day, max_id),
+        )
+    return total
+
+
+def archive_closed_days(conn, root: Path, tz_mod: str, db_key: str, keep_days: int = ARCHIVE_KEEP_DAYS) -> Dict[str, int]:
+    """
+    Mueve al archivo todos los días de logs anteriores a hoy - keep_days.
+    Un día por vez, del más viejo al más nuevo (MIN(timestamp) usa el índice).
+    """
+    cutoff = conn.execute("SELECT date('now', ?, ?);", (tz_mod, f"-{int(keep_days)} days")).fetchone()[0]
+    days = 0
+    rows = 0
+    while True:
+        oldest = conn.execute("SELECT MIN(timestamp) FROM logs;").fetchone()[0]
+        if not oldest or oldest[:10] >= cutoff:
+            break
+        day = oldest[:10]
+        next_day = conn.execute("SELECT date(?, '+1 day');", (day,)).fetchone()[0]
+        rows += _archive_day(conn, root, day, next_day, db_key)
+        days += 1
+    return {"days": days, "rows": rows}
+
+
+# ------ LECTURA ------
+
+def iter_rows(
+    root: Path,
+    api_ids: Optional[Iterable[int]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    newest_first: bool = False,
+    columns: Iterable[str] = COLUMNS,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Recorre las filas archivadas día por día (memoria acotada a un shard-día).
+    """
+    _, pq = _require_arrow()
+    ids = None if api_ids is None else set(int(x) for x in api_ids)
+    shards = None if ids is None else sorted({i % ARCHIVE_SHARDS for i in ids})
+    columns = list(columns)
+
+    days = _days(root, since, until)
+    if newest_first:
+        days.reverse()
+
+    for day in days:
+        day_rows: List[Dict[str, Any]] = []
+        for shard in (shards if shards is not None else range(ARCHIVE_SHARDS)):
+            path = _shard_path(root, day, shard)
+            if not path.exists():
+                continue
+            filters = [("api_id", "in", sorted(ids))] if ids is not None else None
+            day_rows.extend(pq.read_table(path, columns=columns, filters=filters).to_pylist())
+
+        day_rows.sort(key=lambda r: (r["timestamp"], r["id"]), reverse=newest_first)
+        for r in day_rows:
+            if since and r["timestamp"] < since:
+                continue
+            if until and r["timestamp"] > until:
+                continue
+            yield r
+
+
+def read_logs(
+    root: Path,
+    api_id: int,
+    limit: int,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Los `limit` logs archivados más recientes de una API (mismo formato que get_logs).
+    """
+    out = []
+    for r in iter_rows(root, [api_id], since, until, newest_first=True):
+        out.append(r)
+        if len(out) >= limit:
+            break
+    return out
+
+
+def live_arrays(cursor, chunk_rows: int = 50_000) -> Dict[str, Any]:
+    """
+    Filas (api_id, up, latency) de un cursor de SQLite a arrays de numpy, de a
+    `chunk_rows`: en ningún momento hay más que un chunk como objetos de Python.
+    """
+    np = _require_numpy()
+    api_parts, up_parts, lat_parts = [], [], []
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            break
+        api, up, lat = zip(*rows)
+        api_parts.append(np.array(api, dtype=np.int64))
+        up_parts.append(np.array(up, dtype=bool))
+        lat_parts.append(np.array(lat, dtype=np.float64))  # None -> nan
+    if not api_parts:
+        return {"api_id": np.zeros(0, np.int64), "up": np.zeros(0, bool), "latency": np.zeros(0)}
+    return {"api_id": np.concatenate(api_parts), "up": np.concatenate(up_parts), "latency": np.concatenate(lat_parts)}
+
+
+def latency_stats(
+    root: Path,
+    api_ids: Optional[Iterable[int]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    live: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Percentiles de latencia, tasa de error e histograma por API, vectorizado.
+    `live` permite sumar filas de SQLite (salida de `live_arrays`).
+    """
+    pa, _ = _require_arrow()
+    np = _require_numpy()
+
+    api_parts, up_parts, lat_parts = [], [], []
+
+    if has_data(root):
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+
+        paths = [
+            str(p)
+            for day in _days(root, since, until)
+            for p in sorted((root / f"day={day}").glob("shard=*.parquet"))
+        ]
+        if paths:
+            dataset = ds.dataset(paths, format="parquet", schema=_schema())
+            expr = None
+            if api_ids is not None:
+                expr = ds.field("api_id").isin(sorted(set(int(x) for x in api_ids)))
+            if since:
+                e = ds.field("timestamp") >= since
+                expr = e if expr is None else expr & e
+            if until:
+                e = ds.field("timestamp") <= until
+                expr = e if expr is None else expr & e
+            t = dataset.to_table(columns=["api_id", "status", "latency"], filter=expr)
+            api_parts.append(t.column("api_id").to_numpy())
+            up_parts.append(pc.equal(t.column("status"), "UP").fill_null(False).to_numpy(zero_copy_only=False))
+            lat_parts.append(pc.fill_null(pc.cast(t.column("latency"), pa.float64()), float("nan")).to_numpy())
+
+    if live and live["api_id"].size:
+        api_parts.append(live["api_id"])
+        up_parts.append(live["up"])
+        lat_parts.append(live["latency"])
+
+    edges = np.asarray(LATENCY_BINS)
+    labels = [f"{lo:g}-{hi:g}s" if hi != float("inf") else f">={lo:g}s" for lo, hi in zip(edges[:-1], edges[1:])]
+
+    def summarize(up, lat) -> Dict[str, Any]:
+        valid = lat[~np.isnan(lat)]
+        pct = np.percentile(valid, LATENCY_PERCENTILES) if valid.size else [None] * len(LATENCY_PERCENTILES)
+        hist, _ = np.histogram(valid, bins=edges)
+        return {
+            "checks": int(up.size),
+            "error_rate": round(float(1.0 - up.mean()), 6) if up.size else None,
+            "latency": {f"p{p}": (None if v is None else round(float(v), 6)) for p, v in zip(LATENCY_PERCENTILES, pct)},
+            "histogram": dict(zip(labels, hist.tolist())),
+        }
+
+    if not api_parts:
+        return {"bins": labels, "apis": {}, "all": summarize(np.zeros(0, bool), np.zeros(0))}
+
+    api = np.concatenate(api_parts)
+    up = np.concatenate(up_parts)
+    lat = np.concatenate(lat_parts)
+
+    order = np.argsort(api, kind="stable")
+    api, up, lat = api[order], up[order], lat[order]
+    uniq, starts = np.unique(api, return_index=True)
+    bounds = list(starts[1:]) + [api.size]
+
+    per_api = {
+        int(a): summarize(up[s:e], lat[s:e])
+        for a, s, e in zip(uniq, starts, bounds)
+    }
+    return {"bins": labels, "apis": per_api, "all": summarize(up, lat)}
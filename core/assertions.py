@@ -0,0 +1,223 @@
+"""
+Assertions por API: qué tiene que cumplir una respuesta para contar como UP.
+
+Spec (JSON guardado en api_assertions.spec), todas las claves opcionales:
+
+    {
+      "status": [200, 204],                 # códigos aceptados (default: < 400)
+      "max_latency_ms": 800,
+      "body_contains": "ok",
+      "body_regex": "\\"status\\":\\s*\\"ok\\"",
+      "json_equals": [{"path": "data.items.0.state", "equals": "ready"}],
+      "headers_present": ["X-Request-Id"]
+    }
+
+El spec se compila una vez a matchers (regex precompilado, path ya partido,
+headers en minúscula) y el runner lo cachea en el estado de cada API hasta
+que cambia. Evaluar es barato: el JSON se parsea a lo sumo una vez por check
+y solo si algún matcher lo necesita.
+
+No todos los probes pueden evaluar todo: HEAD no baja cuerpo y tcp/tls/dns
+no hablan HTTP (de esos solo se evalúa max_latency_ms). Ver
+PROBE_ASSERTION_KEYS.
+"""
+import json
+import re
+from typing import Any, Dict, List, Mapping, Optional
+
+MAX_BODY_BYTES = 64 * 1024   # cuánto cuerpo se lee (streaming) cuando una assertion lo necesita
+
+# Claves que admite cada probe; los que no figuran (http) admiten todas.
+_LATENCY_ONLY = frozenset({"max_latency_ms"})
+PROBE_ASSERTION_KEYS = {
+    "head": frozenset({"status", "max_latency_ms", "headers_present"}),
+    "tcp": _LATENCY_ONLY,
+    "tls": _LATENCY_ONLY,
+    "dns": _LATENCY_ONLY,
+}
+
+_MISSING = object()
+
+
+class _Ctx:
+    __slots__ = ("status_code", "elapsed", "headers", "body", "_json")
+
+    def __init__(self, status_code, elapsed, headers, body):
+        self.status_code = status_code
+        self.elapsed = elapsed
+        self.headers = headers
+        self.body = body
+        self._json = _MISSING
+
+    def json(self):
+        if self._json is _MISSING:
+            try:
+                self._json = json.loads(self.body or "")
+            except ValueError:
+                self._json = None
+        return self._json
+
+
+class StatusIn:
+    __slots__ = ("codes",)
+    needs_body = False
+
+    def __init__(self, codes):
+        self.codes = frozenset(int(c) for c in codes)
+
+    def check(self, ctx: _Ctx) -> Optional[str]:
+        if ctx.status_code in self.codes:
+            return None
+        return f"status {ctx.status_code} no está en {sorted(self.codes)}"
+
+
+class MaxLatency:
+    __slots__ = ("seconds",)
+    needs_body = False
+
+    def __init__(self, ms):
+        self.seconds = float(ms) / 1000.0
+
+    def check(self, ctx: _Ctx) -> Optional[str]:
+        if ctx.elapsed is None or ctx.elapsed <= self.seconds:
+            return None
+        return f"latencia {ctx.elapsed * 1000:.0f}ms > {self.seconds * 1000:.0f}ms"
+
+
+class BodyContains:
+    __slots__ = ("needle",)
+    needs_body = True
+
+    def __init__(self, needle):
+        self.needle = str(needle)
+
+    def check(self, ctx: _Ctx) -> Optional[str]:
+        if self.needle in (ctx.body or ""):
+            return None
+        return f"body no contiene {self.needle!r}"
+
+
+class BodyRegex:
+    __slots__ = ("pattern",)
+    needs_body = True
+
+    def __init__(self, pattern):
+        try:
+            self.pattern = re.compile(str(pattern))
+        except re.error as e:
+            raise ValueError(f"body_regex inválido: {e}")
+
+    def check(self, ctx: _Ctx) -> Optional[str]:
+        if self.pattern.search(ctx.body or ""):
+            return None
+        return f"body no matchea /{self.pattern.pattern}/"
+
+
+class JsonPathEquals:
+    __slots__ = ("path", "parts", "expected")
+    needs_body = True
+
+    def __init__(self, path, expected):
+        self.path = str(path)
+        self.parts = [int(p) if p.isdigit() else p for p in self.path.split(".") if p]
+        if not self.parts:
+            raise ValueError("json_equals.path vacío")
+        self.expected = expected
+
+    def check(self, ctx: _Ctx) -> Optional[str]:
+        cur = ctx.json()
+        for p in self.parts:
+            if isinstance(p, int) and isinstance(cur, list) and p < len(cur):
+                cur = cur[p]
+            elif isinstance(cur, dict) and str(p) in cur:
+                cur = cur[str(p)]
+            else:
+                return f"json {self.path} no existe"
+        if cur == self.expected:
+            return None
+        return f"json {self.path} = {cur!r} (esperado {self.expected!r})"
+
+
+class HeaderPresent:
+    __slots__ = ("name",)
+    needs_body = False
+
+    def __init__(self, name):
+        self.name = str(name).lower()
+
+    def check(self, ctx: _Ctx) -> Optional[str]:
+        if self.name in ctx.headers:
+            return None
+        return f"falta header {self.name}"
+
+
+class AssertionSet:
+    __slots__ = ("matchers", "has_status", "needs_body")
+
+    def __init__(self, matchers: List[Any]):
+        self.matchers = matchers
+        self.has_status = any(isinstance(m, StatusIn) for m in matchers)
+        self.needs_body = any(m.needs_body for m in matchers)
+
+    def evaluate(self, status_code: int, elapsed: Optional[float], headers: Mapping[str, str], body: Optional[str]) -> List[str]:
+        """
+        Lista de fallas (vacía = OK). `headers` case-insensitive (como los de
+        requests) o con claves en minúscula.
+        """
+        ctx = _Ctx(status_code, elapsed, headers, body)
+        out = []
+        for m in self.matchers:
+            err = m.check(ctx)
+            if err:
+                out.append(err)
+        return out
+
+
+def compile_assertions(spec: Optional[Dict[str, Any]]) -> Optional[AssertionSet]:
+    """
+    Compila un spec a AssertionSet. None/{} -> None (regla por defecto).
+    ValueError si el spec es inválido.
+    """
+    if not spec:
+        return None
+    if not isinstance(spec, dict):
+        raise ValueError("El spec de assertions tiene que ser un objeto JSON.")
+
+    known = {"status", "max_latency_ms", "body_contains", "body_regex", "json_equals", "headers_present"}
+    unknown = set(spec) - known
+    if unknown:
+        raise ValueError(f"Assertions desconocidas: {sorted(unknown)}")
+
+    matchers: List[Any] = []
+    try:
+        if spec.get("status") is not None:
+            codes = spec["status"] if isinstance(spec["status"], list) else [spec["status"]]
+            matchers.append(StatusIn(codes))
+        if spec.get("max_latency_ms") is not None:
+            matchers.append(MaxLatency(spec["max_latency_ms"]))
+        if spec.get("body_contains"):
+            matchers.append(BodyContains(spec["body_contains"]))
+        if spec.get("body_regex"):
+            matchers.append(BodyRegex(spec["body_regex"]))
+        for item in spec.get("json_equals") or []:
+            matchers.append(JsonPathEquals(item["path"], item.get("equals")))
+        for name in spec.get("headers_present") or []:
+            matchers.append(HeaderPresent(name))
+    except (TypeError, KeyError) as e:
+        raise ValueError(f"Spec de assertions inválido: {e}")
+
+    return AssertionSet(matchers) if matchers else None
+
+
+def check_probe_assertions(probe: Optional[str], spec: Optional[Dict[str, Any]]) -> None:
+    """
+    ValueError si el spec usa claves que el probe no puede evaluar.
+    """
+    allowed = PROBE_ASSERTION_KEYS.get(probe)
+    if not spec or allowed is None:
+        return
+    extra = set(spec) - allowed
+    if extra:
+        raise ValueError(
+            f"El probe {probe} no puede evaluar {sorted(extra)} (admite: {', '.join(sorted(allowed))})."
+        )
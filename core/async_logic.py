@@ -0,0 +1,127 @@
+"""
+Capa async sobre core/logic.py para el servidor FastAPI.
+
+Todas las llamadas a SQLite corren en un único hilo dedicado (con su propia
+conexión persistente) y el event loop solo espera el resultado. Así un worker
+de uvicorn atiende muchos clientes del dashboard sin ocupar un hilo del
+threadpool por request ni bloquear el loop con I/O de disco.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core import logic
+
+# Un solo hilo = una cola FIFO de pedidos a la DB. Se crea en el primer uso
+# (y de nuevo si el servidor arranca otra vez en el mismo proceso).
+_DB_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _DB_EXECUTOR
+    with _executor_lock:
+        if _DB_EXECUTOR is None:
+            _DB_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+        return _DB_EXECUTOR
+
+
+async def run_db(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown() -> None:
+    """
+    Espera a que terminen las operaciones encoladas (al apagar el servidor).
+    El próximo run_db arranca un hilo nuevo.
+    """
+    global _DB_EXECUTOR
+    with _executor_lock:
+        executor, _DB_EXECUTOR = _DB_EXECUTOR, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+# ------ LECTURA ------
+
+async def get_api(api_id: int) -> Optional[Dict[str, Any]]:
+    return await run_db(logic.get_api, api_id)
+
+
+async def get_apis_with_state(group: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    return await run_db(logic.get_apis_with_state, group)
+
+
+async def get_logs(api_id: int, limit: int = 200, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict[str, Any]]:
+    return await run_db(logic.get_logs, api_id, limit=limit, since=since, until=until)
+
+
+async def get_logs_batch(api_ids: Optional[List[int]] = None, points: int = 60, minutes: int = 15) -> Dict[str, Any]:
+    return await run_db(logic.get_logs_batch, api_ids, points=points, minutes=minutes)
+
+
+async def get_latency_stats(
+    api_ids: Optional[List[int]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> Dict[str, Any]:
+    return await run_db(logic.get_latency_stats, api_ids, since=since, until=until)
+
+
+async def get_overview_stats(group: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    return await run_db(logic.get_overview_stats, group)
+
+
+async def get_groups(kind: Optional[str] = None) -> List[Dict[str, Any]]:
+    return await run_db(logic.get_groups, kind)
+
+
+async def get_api_tags(api_id: int) -> List[str]:
+    return await run_db(logic.get_api_tags, api_id)
+
+
+async def get_sla(api_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    return await run_db(logic.get_sla, api_ids)
+
+
+async def get_incidents(
+    api_id: Optional[int] = None,
+    limit: int = 100,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    open_only: bool = False,
+) -> List[Dict[str, Any]]:
+    return await run_db(logic.get_incidents, api_id, limit=limit, since=since, until=until, open_only=open_only)
+
+
+async def get_assertions(api_id: int) -> Optional[Dict[str, Any]]:
+    return await run_db(logic.get_assertions, api_id)
+
+
+# ------ ESCRITURA ------
+
+async def add_API_database(api_name: str, api_url: str, probe: Optional[str] = None) -> None:
+    await run_db(logic.add_API_database, api_name, api_url, probe)
+
+
+async def add_APIs_bulk(items: List[Tuple[str, str]]) -> List[Optional[str]]:
+    return await run_db(logic.add_APIs_bulk, items)
+
+
+async def delete_api(api_id: int) -> None:
+    await run_db(logic.delete_api, api_id)
+
+
+async def set_assertions(api_id: int, spec: Optional[Dict[str, Any]]) -> None:
+    await run_db(logic.set_assertions, api_id, spec)
+
+
+async def set_probe(api_id: int, probe: str) -> bool:
+    return await run_db(logic.set_probe, api_id, probe)
+
+
+async def set_api_tags(api_id: int, tags: List[str]) -> bool:
+    return await run_db(logic.set_api_tags, api_id, tags)
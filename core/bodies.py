@@ -0,0 +1,203 @@
+"""
+Almacenamiento deduplicado de cuerpos de respuesta para `logs`.
+
+Una API sana devuelve el mismo texto miles de veces; en vez de repetirlo en
+cada fila, `logs.body_id` apunta a `response_bodies` (hash -> cuerpo). Los
+cuerpos grandes se guardan comprimidos con zlib. Los ids son inmutables, así
+que se cachean en memoria con un LRU chico (hash -> id al escribir, id ->
+texto al leer). Un id recién insertado recién se cachea cuando su
+transacción commitea (ver `publish`): tras un rollback no existe.
+
+Las funciones reciben la conexión, igual que core/sla.py.
+"""
+import hashlib
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+COMPRESS_MIN_BYTES = 256   # por debajo no vale la pena comprimir
+CACHE_SIZE = 4096
+
+
+class LRUCache:
+    """
+    LRU mínimo y thread-safe sobre OrderedDict.
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Any, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# Las claves incluyen la ruta de la DB: los ids solo valen dentro de un archivo.
+_ids_by_hash = LRUCache()
+_text_by_id = LRUCache()
+
+
+def _db_key(conn: sqlite3.Connection) -> str:
+    return conn.execute("PRAGMA database_list;").fetchone()[2]
+
+
+def _encode(text: str):
+    raw = text.encode("utf-8")
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            return packed, 1, len(raw)
+    return raw, 0, len(raw)
+
+
+def _decode(body: bytes, compressed: int) -> str:
+    if compressed:
+        body = zlib.decompress(body)
+    return body.decode("utf-8", errors="replace")
+
+
+# ------ ESCRITURA ------
+
+def body_id_for(
+    conn: sqlite3.Connection,
+    text: Optional[str],
+    db_key: Optional[str] = None,
+    new_ids: Optional[Dict[Any, int]] = None,
+) -> Optional[int]:
+    """
+    Id del cuerpo en response_bodies (lo inserta si es nuevo).
+
+    Los ids insertados en la transacción en curso van a `new_ids` y no al
+    cache: el llamador los pasa a `publish` después del commit. Sin `new_ids`
+    solo se cachean cuerpos que ya estaban en la tabla.
+    """
+    if text is None:
+        return None
+
+    db_key = db_key or _db_key(conn)
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+    key = (db_key, digest)
+    cached = _ids_by_hash.get(key)
+    if cached is None and new_ids is not None:
+        cached = new_ids.get(key)
+    if cached is not None:
+        return cached
+
+    body, compressed, size = _encode(text)
+    cur = conn.execute(
+        "INSERT OR IGNORE INTO response_bodies (hash, body, compressed, size) VALUES (?, ?, ?, ?);",
+        (digest, body, compressed, size),
+    )
+    body_id = conn.execute("SELECT id FROM response_bodies WHERE hash = ?;", (digest,)).fetchone()[0]
+    if cur.rowcount:
+        if new_ids is not None:
+            new_ids[key] = body_id
+    else:
+        _ids_by_hash.put(key, body_id)
+    return body_id
+
+
+def publish(new_ids: Dict[Any, int]) -> None:
+    """
+    Cachea los ids de `body_id_for(..., new_ids=...)` una vez commiteados.
+    """
+    for key, body_id in new_ids.items():
+        _ids_by_hash.put(key, body_id)
+
+
+def migrate_log_bodies(conn: sqlite3.Connection, batch_size: int = 1000, db_key: Optional[str] = None) -> int:
+    """
+    Pasa las filas viejas de logs (response en texto) a body_id, de a lotes con
+    commit entre cada uno para no bloquear al runner. Devuelve cuántas migró.
+    """
+    db_key = db_key or _db_key(conn)
+    migrated = 0
+    last_id = 0
+
+    while True:
+        rows = conn.execute(
+            """
+            SELECT id, response FROM logs
+            WHERE id > ? AND body_id IS NULL AND response IS NOT NULL
+            ORDER BY id
+            LIMIT ?;
+            """,
+            (last_id, batch_size),
+        ).fetchall()
+        if not rows:
+            return migrated
+
+        new_ids: Dict[Any, int] = {}
+        with conn:
+            conn.executemany(
+                "UPDATE logs SET body_id = ?, response = NULL WHERE id = ?;",
+                [(body_id_for(conn, r[1], db_key, new_ids), r[0]) for r in rows],
+            )
+        publish(new_ids)
+        migrated += len(rows)
+        last_id = rows[-1][0]
+
+
+# ------ LECTURA ------
+
+def load_bodies(conn: sqlite3.Connection, body_ids: Iterable[int], db_key: Optional[str] = None) -> Dict[int, str]:
+    db_key = db_key or _db_key(conn)
+    out: Dict[int, str] = {}
+    missing: List[int] = []
+
+    for body_id in set(body_ids):
+        text = _text_by_id.get((db_key, body_id))
+        if text is None:
+            missing.append(body_id)
+        else:
+            out[body_id] = text
+
+    for i in range(0, len(missing), 500):
+        chunk = missing[i:i + 500]
+        rows = conn.execute(
+            f"SELECT id, body, compressed FROM response_bodies WHERE id IN ({','.join('?' * len(chunk))});",
+            chunk,
+        ).fetchall()
+        for body_id, body, compressed in rows:
+            text = _decode(body, compressed)
+            _text_by_id.put((db_key, body_id), text)
+            out[body_id] = text
+    return out
+
+
+def rehydrate(conn: sqlite3.Connection, rows: List[Dict[str, Any]], db_key: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Reemplaza body_id por el texto en `response` (in place) y devuelve las filas.
+    """
+    ids = [r["body_id"] for r in rows if r.get("body_id") is not None]
+    bodies = load_bodies(conn, ids, db_key) if ids else {}
+    for r in rows:
+        body_id = r.pop("body_id", None)
+        if body_id is not None:
+            r["response"] = bodies.get(body_id)
+    return rows
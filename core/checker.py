@@ -1,7 +1,26 @@
-import requests
+import os
+import socket
+import ssl
 import time
 import math
-from typing import Dict, Any
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Callable, Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+
+from core.assertions import AssertionSet, MAX_BODY_BYTES, MaxLatency
+
+# `requests` se importa adentro de los probes HTTP (~100ms de import): así
+# core.logic puede validar nombres de probe sin cargarlo (CLI `add`, bot).
+if TYPE_CHECKING:
+    import requests
+
+LOG_BODY_CHARS = 200   # cuánto cuerpo se guarda en logs
+PROBE_TIMEOUT = 10     # timeout por defecto (segundos), también el de check_api
+DEFAULT_TIMEOUT = (PROBE_TIMEOUT, PROBE_TIMEOUT)
+
+Timeout = Tuple[float, float]   # (connect, read) en segundos, ver core/timeouts.py
+TLS_MIN_DAYS = int(os.getenv("TLS_MIN_DAYS", "7"))   # cert que vence antes de esto -> DOWN
+TLS_CA_FILE = os.getenv("TLS_CA_FILE") or None       # CA extra (p.ej. certs internos)
 
 # ===== PARÁMETROS ONDA SENOIDAL (DEMO) =====
 BASE_LATENCY = 0.3     # segundos base
@@ -20,25 +39,89 @@ def _sine_latency() -> float:
     )
 
 
-def check_api(api_url: str) -> Dict[str, Any]:
+def _read_body(response: "requests.Response", limit: int) -> str:
+    """
+    Lee a lo sumo `limit` bytes del cuerpo (streaming) y lo decodifica.
+    """
+    buf = bytearray()
+    for chunk in response.iter_content(chunk_size=8192):
+        buf.extend(chunk)
+        if len(buf) >= limit:
+            break
+    return bytes(buf[:limit]).decode(response.encoding or "utf-8", errors="replace")
+
+
+def _is_read_timeout(exc: BaseException) -> bool:
     """
-    GET con timeout.
+    True si en la cadena de la excepción hay un ReadTimeoutError de urllib3.
+    """
+    from urllib3.exceptions import ReadTimeoutError
+
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        if isinstance(exc, ReadTimeoutError) or any(isinstance(a, ReadTimeoutError) for a in exc.args):
+            return True
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+def check_api(api_url: str, assertions: Optional[AssertionSet] = None, timeout: Optional[Timeout] = None) -> Dict[str, Any]:
+    """
+    GET con timeout (connect, read); sin `timeout` usa DEFAULT_TIMEOUT.
     Latencia forzada a onda senoidal (modo demo visual).
+
+    Con `assertions` (ver core/assertions.py) la respuesta además tiene que
+    cumplirlas para contar como UP; el cuerpo se lee acotado y en streaming.
     """
+    import requests
+
     headers = {"User-Agent": "API-Monitor/1.0"}
+    t0 = time.perf_counter()
 
     try:
-        response = requests.get(api_url, timeout=10, headers=headers)
+        with requests.get(api_url, timeout=timeout or DEFAULT_TIMEOUT, headers=headers, stream=True) as response:
+            limit = MAX_BODY_BYTES if assertions is not None and assertions.needs_body else LOG_BODY_CHARS * 4
+            try:
+                body = _read_body(response, limit)
+            except requests.exceptions.ConnectionError as e:
+                # Con stream=True un read timeout leyendo el cuerpo llega como
+                # ConnectionError (envuelve el ReadTimeoutError de urllib3).
+                if not _is_read_timeout(e):
+                    raise
+                raise requests.exceptions.ReadTimeout(str(e)) from e
+            elapsed = time.perf_counter() - t0
 
         latency = _sine_latency()
-        status = "UP" if response.status_code < 400 else "DOWN"
+        text = body[:LOG_BODY_CHARS]
+
+        if assertions is None:
+            status = "UP" if response.status_code < 400 else "DOWN"
+            return {
+                "api_url": api_url,
+                "status": status,
+                "status_code": response.status_code,
+                "latency": latency,
+                "elapsed": elapsed,  # latencia real (detector de anomalías)
+                "response": text,
+            }
+
+        a0 = time.perf_counter()
+        failures = assertions.evaluate(response.status_code, elapsed, response.headers, body)
+        assert_seconds = time.perf_counter() - a0
+
+        if not assertions.has_status and response.status_code >= 400:
+            failures.insert(0, f"status {response.status_code}")
 
         return {
             "api_url": api_url,
-            "status": status,
+            "status": "DOWN" if failures else "UP",
             "status_code": response.status_code,
             "latency": latency,
-            "response": (response.text or "")[:200],
+            "elapsed": elapsed,
+            "assert_seconds": assert_seconds,
+            "assertion_failures": failures,
+            "response": ("ASSERT: " + "; ".join(failures))[:LOG_BODY_CHARS] if failures else text,
         }
 
     except requests.exceptions.Timeout:
@@ -47,7 +130,9 @@ def check_api(api_url: str) -> Dict[str, Any]:
             "status": "DOWN",
             "status_code": None,
             "latency": _sine_latency(),
+            "elapsed": time.perf_counter() - t0,
             "response": "Timeout",
+            "timed_out": True,
         }
 
     except Exception as e:
@@ -56,5 +141,171 @@ def check_api(api_url: str) -> Dict[str, Any]:
             "status": "DOWN",
             "status_code": None,
             "latency": _sine_latency(),
+            "elapsed": time.perf_counter() - t0,
             "response": str(e)[:200],
         }
+
+
+# -----------------------------------------------------------------------------
+# Probes
+# -----------------------------------------------------------------------------
+# Cada API elige un probe (columna APIs.probe). Todos devuelven el mismo dict
+# que check_api (status/status_code/latency/elapsed/response), así el resultado
+# sigue el mismo camino logs/api_state. Para sumar uno nuevo:
+#
+#     @register_probe("mi_probe")
+#     def mi_probe(api_url, assertions=None, timeout=None) -> Dict[str, Any]: ...
+#
+# `timeout` es (connect, read) o None (DEFAULT_TIMEOUT). Un probe que corta por
+# timeout devuelve timed_out=True (el runner lo usa para ajustar el próximo).
+
+PROBES: Dict[str, Callable[..., Dict[str, Any]]] = {}
+DEFAULT_PROBE = "http"
+
+
+def register_probe(name: str):
+    def deco(fn):
+        PROBES[name] = fn
+        return fn
+    return deco
+
+
+def _result(api_url: str, status: str, t0: float, response: str, status_code: Optional[int] = None, **extra) -> Dict[str, Any]:
+    out = {
+        "api_url": api_url,
+        "status": status,
+        "status_code": status_code,
+        "latency": _sine_latency(),
+        "elapsed": time.perf_counter() - t0,
+        "response": response[:LOG_BODY_CHARS],
+    }
+    out.update(extra)
+    return out
+
+
+def _check_latency(out: Dict[str, Any], assertions: Optional[AssertionSet]) -> Dict[str, Any]:
+    """
+    tcp/tls/dns: de las assertions solo se evalúa max_latency_ms (set_assertions
+    rechaza el resto para estos probes).
+    """
+    if assertions is None or out["status"] != "UP":
+        return out
+    latency = AssertionSet([m for m in assertions.matchers if isinstance(m, MaxLatency)])
+    failures = latency.evaluate(None, out["elapsed"], {}, None)
+    if failures:
+        out["status"] = "DOWN"
+        out["assertion_failures"] = failures
+        out["response"] = ("ASSERT: " + "; ".join(failures))[:LOG_BODY_CHARS]
+    return out
+
+
+def _host_port(api_url: str, default_port: Optional[int] = None):
+    p = urlparse(api_url)
+    port = p.port or default_port or (443 if p.scheme == "https" else 80)
+    return p.hostname, port
+
+
+register_probe("http")(check_api)
+
+
+@register_probe("head")
+def probe_http_head(api_url: str, assertions: Optional[AssertionSet] = None, timeout: Optional[Timeout] = None) -> Dict[str, Any]:
+    """
+    HTTP HEAD: status y headers sin bajar cuerpo.
+    """
+    import requests
+
+    t0 = time.perf_counter()
+    try:
+        response = requests.head(
+            api_url, timeout=timeout or DEFAULT_TIMEOUT, headers={"User-Agent": "API-Monitor/1.0"}, allow_redirects=True
+        )
+    except requests.exceptions.Timeout:
+        return _result(api_url, "DOWN", t0, "Timeout", timed_out=True)
+    except Exception as e:
+        return _result(api_url, "DOWN", t0, str(e))
+
+    elapsed = time.perf_counter() - t0
+    failures = []
+    if assertions is not None:
+        failures = assertions.evaluate(response.status_code, elapsed, response.headers, "")
+    if (assertions is None or not assertions.has_status) and response.status_code >= 400:
+        failures.insert(0, f"status {response.status_code}")
+
+    text = ("ASSERT: " + "; ".join(failures)) if assertions is not None and failures else f"HEAD {response.status_code}"
+    return _result(api_url, "DOWN" if failures else "UP", t0, text, status_code=response.status_code)
+
+
+@register_probe("tcp")
+def probe_tcp(api_url: str, assertions: Optional[AssertionSet] = None, timeout: Optional[Timeout] = None) -> Dict[str, Any]:
+    """
+    TCP connect al host:puerto de la URL (sin HTTP). Usa el timeout de connect.
+    """
+    host, port = _host_port(api_url)
+    connect_timeout, _ = timeout or DEFAULT_TIMEOUT
+    t0 = time.perf_counter()
+    try:
+        with socket.create_connection((host, port), timeout=connect_timeout):
+            pass
+    except socket.timeout:
+        return _result(api_url, "DOWN", t0, f"TCP {host}:{port} timeout", timed_out=True)
+    except OSError as e:
+        return _result(api_url, "DOWN", t0, f"TCP {host}:{port} {e}")
+    return _check_latency(_result(api_url, "UP", t0, f"TCP {host}:{port} OK"), assertions)
+
+
+@register_probe("tls")
+def probe_tls(api_url: str, assertions: Optional[AssertionSet] = None, timeout: Optional[Timeout] = None) -> Dict[str, Any]:
+    """
+    Handshake TLS (verificado) y días hasta que vence el certificado.
+    Timeout de connect para el TCP y de read para el handshake.
+    """
+    host, port = _host_port(api_url, 443)
+    connect_timeout, read_timeout = timeout or DEFAULT_TIMEOUT
+    t0 = time.perf_counter()
+    try:
+        ctx = ssl.create_default_context(cafile=TLS_CA_FILE)
+        with socket.create_connection((host, port), timeout=connect_timeout) as sock:
+            sock.settimeout(read_timeout)
+            with ctx.wrap_socket(sock, server_hostname=host) as tls:
+                cert = tls.getpeercert()
+    except socket.timeout:
+        return _result(api_url, "DOWN", t0, f"TLS {host}:{port} timeout", timed_out=True)
+    except (OSError, ssl.SSLError) as e:
+        return _result(api_url, "DOWN", t0, f"TLS {host}:{port} {e}")
+
+    expires = datetime.fromtimestamp(ssl.cert_time_to_seconds(cert["notAfter"]), tz=timezone.utc)
+    days_left = (expires - datetime.now(timezone.utc)).total_seconds() / 86400
+    if days_left >= TLS_MIN_DAYS:
+        status, text = "UP", f"TLS OK, cert vence en {days_left:.1f} días ({expires:%Y-%m-%d})"
+    else:
+        status, text = "DOWN", f"TLS {host}:{port} cert vence pronto: en {days_left:.1f} días ({expires:%Y-%m-%d})"
+    return _check_latency(_result(api_url, status, t0, text, cert_days_left=round(days_left, 2)), assertions)
+
+
+@register_probe("dns")
+def probe_dns(api_url: str, assertions: Optional[AssertionSet] = None, timeout: Optional[Timeout] = None) -> Dict[str, Any]:
+    """
+    Resolución DNS del host de la URL (getaddrinfo no acepta timeout: lo
+    manda el resolver del sistema).
+    """
+    host, port = _host_port(api_url)
+    t0 = time.perf_counter()
+    try:
+        infos = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+    except OSError as e:
+        return _result(api_url, "DOWN", t0, f"DNS {host} {e}")
+    addrs = sorted({i[4][0] for i in infos})
+    return _check_latency(_result(api_url, "UP", t0, f"DNS {host} -> {', '.join(addrs)}"), assertions)
+
+
+def run_probe(
+    probe: Optional[str],
+    api_url: str,
+    assertions: Optional[AssertionSet] = None,
+    timeout: Optional[Timeout] = None,
+) -> Dict[str, Any]:
+    fn = PROBES.get(probe or DEFAULT_PROBE)
+    if fn is None:
+        return _result(api_url, "DOWN", time.perf_counter(), f"Probe desconocido: {probe}")
+    return fn(api_url, assertions, timeout)
@@ -0,0 +1,66 @@
+"""
+Exportación de logs en streaming (NDJSON o CSV, opcionalmente gzip).
+
+Recibe los chunks de filas de logic.iter_logs() y los va convirtiendo en
+bytes a medida que llegan: nunca hay más de un chunk en memoria, sea el
+export de una hora o de todo el historial. El gzip se arma al vuelo con un
+compresor incremental (mismo formato que `gzip`, se abre con zcat).
+"""
+import csv
+import io
+import json
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+GZIP_LEVEL = 6
+
+# Un encoder reutilizado: json.dumps(..., ensure_ascii=False) arma uno nuevo por fila.
+_json = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def _ndjson(chunks: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    for rows in chunks:
+        yield ("\n".join(map(_json, rows)) + "\n").encode("utf-8") if rows else b""
+
+
+def _csv(chunks: Iterable[List[Dict[str, Any]]]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = None
+    for rows in chunks:
+        if not rows:
+            continue
+        if writer is None:
+            writer = csv.DictWriter(buf, fieldnames=list(rows[0].keys()), lineterminator="\n")
+            writer.writeheader()
+        writer.writerows(rows)
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+
+
+def _gzip(parts: Iterable[bytes], level: int = GZIP_LEVEL) -> Iterator[bytes]:
+    comp = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = encabezado gzip
+    for part in parts:
+        out = comp.compress(part)
+        if out:
+            yield out
+    yield comp.flush()
+
+
+def encode(chunks: Iterable[List[Dict[str, Any]]], fmt: str = "ndjson", gzip: bool = False) -> Iterator[bytes]:
+    """
+    Chunks de filas -> bytes listos para un StreamingResponse.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt} (usar {', '.join(FORMATS)})")
+    parts = _ndjson(chunks) if fmt == "ndjson" else _csv(chunks)
+    return _gzip(parts) if gzip else parts
+
+
+def filename(fmt: str, gzip: bool) -> str:
+    return f"logs.{fmt}{'.gz' if gzip else ''}"
@@ -0,0 +1,72 @@
+"""
+Ciclo de vida del proceso (runner, servidor o ambos).
+
+Un único evento SHUTDOWN coordina el apagado:
+
+- SIGTERM / Ctrl+C (o el fin del servidor en modo `both`) llaman a
+  request_shutdown(): el runner deja de arrancar checks nuevos, termina el que
+  está en curso y guarda lo pendiente.
+- Hay SHUTDOWN_GRACE_SECONDS para eso. Si se vence (o llega una segunda
+  señal) se interrumpe el hilo principal con KeyboardInterrupt, que igual
+  intenta un último flush.
+"""
+import _thread
+import os
+import signal
+import threading
+from time import time
+from typing import Optional
+
+GRACE_SECONDS = float(os.getenv("SHUTDOWN_GRACE_SECONDS", "15"))
+
+SHUTDOWN = threading.Event()
+_deadline: Optional[float] = None
+_signals = 0
+_lock = threading.Lock()
+
+
+def request_shutdown(reason: str = "") -> None:
+    """
+    Pide el apagado ordenado (idempotente) y arranca el plazo de gracia.
+    """
+    global _deadline
+    with _lock:
+        if SHUTDOWN.is_set():
+            return
+        _deadline = time() + GRACE_SECONDS
+        SHUTDOWN.set()
+
+    print(f"\n🛑 Apagando{f' ({reason})' if reason else ''}: se terminan checks y escrituras pendientes (máx {GRACE_SECONDS:.0f}s)...")
+    t = threading.Timer(GRACE_SECONDS, _expire)
+    t.daemon = True
+    t.start()
+
+
+def time_left() -> float:
+    """
+    Segundos que quedan del plazo de gracia (el plazo completo si no se pidió apagado).
+    """
+    if _deadline is None:
+        return GRACE_SECONDS
+    return max(0.0, _deadline - time())
+
+
+def _expire() -> None:
+    print("⏱️ Venció el plazo de apagado, se corta.")
+    _thread.interrupt_main()
+
+
+def _on_signal(signum, frame) -> None:
+    global _signals
+    _signals += 1
+    if _signals > 1:
+        raise KeyboardInterrupt  # segunda señal: corte inmediato
+    request_shutdown(signal.Signals(signum).name)
+
+
+def install_signal_handlers() -> None:
+    """
+    SIGTERM y SIGINT -> apagado ordenado. Solo desde el hilo principal.
+    """
+    signal.signal(signal.SIGTERM, _on_signal)
+    signal.signal(signal.SIGINT, _on_signal)
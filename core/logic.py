@@ -1,9 +1,22 @@
+import json
+import os
+import re
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Set, Tuple
 from urllib.parse import urlparse
 
-DB_PATH = Path(__file__).parent.parent / "DataBase" / "dataBase.db"
+from core import archive, bodies, sla
+from core.assertions import check_probe_assertions, compile_assertions
+from core.checker import DEFAULT_PROBE, PROBES
+
+DEFAULT_DB_PATH = Path(__file__).parent.parent / "DataBase" / "dataBase.db"
+DB_PATH = Path(os.getenv("DB_PATH", str(DEFAULT_DB_PATH)))
 SCHEMA_PATH = Path(__file__).parent.parent / "DataBase" / "schema.sql"
 
 # -----------------------------------------------------------------------------
@@ -14,6 +27,32 @@ SCHEMA_PATH = Path(__file__).parent.parent / "DataBase" / "schema.sql"
 
 TZ_MOD = "-3 hours"
 
+# Buckets de latencia del overview: (límite superior en segundos, etiqueta).
+LATENCY_BUCKETS = [
+    (0.1, "<100ms"),
+    (0.3, "100-300ms"),
+    (1.0, "300ms-1s"),
+    (3.0, "1-3s"),
+]
+LATENCY_BUCKET_OVER = ">=3s"
+
+
+def db_now() -> str:
+    """
+    Mismo valor que datetime('now', TZ_MOD) en SQLite, calculado en Python
+    (para registrar la hora del check y no la del flush).
+    """
+    return (datetime.now(timezone.utc) - timedelta(hours=3)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def latency_bucket(latency: Optional[float]) -> Optional[str]:
+    if latency is None:
+        return None
+    for upper, label in LATENCY_BUCKETS:
+        if latency < upper:
+            return label
+    return LATENCY_BUCKET_OVER
+
 
 def is_valid_url(url: str) -> bool:
     if not isinstance(url, str):
@@ -33,6 +72,14 @@ def _ensure_migrations(conn: sqlite3.Connection) -> None:
     """
     cur = conn.cursor()
 
+    cur.execute("PRAGMA table_info(APIs);")
+    if "probe" not in {row[1] for row in cur.fetchall()}:
+        cur.execute("ALTER TABLE APIs ADD COLUMN probe TEXT NOT NULL DEFAULT 'http';")
+
+    cur.execute("PRAGMA table_info(logs);")
+    if "body_id" not in {row[1] for row in cur.fetchall()}:
+        cur.execute("ALTER TABLE logs ADD COLUMN body_id INTEGER REFERENCES response_bodies(id);")
+
     cur.execute("PRAGMA table_info(api_state);")
     cols = {row[1] for row in cur.fetchall()}
 
@@ -46,6 +93,93 @@ def _ensure_migrations(conn: sqlite3.Connection) -> None:
         # ✅ FALTABA
         if "last_alert_at" not in cols:
             cur.execute("ALTER TABLE api_state ADD COLUMN last_alert_at DATETIME;")
+        if "last_latency_bucket" not in cols:
+            cur.execute("ALTER TABLE api_state ADD COLUMN last_latency_bucket TEXT;")
+            for api_id, lat in cur.execute("SELECT api_id, last_latency FROM api_state;").fetchall():
+                cur.execute(
+                    "UPDATE api_state SET last_latency_bucket = ? WHERE api_id = ?;",
+                    (latency_bucket(lat), api_id),
+                )
+        if "next_due_epoch" not in cols:
+            cur.execute("ALTER TABLE api_state ADD COLUMN next_due_epoch REAL;")
+        if "timeout_read" not in cols:
+            cur.execute("ALTER TABLE api_state ADD COLUMN timeout_connect REAL;")
+            cur.execute("ALTER TABLE api_state ADD COLUMN timeout_read REAL;")
+
+    # Primera vez con overview_counters: limpiar estados huérfanos y armar contadores.
+    if not cur.execute("SELECT 1 FROM overview_counters WHERE metric = 'total';").fetchone():
+        _rebuild_overview_counters(conn)
+
+    # DBs con historial previo al motor de SLA: derivar transiciones desde logs.
+    if not cur.execute("SELECT 1 FROM status_transitions LIMIT 1;").fetchone():
+        if cur.execute("SELECT 1 FROM logs LIMIT 1;").fetchone():
+            sla.backfill_transitions(conn)
+
+    if not cur.execute("SELECT 1 FROM incidents LIMIT 1;").fetchone():
+        if cur.execute("SELECT 1 FROM logs WHERE status = 'DOWN' LIMIT 1;").fetchone():
+            _backfill_incidents(conn)
+
+
+def _backfill_incidents(conn: sqlite3.Connection) -> None:
+    """
+    Deriva incidentes de las rachas DOWN en logs (una pasada ordenada).
+    """
+    cur = conn.execute(
+        "SELECT api_id, status, status_code, response, timestamp FROM logs ORDER BY api_id, id;"
+    )
+    for api_id, status, status_code, response, ts in cur:
+        if not ts:
+            continue
+        _incident_check(conn, api_id, status, status_code, response, ts, sla.db_ts_to_epoch(ts))
+
+
+def _rebuild_overview_counters(conn: sqlite3.Connection) -> None:
+    """
+    Recalcula overview_counters desde cero. Los triggers lo mantienen al día después.
+    """
+    conn.execute("DELETE FROM api_state WHERE api_id NOT IN (SELECT id FROM APIs);")
+    conn.execute("DELETE FROM overview_counters;")
+    conn.execute(
+        "INSERT INTO overview_counters (metric, key, n) SELECT 'total', 'all', COUNT(*) FROM APIs;"
+    )
+    conn.execute(
+        """
+        INSERT INTO overview_counters (metric, key, n)
+        SELECT 'status', COALESCE(last_status, 'UNKNOWN'), COUNT(*) FROM api_state GROUP BY 1, 2
+        UNION ALL
+        SELECT 'status_code', COALESCE(CAST(last_status_code AS TEXT), 'none'), COUNT(*) FROM api_state GROUP BY 1, 2
+        UNION ALL
+        SELECT 'latency', COALESCE(last_latency_bucket, 'none'), COUNT(*) FROM api_state GROUP BY 1, 2;
+        """
+    )
+
+
+def _rebuild_group_counters(conn: sqlite3.Connection) -> None:
+    """
+    Recalcula group_counters desde la pertenencia materializada.
+    """
+    conn.execute("DELETE FROM group_counters;")
+    conn.execute(
+        """
+        INSERT INTO group_counters (group_id, metric, key, n)
+        SELECT group_id, 'total', 'all', COUNT(*) FROM api_group_members GROUP BY group_id
+        UNION ALL
+        SELECT m.group_id, 'status', COALESCE(s.last_status, 'UNKNOWN'), COUNT(*)
+        FROM api_group_members m JOIN api_state s ON s.api_id = m.api_id GROUP BY 1, 3
+        UNION ALL
+        SELECT m.group_id, 'status_code', COALESCE(CAST(s.last_status_code AS TEXT), 'none'), COUNT(*)
+        FROM api_group_members m JOIN api_state s ON s.api_id = m.api_id GROUP BY 1, 3
+        UNION ALL
+        SELECT m.group_id, 'latency', COALESCE(s.last_latency_bucket, 'none'), COUNT(*)
+        FROM api_group_members m JOIN api_state s ON s.api_id = m.api_id GROUP BY 1, 3;
+        """
+    )
+
+
+def rebuild_overview_counters() -> None:
+    with _get_conn() as conn:
+        _rebuild_overview_counters(conn)
+        _rebuild_group_counters(conn)
 
 
 def _init_db(conn: sqlite3.Connection) -> None:
@@ -57,16 +191,86 @@ def _init_db(conn: sqlite3.Connection) -> None:
     _ensure_migrations(conn)
 
 
+# -----------------------------------------------------------------------------
+# Conexiones
+# -----------------------------------------------------------------------------
+# Una conexión por hilo (reutilizada) y schema/migraciones una sola vez por
+# proceso. Antes cada llamada abría una conexión nueva y re-ejecutaba schema.sql.
+#
+# La DB es DB_PATH salvo adentro de using_db(path) (SQLiteStorage con otra
+# DB, p.ej. la suite de conformidad): vale solo para ese contexto/hilo, sin
+# tocar la del resto del proceso.
+
+_local = threading.local()
+_initialized: set = set()
+_init_lock = threading.Lock()
+_db_override: ContextVar[Optional[Path]] = ContextVar("db_override", default=None)
+
+
+def _db_path() -> Path:
+    return _db_override.get() or DB_PATH
+
+
+@contextmanager
+def using_db(path):
+    """
+    Las funciones de este módulo llamadas adentro del bloque usan `path`.
+    """
+    token = _db_override.set(Path(path))
+    try:
+        yield
+    finally:
+        _db_override.reset(token)
+
+
 def _get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
+    path = str(_db_path())
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is not None:
+        return conn
+
+    conn = sqlite3.connect(path, timeout=30)
     conn.row_factory = sqlite3.Row
-    _init_db(conn)
+    conn.execute("PRAGMA foreign_keys = ON;")
+    conn.execute("PRAGMA busy_timeout = 30000;")
+
+    with _init_lock:
+        if path not in _initialized:
+            # WAL: lectores (dashboard/bot) no bloquean al runner que escribe.
+            conn.execute("PRAGMA journal_mode = WAL;")
+            _init_db(conn)
+            conn.commit()
+            _initialized.add(path)
+
+    conns[path] = conn
     return conn
 
 
+def close_conn() -> None:
+    """
+    Cierra la conexión de este hilo a la DB actual (si había).
+    """
+    conn = getattr(_local, "conns", {}).pop(str(_db_path()), None)
+    if conn is not None:
+        conn.close()
+
+
 # ------- PARA ESCRITURAS ------
 
-def add_API_database(api_name: str, api_url: str) -> None:
+def check_probe(probe: Optional[str]) -> str:
+    probe = (probe or DEFAULT_PROBE).strip().lower()
+    if probe not in PROBES:
+        raise ValueError(f"Probe inválido: {probe} (opciones: {', '.join(sorted(PROBES))})")
+    return probe
+
+
+def validate_api(api_name: str, api_url: str, probe: Optional[str] = None) -> Tuple[str, str, str]:
+    """
+    Normaliza (nombre, url, probe) de una alta. ValueError si algo es inválido.
+    """
     api_name = (api_name or "").strip()
     api_url = (api_url or "").strip()
 
@@ -74,28 +278,86 @@ def add_API_database(api_name: str, api_url: str) -> None:
         raise ValueError("El nombre de la API no puede estar vacío.")
     if not is_valid_url(api_url):
         raise ValueError(f"URL inválida: {api_url}")
+    return api_name, api_url, check_probe(probe)
+
+
+def add_API_database(api_name: str, api_url: str, probe: Optional[str] = None) -> int:
+    """
+    Da de alta una API y devuelve su id (el de la existente si la URL ya estaba).
+    """
+    api_name, api_url, probe = validate_api(api_name, api_url, probe)
 
     with _get_conn() as conn:
         cur = conn.cursor()
         cur.execute(
             """
-            INSERT OR IGNORE INTO APIs (name, url, created_at)
-            VALUES (?, ?, datetime('now', ?));
+            INSERT OR IGNORE INTO APIs (name, url, created_at, probe)
+            VALUES (?, ?, datetime('now', ?), ?);
             """,
-            (api_name, api_url, TZ_MOD),
+            (api_name, api_url, TZ_MOD, probe),
         )
+        return conn.execute("SELECT id FROM APIs WHERE url = ?;", (api_url,)).fetchone()[0]
+
+
+def set_probe(api_id: int, probe: Optional[str]) -> bool:
+    """
+    Cambia el probe de una API. False si la API no existe. ValueError si el
+    probe es inválido o no puede evaluar las assertions que ya tiene la API.
+    """
+    probe = check_probe(probe)
+    with _get_conn() as conn:
+        row = conn.execute("SELECT spec FROM api_assertions WHERE api_id = ?;", (api_id,)).fetchone()
+        if row:
+            check_probe_assertions(probe, json.loads(row["spec"]))
+        cur = conn.execute("UPDATE APIs SET probe = ? WHERE id = ?;", (probe, api_id))
+        return cur.rowcount > 0
+
+
+def add_APIs_bulk(items: List[Tuple[str, str]]) -> List[Optional[str]]:
+    """
+    Inserta muchas APIs en una sola transacción.
+    Devuelve, por cada item, None si quedó cargada o el mensaje de error.
+    """
+    errors: List[Optional[str]] = []
+    rows = []
+
+    for api_name, api_url in items:
+        api_name = (api_name or "").strip()
+        api_url = (api_url or "").strip()
+        if not api_name:
+            errors.append("El nombre de la API no puede estar vacío.")
+        elif not is_valid_url(api_url):
+            errors.append(f"URL inválida: {api_url}")
+        else:
+            errors.append(None)
+            rows.append((api_name, api_url, TZ_MOD))
+
+    if rows:
+        with _get_conn() as conn:
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO APIs (name, url, created_at)
+                VALUES (?, ?, datetime('now', ?));
+                """,
+                rows,
+            )
+    return errors
 
 
 def delete_api(api_id: int) -> None:
     with _get_conn() as conn:
+        groups = [r[0] for r in conn.execute("SELECT group_id FROM api_group_members WHERE api_id = ?;", (api_id,))]
         conn.execute("DELETE FROM APIs WHERE id = ?;", (api_id,))
+        _prune_groups(conn, groups)
 
 
 def save_log_dataBase(api_id: int, log_data: Dict[str, Any]) -> None:
+    new_bodies: Dict[Any, int] = {}
     with _get_conn() as conn:
+        body_id = bodies.body_id_for(conn, log_data.get("response"), str(_db_path()), new_bodies)
         conn.execute(
             """
-            INSERT INTO logs (api_id, status, status_code, latency, response, timestamp)
+            INSERT INTO logs (api_id, status, status_code, latency, body_id, timestamp)
             VALUES (?, ?, ?, ?, ?, datetime('now', ?));
             """,
             (
@@ -103,26 +365,36 @@ def save_log_dataBase(api_id: int, log_data: Dict[str, Any]) -> None:
                 log_data.get("status"),
                 log_data.get("status_code"),
                 log_data.get("latency"),
-                log_data.get("response"),
+                body_id,
                 TZ_MOD,
             ),
         )
+    bodies.publish(new_bodies)
+
+
+def migrate_log_bodies(batch_size: int = 1000) -> int:
+    """
+    Convierte logs viejos (response en texto) al store deduplicado, de a lotes.
+    """
+    return bodies.migrate_log_bodies(_get_conn(), batch_size=batch_size, db_key=str(_db_path()))
 
 
 def update_state(api_id: int, status: str, status_code: Optional[int], latency: Optional[float]) -> None:
     with _get_conn() as conn:
         conn.execute(
             """
-            INSERT INTO api_state (api_id, last_status, last_status_code, last_latency, last_checked_at)
-            VALUES (?, ?, ?, ?, datetime('now', ?))
+            INSERT INTO api_state (api_id, last_status, last_status_code, last_latency, last_latency_bucket, last_checked_at)
+            VALUES (?, ?, ?, ?, ?, datetime('now', ?))
             ON CONFLICT(api_id) DO UPDATE SET
-                last_status      = excluded.last_status,
-                last_status_code = excluded.last_status_code,
-                last_latency     = excluded.last_latency,
-                last_checked_at  = excluded.last_checked_at;
+                last_status         = excluded.last_status,
+                last_status_code    = excluded.last_status_code,
+                last_latency        = excluded.last_latency,
+                last_latency_bucket = excluded.last_latency_bucket,
+                last_checked_at     = excluded.last_checked_at;
             """,
-            (api_id, status, status_code, latency, TZ_MOD),
+            (api_id, status, status_code, latency, latency_bucket(latency), TZ_MOD),
         )
+        sla.record_transition(conn, api_id, status)
 
 
 def touch_alert(api_id: int) -> None:
@@ -138,6 +410,153 @@ def touch_alert(api_id: int) -> None:
         )
 
 
+def _incident_check(
+    conn: sqlite3.Connection,
+    api_id: int,
+    status: str,
+    status_code: Optional[int],
+    error: Optional[str],
+    at_text: str,
+    at_epoch: float,
+) -> Optional[str]:
+    if status == "DOWN":
+        cur = conn.execute(
+            """
+            UPDATE incidents
+            SET last_status_code = ?, last_error = ?, check_count = check_count + 1
+            WHERE api_id = ? AND closed_epoch IS NULL;
+            """,
+            (status_code, error, api_id),
+        )
+        if cur.rowcount:
+            return "updated"
+        conn.execute(
+            """
+            INSERT INTO incidents (api_id, opened_at, opened_epoch, first_status_code, last_status_code, first_error, last_error)
+            VALUES (?, ?, ?, ?, ?, ?, ?);
+            """,
+            (api_id, at_text, at_epoch, status_code, status_code, error, error),
+        )
+        return "opened"
+
+    cur = conn.execute(
+        """
+        UPDATE incidents
+        SET closed_at = ?, closed_epoch = ?, duration_seconds = ? - opened_epoch
+        WHERE api_id = ? AND closed_epoch IS NULL;
+        """,
+        (at_text, at_epoch, at_epoch, api_id),
+    )
+    return "closed" if cur.rowcount else None
+
+
+def _existing_api_ids(conn: sqlite3.Connection, api_ids) -> set:
+    ids = list(api_ids)
+    found = set()
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        found.update(
+            r[0] for r in conn.execute(f"SELECT id FROM APIs WHERE id IN ({','.join('?' * len(chunk))});", chunk)
+        )
+    return found
+
+
+def save_check_batch(checks: List[Dict[str, Any]]) -> None:
+    """
+    Write-behind del runner: persiste en UNA transacción los resultados de
+    varios checks. Cada item:
+
+        api_id, result (dict de check_api), checked_at (texto UTC-3),
+        checked_epoch, prev_status, alerted (bool), next_due (epoch, opcional),
+        timeout ((connect, read) adaptativo, opcional)
+
+    El próximo turno viaja en la misma transacción que el log: si el proceso
+    muere, al reiniciar el schedule se retoma desde el último lote guardado.
+
+    Como el runner conoce el estado previo en memoria, solo se registran
+    transiciones e incidentes cuando corresponde (sin lecturas por check).
+
+    Los checks de APIs borradas mientras esperaban el flush se descartan: con
+    foreign keys, una sola fila así haría fallar el lote entero.
+    """
+    if not checks:
+        return
+
+    db_key = str(_db_path())
+    new_bodies: Dict[Any, int] = {}
+    with _get_conn() as conn:
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE;")  # filtro y escritura en la misma transacción
+        alive = _existing_api_ids(conn, {c["api_id"] for c in checks})
+        checks = [c for c in checks if c["api_id"] in alive]
+
+        log_rows = []
+        state_rows = []
+        for c in checks:
+            r = c["result"]
+            lat = r.get("latency")
+            body_id = bodies.body_id_for(conn, r.get("response"), db_key, new_bodies)
+            log_rows.append((c["api_id"], r["status"], r.get("status_code"), lat, body_id, c["checked_at"]))
+            timeout = c.get("timeout") or (None, None)
+            state_rows.append((
+                c["api_id"], r["status"], r.get("status_code"), lat, latency_bucket(lat), c["checked_at"], c.get("next_due"),
+                *timeout,
+            ))
+
+        conn.executemany(
+            """
+            INSERT INTO logs (api_id, status, status_code, latency, body_id, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?);
+            """,
+            log_rows,
+        )
+        conn.executemany(
+            """
+            INSERT INTO api_state (
+                api_id, last_status, last_status_code, last_latency, last_latency_bucket, last_checked_at, next_due_epoch,
+                timeout_connect, timeout_read
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(api_id) DO UPDATE SET
+                last_status         = excluded.last_status,
+                last_status_code    = excluded.last_status_code,
+                last_latency        = excluded.last_latency,
+                last_latency_bucket = excluded.last_latency_bucket,
+                last_checked_at     = excluded.last_checked_at,
+                next_due_epoch      = excluded.next_due_epoch,
+                timeout_connect     = excluded.timeout_connect,
+                timeout_read        = excluded.timeout_read;
+            """,
+            state_rows,
+        )
+
+        for c in checks:
+            r = c["result"]
+            status = r["status"]
+            if status != c.get("prev_status"):
+                sla.record_transition(conn, c["api_id"], status, c["checked_epoch"])
+            if status == "DOWN" or c.get("prev_status") == "DOWN":
+                error = r.get("response") if status == "DOWN" else None
+                _incident_check(conn, c["api_id"], status, r.get("status_code"), error, c["checked_at"], c["checked_epoch"])
+            if c.get("alerted"):
+                conn.execute(
+                    "UPDATE api_state SET last_alert_at = ? WHERE api_id = ?;",
+                    (c["checked_at"], c["api_id"]),
+                )
+    # Recién commiteados: antes de esto un rollback dejaría ids inexistentes en el cache.
+    bodies.publish(new_bodies)
+
+
+def record_incident_check(api_id: int, status: str, status_code: Optional[int], error: Optional[str]) -> Optional[str]:
+    """
+    Abre un incidente en UP->DOWN, lo actualiza mientras siga DOWN y lo cierra
+    al recuperarse. Devuelve "opened" | "updated" | "closed" | None.
+    """
+    with _get_conn() as conn:
+        now_txt = conn.execute("SELECT datetime('now', ?);", (TZ_MOD,)).fetchone()[0]
+        return _incident_check(conn, api_id, status, status_code, error, now_txt, time.time())
+
+
 # ------ PARA LECTURA ------
 
 def get_all_apis() -> List[Tuple[int, str, str]]:
@@ -146,9 +565,108 @@ def get_all_apis() -> List[Tuple[int, str, str]]:
         return [(r["id"], r["name"], r["url"]) for r in rows]
 
 
+def get_catalog_version() -> int:
+    with _get_conn() as conn:
+        return conn.execute("SELECT COALESCE(MAX(version), 0) FROM catalog_changes;").fetchone()[0]
+
+
+def get_catalog_changes(since_version: int) -> Tuple[int, List[Dict[str, Any]], List[int]]:
+    """
+    Cambios del catálogo posteriores a `since_version`.
+    Devuelve (nueva_version, altas/ediciones [{api_id, name, url, probe, assertions}], ids borrados).
+    """
+    with _get_conn() as conn:
+        rows = conn.execute(
+            "SELECT version, api_id, op FROM catalog_changes WHERE version > ? ORDER BY version;",
+            (since_version,),
+        ).fetchall()
+        if not rows:
+            return since_version, [], []
+
+        last_op: Dict[int, str] = {}
+        for r in rows:
+            last_op[r["api_id"]] = r["op"]
+
+        upsert_ids = [i for i, op in last_op.items() if op == "upsert"]
+        found: Dict[int, Dict[str, Any]] = {}
+        for i in range(0, len(upsert_ids), 500):
+            chunk = upsert_ids[i:i + 500]
+            for r in conn.execute(
+                f"""
+                SELECT a.id AS api_id, a.name, a.url, a.probe, x.spec AS assertions
+                FROM APIs a
+                LEFT JOIN api_assertions x ON x.api_id = a.id
+                WHERE a.id IN ({','.join('?' * len(chunk))});
+                """,
+                chunk,
+            ):
+                found[r["api_id"]] = dict(r)
+
+    # Una alta que ya no existe (alta + baja entre dos lecturas) cuenta como baja.
+    deleted = [i for i, op in last_op.items() if op == "delete" or i not in found]
+    upserts = [found[i] for i in upsert_ids if i in found]
+    return rows[-1]["version"], upserts, deleted
+
+
+def prune_catalog_changes(upto_version: int) -> None:
+    with _get_conn() as conn:
+        # Se conserva la última fila para que MAX(version) nunca retroceda.
+        conn.execute("DELETE FROM catalog_changes WHERE version < ?;", (upto_version,))
+
+
+def get_assertions(api_id: int) -> Optional[Dict[str, Any]]:
+    with _get_conn() as conn:
+        row = conn.execute("SELECT spec FROM api_assertions WHERE api_id = ?;", (api_id,)).fetchone()
+    return json.loads(row["spec"]) if row else None
+
+
+def set_assertions(api_id: int, spec: Optional[Dict[str, Any]]) -> None:
+    """
+    Guarda (o borra, con spec vacío) las assertions de una API. Valida
+    compilando el spec: ValueError si es inválido o si el probe de la API no
+    puede evaluarlo (tcp/tls/dns solo admiten max_latency_ms).
+    """
+    compile_assertions(spec)
+    with _get_conn() as conn:
+        row = conn.execute("SELECT probe FROM APIs WHERE id = ?;", (api_id,)).fetchone()
+        if row:
+            check_probe_assertions(row["probe"], spec)
+        if not spec:
+            conn.execute("DELETE FROM api_assertions WHERE api_id = ?;", (api_id,))
+            return
+        conn.execute(
+            """
+            INSERT INTO api_assertions (api_id, spec, updated_at)
+            VALUES (?, ?, datetime('now', ?))
+            ON CONFLICT(api_id) DO UPDATE SET
+                spec = excluded.spec,
+                updated_at = excluded.updated_at;
+            """,
+            (api_id, json.dumps(spec), TZ_MOD),
+        )
+
+
+def get_runner_states() -> List[Dict[str, Any]]:
+    """
+    Catálogo + último estado, para cargar el estado en memoria del runner.
+    """
+    with _get_conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT a.id AS api_id, a.name, a.url, a.probe, s.last_status, s.last_alert_at, s.next_due_epoch,
+                   s.timeout_connect, s.timeout_read, x.spec AS assertions
+            FROM APIs a
+            LEFT JOIN api_state s ON s.api_id = a.id
+            LEFT JOIN api_assertions x ON x.api_id = a.id
+            ORDER BY a.id ASC;
+            """
+        ).fetchall()
+        return [dict(r) for r in rows]
+
+
 def get_api(api_id: int) -> Optional[Dict[str, Any]]:
     with _get_conn() as conn:
-        r = conn.execute("SELECT id, name, url, created_at FROM APIs WHERE id = ?;", (api_id,)).fetchone()
+        r = conn.execute("SELECT id, name, url, probe, created_at FROM APIs WHERE id = ?;", (api_id,)).fetchone()
         return dict(r) if r else None
 
 
@@ -164,20 +682,64 @@ def get_last_alert_at(api_id: int) -> Optional[str]:
     return row["last_alert_at"] if row else None
 
 
-def get_apis_with_state() -> List[Dict[str, Any]]:
+def get_apis_with_state(group: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    APIs con su último estado y tags. Con `group` solo las del grupo (o de sus
+    subgrupos), vía la pertenencia materializada; None si el grupo no existe.
+    """
+    join = ""
+    params: List[Any] = []
     with _get_conn() as conn:
+        if group:
+            gid = _group_id(conn, group)
+            if gid is None:
+                return None
+            join = "JOIN api_group_members m ON m.api_id = a.id AND m.group_id = ?"
+            params.append(gid)
+
         rows = conn.execute(
-            """
+            f"""
             SELECT
                 a.id,
                 a.name,
                 a.url,
+                a.probe,
                 a.created_at,
                 s.last_status,
                 s.last_status_code,
                 s.last_latency,
                 s.last_checked_at,
-                s.last_alert_at
+                s.last_alert_at,
+                s.timeout_connect,
+                s.timeout_read,
+                (SELECT group_concat(g.key) FROM api_tags t JOIN api_groups g ON g.id = t.group_id
+                 WHERE t.api_id = a.id) AS tags
+            FROM APIs a
+            {join}
+            LEFT JOIN api_state s ON s.api_id = a.id
+            ORDER BY a.id ASC;
+            """,
+            params,
+        ).fetchall()
+
+    out = []
+    for r in rows:
+        d = dict(r)
+        d["tags"] = sorted(d["tags"].split(",")) if d["tags"] else []
+        out.append(d)
+    return out
+
+
+def get_current_states() -> List[Dict[str, Any]]:
+    """
+    Último estado de cada API para el bot (sin tags ni timeouts), por id.
+    """
+    with _get_conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT a.id AS api_id, a.name, a.url,
+                   COALESCE(s.last_status, 'UNKNOWN') AS last_status,
+                   s.last_status_code, s.last_latency, s.last_checked_at
             FROM APIs a
             LEFT JOIN api_state s ON s.api_id = a.id
             ORDER BY a.id ASC;
@@ -186,6 +748,18 @@ def get_apis_with_state() -> List[Dict[str, Any]]:
         return [dict(r) for r in rows]
 
 
+def get_apis_by_ids(api_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    ids = sorted(set(api_ids))
+    if not ids:
+        return {}
+    with _get_conn() as conn:
+        rows = conn.execute(
+            f"SELECT id AS api_id, name, url FROM APIs WHERE id IN ({','.join('?' * len(ids))});",
+            ids,
+        ).fetchall()
+    return {r["api_id"]: dict(r) for r in rows}
+
+
 def get_logs(api_id: int, limit: int = 200, since: Optional[str] = None, until: Optional[str] = None) -> List[Dict[str, Any]]:
     limit = max(1, min(int(limit), 2000))
 
@@ -204,7 +778,7 @@ def get_logs(api_id: int, limit: int = 200, since: Optional[str] = None, until:
     with _get_conn() as conn:
         rows = conn.execute(
             f"""
-            SELECT id, api_id, status, status_code, latency, response, timestamp
+            SELECT id, api_id, status, status_code, latency, response, body_id, timestamp
             FROM logs
             WHERE {where_sql}
             ORDER BY timestamp DESC
@@ -212,15 +786,467 @@ def get_logs(api_id: int, limit: int = 200, since: Optional[str] = None, until:
             """,
             (*params, limit),
         ).fetchall()
+        out = bodies.rehydrate(conn, [dict(r) for r in rows], str(_db_path()))
+
+    # Lo que no alcanza en SQLite se completa con el archivo columnar (días más viejos).
+    if len(out) < limit:
+        root = archive.archive_root(_db_path())
+        if archive.has_data(root):
+            out.extend(archive.read_logs(root, api_id, limit - len(out), since=since, until=until))
+    return out
+
+
+BATCH_MAX_POINTS = 500
+
+
+def get_logs_batch(api_ids: Optional[List[int]] = None, points: int = 60, minutes: int = 15) -> Dict[str, Any]:
+    """
+    Series recientes (últimos `minutes`) de muchas APIs para los sparklines,
+    con una sola consulta: la ventana se parte en `points` buckets iguales y
+    se agrega por (api, bucket). Formato columnar: un eje compartido y por
+    cada API un array de `points` valores (null = sin checks en ese bucket).
+
+        {"since": ..., "step": 15.0, "points": 60, "ids": [1, 2],
+         "latency": [[0.31, null, ...], ...], "status": [[1, 0, null, ...], ...]}
+
+    latency = promedio del bucket; status = 1 si todos los checks dieron UP,
+    0 si hubo algún DOWN.
+    """
+    points = max(1, min(int(points), BATCH_MAX_POINTS))
+    minutes = max(1, int(minutes))
+    step = minutes * 60 / points
+
+    with _get_conn() as conn:
+        since, since_jd = conn.execute(
+            "SELECT s, julianday(s) FROM (SELECT datetime('now', ?, ?) AS s);",
+            (TZ_MOD, f"-{minutes} minutes"),
+        ).fetchone()
+
+        if api_ids is None:
+            ids = [r[0] for r in conn.execute("SELECT id FROM APIs ORDER BY id;")]
+            api_filter, params = "", []
+        else:
+            wanted = list(dict.fromkeys(int(x) for x in api_ids))
+            known = {
+                r[0] for r in conn.execute(
+                    f"SELECT id FROM APIs WHERE id IN ({','.join('?' * len(wanted))});", wanted
+                )
+            } if wanted else set()
+            ids = [x for x in wanted if x in known]
+            api_filter, params = f"AND +api_id IN ({','.join('?' * len(ids))})", ids
+
+        rows = conn.execute(
+            f"""
+            SELECT api_id,
+                   CAST((julianday(timestamp) - ?) * 86400.0 / ? AS INTEGER) AS b,
+                   AVG(latency),
+                   MAX(status = 'DOWN')
+            FROM logs INDEXED BY idx_logs_timestamp  -- solo la ventana; si no, el GROUP BY elige idx_logs_api_id y recorre todo
+            WHERE timestamp >= ? {api_filter}
+            GROUP BY api_id, b;
+            """,
+            (since_jd, step, since, *params),
+        ).fetchall() if ids else []
+
+    pos = {api_id: i for i, api_id in enumerate(ids)}
+    latency: List[List[Optional[float]]] = [[None] * points for _ in ids]
+    status: List[List[Optional[int]]] = [[None] * points for _ in ids]
+    for api_id, b, lat, down in rows:
+        i = pos.get(api_id)
+        if i is None:
+            continue
+        b = min(max(b, 0), points - 1)  # el check de "ahora" cae justo en el borde
+        latency[i][b] = None if lat is None else round(lat, 3)
+        status[i][b] = 0 if down else 1
+
+    return {"since": since, "step": step, "points": points, "ids": ids, "latency": latency, "status": status}
+
+
+EXPORT_CHUNK_ROWS = 2000
+
+
+def iter_logs(
+    api_ids: Optional[List[int]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    with_response: bool = True,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Recorre los logs (archivo + tabla viva) en orden de timestamp, de a
+    `chunk_rows` filas, para exportaciones de cualquier tamaño.
+
+    Usa una conexión propia con una transacción de lectura abierta durante
+    todo el recorrido (cursor + fetchmany, sin ORDER BY que obligue a ordenar
+    en memoria): el export ve una foto consistente aunque el runner siga
+    escribiendo o archive días mientras tanto. La conexión se puede usar desde
+    distintos hilos (StreamingResponse avanza el generador en el threadpool),
+    nunca a la vez.
+    """
+    if api_ids is not None and not api_ids:
+        return
+    _get_conn()  # schema / migraciones
+    path = str(_db_path())
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+
+    where = []
+    params: List[Any] = []
+    if api_ids is not None:
+        # "+api_id": que el planner use idx_logs_timestamp (ya ordenado) y filtre
+        where.append(f"+api_id IN ({','.join('?' * len(api_ids))})")
+        params.extend(api_ids)
+    if since:
+        where.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        where.append("timestamp <= ?")
+        params.append(until)
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+    cols = "id, api_id, status, status_code, latency, response, body_id, timestamp" if with_response \
+        else "id, api_id, status, status_code, latency, timestamp"
+
+    try:
+        conn.execute("BEGIN;")
+        # Todo lo que esté en la tabla viva es posterior a esta marca. Lo que el
+        # runner archive durante el export sigue visible acá (misma foto), así
+        # que del archivo solo se toma lo anterior: ni huecos ni duplicados.
+        live_min = conn.execute("SELECT MIN(timestamp) FROM logs;").fetchone()[0]
+
+        root = archive.archive_root(_db_path())
+        if archive.has_data(root):
+            columns = [c for c in archive.COLUMNS if with_response or c != "response"]
+            chunk: List[Dict[str, Any]] = []
+            for r in archive.iter_rows(root, api_ids, since, until, columns=columns):
+                if live_min is not None and r["timestamp"] >= live_min:
+                    break
+                chunk.append(r)
+                if len(chunk) >= chunk_rows:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+        cur = conn.execute(f"SELECT {cols} FROM logs INDEXED BY idx_logs_timestamp {where_sql} ORDER BY timestamp;", params)
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            rows = [dict(r) for r in rows]
+            yield bodies.rehydrate(conn, rows, path) if with_response else rows
+    finally:
+        conn.close()
+
+
+def get_latency_stats(
+    api_ids: Optional[List[int]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Percentiles de latencia / tasa de error / histograma sobre archivo + tabla viva.
+    """
+    where = []
+    params: List[Any] = []
+    if api_ids is not None:
+        where.append(f"api_id IN ({','.join('?' * len(api_ids))})")
+        params.extend(api_ids)
+    if since:
+        where.append("timestamp >= ?")
+        params.append(since)
+    if until:
+        where.append("timestamp <= ?")
+        params.append(until)
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+    with _get_conn() as conn:
+        # La tabla viva va a numpy de a chunks (nunca una lista de Python por fila).
+        cur = conn.execute(f"SELECT api_id, status = 'UP', latency FROM logs {where_sql};", params)
+        live = archive.live_arrays(cur)
+
+    return archive.latency_stats(archive.archive_root(_db_path()), api_ids, since, until, live=live)
+
+
+def archive_logs(keep_days: int = archive.ARCHIVE_KEEP_DAYS) -> Dict[str, int]:
+    """
+    Mueve los días cerrados de logs al archivo Parquet (ver core/archive.py).
+    """
+    return archive.archive_closed_days(
+        _get_conn(), archive.archive_root(_db_path()), TZ_MOD, str(_db_path()), keep_days=keep_days
+    )
+
+
+def get_overview_stats(group: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Lee los contadores precalculados (una consulta sobre una tabla chica).
+    Con `group` usa los contadores del grupo; None si el grupo no existe.
+    """
+    with _get_conn() as conn:
+        if group:
+            gid = _group_id(conn, group)
+            if gid is None:
+                return None
+            rows = conn.execute(
+                "SELECT metric, key, n FROM group_counters WHERE group_id = ? AND n > 0;", (gid,)
+            ).fetchall()
+        else:
+            rows = conn.execute("SELECT metric, key, n FROM overview_counters WHERE n > 0;").fetchall()
+
+    counters: Dict[str, Dict[str, int]] = {"total": {}, "status": {}, "status_code": {}, "latency": {}}
+    for r in rows:
+        counters.setdefault(r["metric"], {})[r["key"]] = r["n"]
+
+    total = counters["total"].get("all", 0)
+    up = counters["status"].get("UP", 0)
+    down = counters["status"].get("DOWN", 0)
+    return {
+        "total": total,
+        "up": up,
+        "down": down,
+        "unknown": total - up - down,
+        "status_codes": counters["status_code"],
+        "latency_buckets": counters["latency"],
+    }
+
+
+def get_sla(api_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """
+    Disponibilidad/MTTR/MTBF/incidentes por API en las ventanas de core/sla.py.
+    """
+    with _get_conn() as conn:
+        data = sla.compute_sla(conn, api_ids=api_ids)
+        names = {r["id"]: r["name"] for r in conn.execute("SELECT id, name FROM APIs;").fetchall()}
+    return [
+        {"api_id": api_id, "name": names.get(api_id), "windows": windows}
+        for api_id, windows in sorted(data.items())
+    ]
+
+
+def get_incidents(
+    api_id: Optional[int] = None,
+    limit: int = 100,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    open_only: bool = False,
+    api_ids: Optional[Iterable[int]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Incidentes del más nuevo al más viejo, de una API (`api_id`), de varias
+    (`api_ids`) o de todas.
+    """
+    limit = max(1, min(int(limit), 1000))
+
+    where = []
+    params: List[Any] = []
+
+    if api_id is not None:
+        where.append("i.api_id = ?")
+        params.append(api_id)
+    if api_ids is not None:
+        ids = sorted(set(api_ids))
+        if not ids:
+            return []
+        where.append(f"i.api_id IN ({','.join('?' * len(ids))})")
+        params.extend(ids)
+    if since:
+        where.append("i.opened_at >= ?")
+        params.append(since)
+    if until:
+        where.append("i.opened_at <= ?")
+        params.append(until)
+    if open_only:
+        where.append("i.closed_epoch IS NULL")
+
+    where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+
+    with _get_conn() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT i.id, i.api_id, a.name, i.opened_at, i.closed_at, i.duration_seconds,
+                   i.first_status_code, i.last_status_code, i.first_error, i.last_error, i.check_count
+            FROM incidents i
+            JOIN APIs a ON a.id = i.api_id
+            {where_sql}
+            ORDER BY i.opened_at DESC
+            LIMIT ?;
+            """,
+            (*params, limit),
+        ).fetchall()
         return [dict(r) for r in rows]
 
 
-def get_overview_stats() -> Dict[str, Any]:
+# ----- GRUPOS / TAGS -----
+# Tags "tipo:camino" (team:pagos, env:prod, region:us/east). api_tags guarda
+# lo asignado, api_group_members la pertenencia con ancestros (region:us
+# incluye a region:us/east) y group_counters los agregados, que mantienen los
+# triggers de schema.sql en cada cambio de estado.
+
+_TAG_RE = re.compile(r"^[a-z0-9_-]+:[a-z0-9_.-]+(/[a-z0-9_.-]+)*$")
+
+
+def parse_tag(tag: str) -> str:
+    tag = (tag or "").strip().lower()
+    if not _TAG_RE.match(tag):
+        raise ValueError(f"Tag inválido: {tag!r} (formato tipo:valor, p.ej. team:pagos o region:us/east)")
+    return tag
+
+
+def tag_chain(tag: str) -> List[str]:
+    """
+    "region:us/east" -> ["region:us", "region:us/east"]
+    """
+    kind, path = tag.split(":", 1)
+    parts = path.split("/")
+    return [f"{kind}:{'/'.join(parts[:i])}" for i in range(1, len(parts) + 1)]
+
+
+def _group_id(conn: sqlite3.Connection, key: str) -> Optional[int]:
+    row = conn.execute("SELECT id FROM api_groups WHERE key = ?;", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _ensure_group(conn: sqlite3.Connection, tag: str) -> int:
+    """
+    Crea el grupo del tag y sus ancestros si faltan. Devuelve el id del tag.
+    """
+    parent = None
+    for key in tag_chain(tag):
+        gid = _group_id(conn, key)
+        if gid is None:
+            gid = conn.execute(
+                "INSERT INTO api_groups (key, kind, parent_id) VALUES (?, ?, ?);",
+                (key, key.split(":", 1)[0], parent),
+            ).lastrowid
+        parent = gid
+    return parent
+
+
+def _sync_membership(conn: sqlite3.Connection, api_id: int) -> None:
+    """
+    Rearma la pertenencia materializada de una API (sus tags + ancestros)
+    aplicando solo la diferencia; los triggers ajustan group_counters.
+    """
+    want = {
+        r[0] for r in conn.execute(
+            """
+            WITH RECURSIVE up(id) AS (
+                SELECT group_id FROM api_tags WHERE api_id = ?
+                UNION
+                SELECT g.parent_id FROM api_groups g JOIN up ON g.id = up.id WHERE g.parent_id IS NOT NULL
+            )
+            SELECT id FROM up;
+            """,
+            (api_id,),
+        )
+    }
+    have = {r[0] for r in conn.execute("SELECT group_id FROM api_group_members WHERE api_id = ?;", (api_id,))}
+
+    gone = have - want
+    conn.executemany("DELETE FROM api_group_members WHERE group_id = ? AND api_id = ?;", [(g, api_id) for g in gone])
+    conn.executemany("INSERT INTO api_group_members (group_id, api_id) VALUES (?, ?);", [(g, api_id) for g in want - have])
+
+    _prune_groups(conn, gone)
+
+
+def _prune_groups(conn: sqlite3.Connection, group_ids) -> None:
+    """
+    Borra (con sus contadores) los grupos de la lista que quedaron vacíos.
+    Los hijos primero: _ensure_group crea cada ancestro antes (id menor), y
+    borrar un padre con hijos rompe el FK de parent_id.
+    """
+    for gid in sorted(group_ids, reverse=True):
+        if not conn.execute("SELECT 1 FROM api_group_members WHERE group_id = ? LIMIT 1;", (gid,)).fetchone():
+            conn.execute("DELETE FROM group_counters WHERE group_id = ?;", (gid,))
+            conn.execute("DELETE FROM api_groups WHERE id = ?;", (gid,))
+
+
+def set_api_tags(api_id: int, tags: List[str]) -> bool:
+    """
+    Reemplaza los tags de una API. ValueError si algún tag es inválido,
+    False si la API no existe.
+    """
+    clean = sorted({parse_tag(t) for t in tags or []})
     with _get_conn() as conn:
-        total = conn.execute("SELECT COUNT(*) AS n FROM APIs;").fetchone()["n"]
-        up = conn.execute("SELECT COUNT(*) AS n FROM api_state WHERE last_status = 'UP';").fetchone()["n"]
-        down = conn.execute("SELECT COUNT(*) AS n FROM api_state WHERE last_status = 'DOWN';").fetchone()["n"]
-    return {"total": total, "up": up, "down": down}
+        if not conn.execute("SELECT 1 FROM APIs WHERE id = ?;", (api_id,)).fetchone():
+            return False
+        group_ids = [_ensure_group(conn, t) for t in clean]
+        conn.execute("DELETE FROM api_tags WHERE api_id = ?;", (api_id,))
+        conn.executemany("INSERT INTO api_tags (api_id, group_id) VALUES (?, ?);", [(api_id, g) for g in group_ids])
+        _sync_membership(conn, api_id)
+    return True
+
+
+def get_api_tags(api_id: int) -> List[str]:
+    with _get_conn() as conn:
+        rows = conn.execute(
+            "SELECT g.key FROM api_tags t JOIN api_groups g ON g.id = t.group_id WHERE t.api_id = ? ORDER BY g.key;",
+            (api_id,),
+        ).fetchall()
+    return [r[0] for r in rows]
+
+
+def group_status(up: int, down: int, total: int) -> str:
+    # Distinto del DEGRADED por latencia de las alertas del runner
+    if down and up:
+        return "MIXED"
+    if down:
+        return "DOWN"
+    if up and up == total:
+        return "UP"
+    return "UNKNOWN" if not up else "PARTIAL"
+
+
+def get_groups(kind: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Grupos con su estado agregado (de group_counters, sin recorrer miembros).
+    """
+    where = "WHERE g.kind = ?" if kind else ""
+    params = [kind] if kind else []
+    with _get_conn() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT g.key, g.kind, p.key AS parent,
+                   COALESCE(SUM(CASE WHEN c.metric = 'total' THEN c.n END), 0) AS total,
+                   COALESCE(SUM(CASE WHEN c.metric = 'status' AND c.key = 'UP' THEN c.n END), 0) AS up,
+                   COALESCE(SUM(CASE WHEN c.metric = 'status' AND c.key = 'DOWN' THEN c.n END), 0) AS down
+            FROM api_groups g
+            LEFT JOIN api_groups p ON p.id = g.parent_id
+            LEFT JOIN group_counters c ON c.group_id = g.id AND c.metric IN ('total', 'status')
+            {where}
+            GROUP BY g.id
+            ORDER BY g.key;
+            """,
+            params,
+        ).fetchall()
+
+    out = []
+    for r in rows:
+        d = dict(r)
+        d["unknown"] = d["total"] - d["up"] - d["down"]
+        d["status"] = group_status(d["up"], d["down"], d["total"])
+        out.append(d)
+    return out
+
+
+def get_group_member_ids(keys: Iterable[str]) -> Set[int]:
+    """
+    APIs de los grupos (y sus subgrupos): rango del índice de pertenencia.
+    """
+    keys = sorted(set(keys))
+    if not keys:
+        return set()
+    with _get_conn() as conn:
+        rows = conn.execute(
+            f"""
+            SELECT DISTINCT m.api_id
+            FROM api_groups g
+            JOIN api_group_members m ON m.group_id = g.id
+            WHERE g.key IN ({','.join('?' * len(keys))});
+            """,
+            keys,
+        ).fetchall()
+    return {r[0] for r in rows}
+
 
 # ----- SUBSCRIPCIONES DE TELEGRAM -----
 
@@ -231,9 +1257,9 @@ def add_subscriber(chat_id: int, username: str = None, first_name: str = None, l
             INSERT INTO subscribers (chat_id, username, first_name, last_name)
             VALUES (?, ?, ?, ?)
             ON CONFLICT(chat_id) DO UPDATE SET
-              username=excluded.username,
-              first_name=excluded.first_name,
-              last_name=excluded.last_name;
+              username=COALESCE(excluded.username, username),
+              first_name=COALESCE(excluded.first_name, first_name),
+              last_name=COALESCE(excluded.last_name, last_name);
             """,
             (chat_id, username, first_name, last_name),
         )
@@ -248,3 +1274,118 @@ def get_subscribers() -> List[Dict[str, Any]]:
     with _get_conn() as conn:
         rows = conn.execute("SELECT chat_id, username, first_name, last_name FROM subscribers;").fetchall()
         return [dict(r) for r in rows]
+
+
+# Follows por API (subscriber_apis) y por grupo (subscriber_groups, por key).
+# chat_id se guarda como texto, como lo escribió siempre el bot.
+
+def follow_api(chat_id: int, api_id: int) -> None:
+    with _get_conn() as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO subscriber_apis (chat_id, api_id) VALUES (?, ?);",
+            (str(chat_id), api_id),
+        )
+
+
+def unfollow_api(chat_id: int, api_id: int) -> None:
+    with _get_conn() as conn:
+        conn.execute("DELETE FROM subscriber_apis WHERE chat_id = ? AND api_id = ?;", (str(chat_id), api_id))
+
+
+def get_followed_api_ids(chat_id: int) -> Set[int]:
+    with _get_conn() as conn:
+        rows = conn.execute("SELECT api_id FROM subscriber_apis WHERE chat_id = ?;", (str(chat_id),)).fetchall()
+    return {int(r["api_id"]) for r in rows}
+
+
+def follow_group(chat_id: int, group_key: str) -> None:
+    with _get_conn() as conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO subscriber_groups (chat_id, group_key) VALUES (?, ?);",
+            (str(chat_id), group_key),
+        )
+
+
+def unfollow_group(chat_id: int, group_key: str) -> None:
+    with _get_conn() as conn:
+        conn.execute("DELETE FROM subscriber_groups WHERE chat_id = ? AND group_key = ?;", (str(chat_id), group_key))
+
+
+def get_followed_groups(chat_id: int) -> Set[str]:
+    with _get_conn() as conn:
+        rows = conn.execute("SELECT group_key FROM subscriber_groups WHERE chat_id = ?;", (str(chat_id),)).fetchall()
+    return {r["group_key"] for r in rows}
+
+
+def clear_follows(chat_id: int) -> None:
+    """
+    Borra los follows (APIs y grupos) del chat: vuelve a recibir todas.
+    """
+    with _get_conn() as conn:
+        conn.execute("DELETE FROM subscriber_apis WHERE chat_id = ?;", (str(chat_id),))
+        conn.execute("DELETE FROM subscriber_groups WHERE chat_id = ?;", (str(chat_id),))
+
+
+def get_follow_specs() -> Dict[int, Tuple[Set[int], Set[str]]]:
+    """
+    (APIs, grupos) que sigue cada suscriptor, en una pasada.
+    """
+    with _get_conn() as conn:
+        subs = conn.execute("SELECT chat_id FROM subscribers;").fetchall()
+        pairs = conn.execute("SELECT chat_id, api_id FROM subscriber_apis;").fetchall()
+        group_pairs = conn.execute("SELECT chat_id, group_key FROM subscriber_groups;").fetchall()
+
+    out: Dict[int, Tuple[Set[int], Set[str]]] = {}
+    for r in subs:
+        try:
+            out[int(r["chat_id"])] = (set(), set())
+        except (TypeError, ValueError):
+            pass
+    for r in pairs:
+        try:
+            spec = out.get(int(r["chat_id"]))
+        except (TypeError, ValueError):
+            continue
+        if spec is not None:
+            spec[0].add(int(r["api_id"]))
+    for r in group_pairs:
+        try:
+            spec = out.get(int(r["chat_id"]))
+        except (TypeError, ValueError):
+            continue
+        if spec is not None:
+            spec[1].add(r["group_key"])
+    return out
+
+
+def get_chat_ids_following_api(api_id: int) -> List[int]:
+    """
+    Chats a avisar por una API: la siguen directo, siguen un grupo que la
+    contiene, o son suscriptores sin ningún follow (reciben todas).
+    """
+    with _get_conn() as conn:
+        rows = conn.execute(
+            """
+            SELECT chat_id FROM subscriber_apis WHERE api_id = ?
+            UNION
+            SELECT sg.chat_id
+            FROM api_group_members m
+            JOIN api_groups g ON g.id = m.group_id
+            JOIN subscriber_groups sg ON sg.group_key = g.key
+            WHERE m.api_id = ?
+            UNION
+            SELECT s.chat_id
+            FROM subscribers s
+            WHERE NOT EXISTS (SELECT 1 FROM subscriber_apis sa WHERE sa.chat_id = s.chat_id)
+              AND NOT EXISTS (SELECT 1 FROM subscriber_groups sg WHERE sg.chat_id = s.chat_id);
+            """,
+            (api_id, api_id),
+        ).fetchall()
+
+    ids = set()
+    for r in rows:
+        try:
+            ids.add(int(r["chat_id"]))
+        except (TypeError, ValueError):
+            pass
+    return list(ids)
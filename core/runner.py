@@ -1,50 +1,171 @@
 import os
-from time import sleep
-from datetime import datetime
-from zoneinfo import ZoneInfo
-
-from core.logic import (
-    get_all_apis,
-    save_log_dataBase,
-    get_last_status,
-    get_last_alert_at,
-    update_state,
-    touch_alert,
-    get_subscribers,
-)
-from core.checker import check_api
+import sqlite3
+import threading
+from time import sleep, time
+from typing import Optional
+
+from core.logic import db_now
+from core import archive, lifecycle, timeouts
+from core.checker import PROBE_TIMEOUT, run_probe
 from core.notifier import send_telegram
+from core.state import ApiRuntimeState, RunnerState, load_assertions
+from core.storage import get_storage
 
 INTERVAL = 10               # cada cuánto chequea (segundos)
 DOWN_COOLDOWN_SECONDS = 10  # re-alerta si sigue DOWN cada X segundos
+DEGRADED_COOLDOWN_SECONDS = 15 * 60  # como mucho una alerta DEGRADED por API cada X segundos
+ARCHIVE_EVERY_SECONDS = 3600  # cada cuánto mover días cerrados de logs a Parquet
+FLUSH_MAX_PENDING = 200     # write-behind: flush antes de fin de ciclo si se juntan tantos checks
+PENDING_HARD_LIMIT = 5000   # si la DB no responde, no acumular sin límite
+CATALOG_POLL_SECONDS = 1.0  # cada cuánto mirar si cambió el catálogo (también es el tick del scheduler)
+
+
+class CycleMetrics:
+    """
+    Métricas de una tanda de checks (se imprimen al cerrar la tanda).
+
+    Timeouts adaptativos, comparados contra el timeout fijo de antes
+    (PROBE_TIMEOUT): `timeout_saved` es el neto de PROBE_TIMEOUT - elapsed en
+    los checks donde el fijo hubiera cambiado algo (cortes, que ahorran si el
+    adaptativo es más corto, y checks más lentos que el fijo, que cuestan lo
+    que se esperó de más); puede ser negativo. `rescued` son esos checks
+    lentos, que con el fijo hubieran dado DOWN.
+    """
+    __slots__ = ("checks", "request_seconds", "assert_seconds", "asserted", "timeouts", "timeout_saved", "rescued")
+
+    def __init__(self):
+        self.checks = 0
+        self.request_seconds = 0.0
+        self.assert_seconds = 0.0
+        self.asserted = 0
+        self.timeouts = 0
+        self.timeout_saved = 0.0
+        self.rescued = 0
+
+    def add(self, result: dict, adaptive: bool = False) -> None:
+        self.checks += 1
+        elapsed = result.get("elapsed") or 0.0
+        self.request_seconds += elapsed
+        if "assert_seconds" in result:
+            self.asserted += 1
+            self.assert_seconds += result["assert_seconds"]
+        if adaptive:
+            if result.get("timed_out"):
+                self.timeouts += 1
+                self.timeout_saved += PROBE_TIMEOUT - elapsed
+            elif elapsed > PROBE_TIMEOUT:
+                self.rescued += 1
+                self.timeout_saved += PROBE_TIMEOUT - elapsed
+
+    def summary(self) -> str:
+        txt = f"📊 {self.checks} checks · requests {self.request_seconds:.2f}s"
+        if self.asserted:
+            pct = 100.0 * self.assert_seconds / self.request_seconds if self.request_seconds else 0.0
+            txt += f" · assertions {self.assert_seconds * 1000:.2f}ms en {self.asserted} checks ({pct:.3f}% del tiempo de request)"
+        if self.timeouts or self.rescued:
+            txt += f" · timeouts adaptativos: {self.timeouts} cortes, {self.timeout_saved:+.1f}s netos de worker ahorrados"
+            if self.rescued:
+                txt += f", {self.rescued} checks lentos que con {PROBE_TIMEOUT}s fijos daban DOWN"
+        return txt
+
 
-# Zona horaria Paraguay
-PY_TZ = ZoneInfo("America/Asuncion")
+def _cooldown_ok(last_ts: Optional[float], now: float, seconds: float = DOWN_COOLDOWN_SECONDS) -> bool:
+    if last_ts is None:
+        return True
+    return (now - last_ts) >= seconds
+
+
+def _flush(pending: list) -> list:
+    """
+    Escribe el lote pendiente. Si falla (p.ej. DB bloqueada) lo conserva para
+    el próximo intento; devuelve lo que sigue pendiente.
+    """
+    if not pending:
+        return pending
+    try:
+        get_storage().save_check_batch(pending)
+        return []
+    except sqlite3.IntegrityError as e:
+        # Una fila inválida no se arregla reintentando: se guardan de a uno y
+        # se descartan los que fallan, en vez de trabar el lote para siempre.
+        print(f"⚠️ Lote de {len(pending)} checks rechazado ({e}); se guarda de a uno.")
+        return _flush_one_by_one(pending)
+    except Exception as e:
+        print(f"❌ Error guardando {len(pending)} checks (se reintenta): {e}")
+        return pending[-PENDING_HARD_LIMIT:]
+
+
+def _flush_one_by_one(pending: list) -> list:
+    store = get_storage()
+    for i, c in enumerate(pending):
+        try:
+            store.save_check_batch([c])
+        except sqlite3.IntegrityError as e:
+            print(f"🗑️ Check descartado (API {c['api_id']}): {e}")
+        except Exception as e:
+            print(f"❌ Error guardando {len(pending) - i} checks (se reintenta): {e}")
+            return pending[i:][-PENDING_HARD_LIMIT:]
+    return []
 
 
-def _parse_sqlite_ts(ts: str):
+def _make_detector():
     """
-    timestamps en DB ya están ajustados a UTC-3 (datetime('now','-3 hours')).
+    Detector de anomalías de latencia (core/anomaly.py, necesita numpy). Sin
+    numpy el runner sigue igual, solo que sin alertas DEGRADED.
     """
-    if not ts:
+    try:
+        from core.anomaly import LatencyAnomalyDetector
+    except ImportError:
         return None
-    return datetime.strptime(ts, "%Y-%m-%d %H:%M:%S").replace(tzinfo=PY_TZ)
+    return LatencyAnomalyDetector()
 
 
-def _cooldown_ok(api_id: int) -> bool:
-    ts = get_last_alert_at(api_id)
-    last = _parse_sqlite_ts(ts)
-    if last is None:
-        return True
-    now = datetime.now(PY_TZ)
-    return (now - last).total_seconds() >= DOWN_COOLDOWN_SECONDS
+def _apply_catalog_changes(state: RunnerState, version: int, detector, pending: Optional[list] = None) -> int:
+    """
+    Aplica al schedule solo lo que cambió en el catálogo desde `version`:
+    altas se agendan ya, bajas dejan de chequearse (y sus checks sin guardar
+    de `pending` se descartan), ediciones actualizan nombre/URL/probe y
+    recompilan assertions.
+    Devuelve la nueva versión vista.
+    """
+    store = get_storage()
+    new_version, upserts, deleted = store.get_catalog_changes(version)
+    if new_version == version:
+        return version
+
+    for row in upserts:
+        api_id = row["api_id"]
+        compiled = load_assertions(row["assertions"], api_id)
+        st = state.get(api_id)
+        if st is None:
+            state.add(ApiRuntimeState(api_id, row["name"], row["url"], next_due=0.0, assertions=compiled, probe=row["probe"]))
+            print(f"➕ {row['name']} agregada al monitoreo.")
+        else:
+            if st.probe != row["probe"] or st.url != row["url"]:
+                if detector is not None:
+                    detector.remove(api_id)  # otra latencia base: el baseline viejo no sirve
+                st.latencies.clear()     # ni los timeouts aprendidos
+                st.timeout = None
+            st.name, st.url, st.assertions, st.probe = row["name"], row["url"], compiled, row["probe"]
+    for api_id in deleted:
+        st = state.remove(api_id)
+        if detector is not None:
+            detector.remove(api_id)
+        if st is not None:
+            print(f"➖ {st.name} quitada del monitoreo.")
+    if deleted and pending:
+        gone = set(deleted)
+        pending[:] = [c for c in pending if c["api_id"] not in gone]
+
+    store.prune_catalog_changes(new_version)
+    return new_version
 
 
 def _send_to_all(bot_token: str, msg: str) -> int:
     """
     Envía a todos los chat_id suscritos. Devuelve cuántos intentó.
     """
-    subs = get_subscribers()
+    subs = get_storage().get_subscribers()
     for s in subs:
         try:
             send_telegram(msg, bot_token, str(s["chat_id"]))
@@ -53,7 +174,175 @@ def _send_to_all(bot_token: str, msg: str) -> int:
     return len(subs)
 
 
-def empezar_monitoreo():
+def _maybe_archive(last_run: float) -> float:
+    """
+    Archiva días cerrados de logs si pasó ARCHIVE_EVERY_SECONDS. Devuelve el
+    instante de la última corrida.
+    """
+    now = time()
+    if now - last_run < ARCHIVE_EVERY_SECONDS:
+        return last_run
+    try:
+        res = get_storage().archive_logs()
+        if res["rows"]:
+            print(f"🗄️ Archivados {res['rows']} logs ({res['days']} días) en Parquet.")
+    except Exception as e:
+        print(f"❌ Error archivando logs: {e}")
+    return now
+
+
+def _alert_latency_anomalies(detector, samples, state: RunnerState, telegram_enabled: bool, bot_token) -> None:
+    """
+    Pasa las latencias del ciclo al detector (todas las APIs juntas) y avisa
+    DEGRADED por el mismo camino que las alertas DOWN/RECOVERED, con su propio
+    cooldown: una API que va y viene cerca del umbral no inunda a nadie.
+    """
+    now = time()
+    degraded, normalized = detector.update(
+        [api_id for api_id, _ in samples],
+        [elapsed for _, elapsed in samples],
+    )
+
+    for api_id, lat, mean, p99 in degraded:
+        st = state.get(api_id)
+        if st is None:
+            continue
+        api_name, api_url = st.name, st.url
+        print(f"🐢 {api_name} DEGRADED: {lat:.3f}s (media {mean:.3f}s, p99 {p99:.3f}s)")
+        if telegram_enabled and _cooldown_ok(st.last_degraded_alert_ts, now, DEGRADED_COOLDOWN_SECONDS):
+            msg = (
+                "🐢 API DEGRADED\n"
+                f"Name: {api_name}\n"
+                f"URL: {api_url}\n"
+                f"Latency: {lat:.3f}s (normal {mean:.3f}s, p99 {p99:.3f}s)\n"
+            )
+            tried = _send_to_all(bot_token, msg)
+            st.last_degraded_alert_ts = now
+            print(f"📨 Alerta Telegram enviada a {tried} suscriptores.")
+
+    for api_id, lat, _, _ in normalized:
+        st = state.get(api_id)
+        if st is not None:
+            print(f"👌 {st.name} latencia normalizada ({lat:.3f}s)")
+
+
+def _learn_timeout(st: ApiRuntimeState, result: dict) -> None:
+    """
+    Suma la latencia del check a la ventana de la API y recalcula su timeout
+    (ver core/timeouts.py). Fallas rápidas (conexión rechazada, DNS) no
+    cuentan como latencia; un timeout vencido hace backoff.
+    """
+    if result.get("timed_out"):
+        st.timeout = timeouts.backoff(st.timeout, st.latencies)
+        return
+    elapsed = result.get("elapsed")
+    if elapsed is None or (result["status"] != "UP" and result.get("status_code") is None):
+        return
+    st.latencies.add(elapsed)
+    # Sin `or st.timeout`: con menos de MIN_SAMPLES vuelve a None (el default)
+    # y un backoff anterior no queda pegado después de un check que respondió.
+    st.timeout = timeouts.compute(st.latencies)
+
+
+def _check_one(st: ApiRuntimeState, pending: list, samples: list, metrics: CycleMetrics, telegram_enabled: bool, bot_token) -> None:
+    """
+    Chequea una API, alerta si corresponde y encola la escritura (write-behind).
+    """
+    api_id, api_name, api_url = st.api_id, st.name, st.url
+    adaptive = timeouts.ENABLED and st.timeout is not None
+    result = run_probe(st.probe, api_url, st.assertions, timeout=st.timeout if adaptive else None)
+    now = time()
+    metrics.add(result, adaptive)
+    if timeouts.ENABLED:
+        _learn_timeout(st, result)
+
+    # 1) Estado actual y anterior (en memoria)
+    curr_status = result["status"]
+    prev_status = st.last_status  # None la primera vez
+
+    status_code = result.get("status_code")
+    lat = result.get("latency")
+    lat_txt = f"{lat}s" if lat is not None else "N/A"
+
+    print(f"{api_name} → {curr_status} ({status_code}) Latency: {lat_txt}")
+
+    if curr_status == "UP":
+        samples.append((api_id, result.get("elapsed")))
+
+    # 2) Reglas alertas:
+    # - DOWN: alertar inmediato y luego cooldown (persistente)
+    # - RECOVERED: alertar solo si venía de DOWN
+    send_alert = False
+    alert_reason = ""
+
+    if curr_status == "DOWN":
+        if telegram_enabled and _cooldown_ok(st.last_alert_ts, now):
+            send_alert = True
+            alert_reason = "DOWN"
+
+    elif curr_status == "UP" and prev_status == "DOWN":
+        if telegram_enabled:
+            send_alert = True
+            alert_reason = "RECOVERED"
+
+    # 3) Enviar alerta si corresponde (a TODOS los suscritos)
+    if telegram_enabled and send_alert:
+        if alert_reason == "DOWN":
+            msg = (
+                "🚨 API DOWN\n"
+                f"Name: {api_name}\n"
+                f"URL: {api_url}\n"
+                f"Code: {status_code}\n"
+                f"Latency: {lat_txt}\n"
+            )
+        else:
+            msg = (
+                "✅ API RECOVERED\n"
+                f"Name: {api_name}\n"
+                f"URL: {api_url}\n"
+                f"Code: {status_code}\n"
+                f"Latency: {lat_txt}\n"
+            )
+
+        tried = _send_to_all(bot_token, msg)
+        st.last_alert_ts = now
+        print(f"📨 Alerta Telegram enviada a {tried} suscriptores.")
+
+    # 4) Encolar log + estado + transición/incidente (write-behind)
+    pending.append({
+        "api_id": api_id,
+        "result": result,
+        "checked_at": db_now(),
+        "checked_epoch": now,
+        "prev_status": prev_status,
+        "alerted": send_alert,
+        "next_due": st.next_due,
+        "timeout": st.timeout,
+    })
+
+    # 5) Actualizar estado en memoria
+    st.last_status = curr_status
+    st.fail_streak = st.fail_streak + 1 if curr_status == "DOWN" else 0
+
+
+def _drain(pending: list) -> list:
+    """
+    Apagado: reintenta guardar lo pendiente hasta que venza el plazo de gracia.
+    """
+    while pending:
+        pending = _flush(pending)
+        if not pending or lifecycle.time_left() <= 0:
+            break
+        sleep(min(0.5, lifecycle.time_left()))
+    return pending
+
+
+def empezar_monitoreo(stop: Optional[threading.Event] = None):
+    """
+    Loop del runner. Corre hasta que se setea `stop` (por defecto
+    lifecycle.SHUTDOWN): termina el check en curso, guarda lo pendiente y sale.
+    """
+    stop = stop or lifecycle.SHUTDOWN
     print("🚀 Iniciando API Monitor...\n")
 
     bot_token = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -65,78 +354,112 @@ def empezar_monitoreo():
     else:
         print("✅ Telegram habilitado (TELEGRAM_BOT_TOKEN OK")
 
+    store = get_storage()
+
+    # Logs viejos con response en texto -> store deduplicado (no-op si ya están migrados)
+    migrated = store.migrate_log_bodies()
+    if migrated:
+        print(f"🗜️ {migrated} logs migrados al store de respuestas deduplicadas.")
+
+    archive_enabled = archive.available()
+    if not archive_enabled:
+        print("ℹ️ Archivo Parquet deshabilitado (falta pyarrow/numpy).")
+    last_archive = 0.0
+
+    detector = _make_detector()
+    if detector is None:
+        print("ℹ️ Detector de latencia (DEGRADED) deshabilitado (falta numpy).")
+
+    # Estado de trabajo en memoria (una sola lectura); la DB se actualiza write-behind.
+    # La versión se lee antes que el estado: un cambio en el medio se re-aplica (idempotente).
+    catalog_version = store.get_catalog_version()
+    state = RunnerState.from_rows(store.get_runner_states())
+    # Se retoma el schedule guardado: tras un reinicio corto no hay una tanda
+    # extra fuera de turno (ni alertas repetidas, el estado previo también se
+    # carga). Un next_due absurdo (reloj movido) se acota a un INTERVAL.
+    now = time()
+    resumed = 0
+    for st in state:
+        if st.next_due > now:
+            st.next_due = min(st.next_due, now + INTERVAL)
+            resumed += 1
+    if resumed:
+        print(f"⏯️ {resumed} APIs retoman su turno guardado.")
+    pending = []
+    last_poll = time()
+    warned_empty = False
+
     try:
-        while True:
-            apis = get_all_apis()
+        while not stop.is_set():
+            now = time()
+            if now - last_poll >= CATALOG_POLL_SECONDS:
+                catalog_version = _apply_catalog_changes(state, catalog_version, detector, pending)
+                last_poll = now
 
-            if not apis:
-                print("⚠️ No hay APIs en la DB. Agrega con el dashboard o con main.py add")
-                sleep(INTERVAL)
+            if not len(state):
+                if not warned_empty:
+                    print("⚠️ No hay APIs en la DB. Agrega con el dashboard o con main.py add")
+                    warned_empty = True
+                stop.wait(CATALOG_POLL_SECONDS)
                 continue
+            warned_empty = False
 
-            for api_id, api_name, api_url in apis:
+            due = sorted((st for st in state if st.next_due <= now), key=lambda st: st.next_due)
+            # Próximo turno alineado a una grilla de INTERVAL: las APIs se siguen
+            # chequeando juntas (un flush y un update del detector por tanda).
+            batch_next = (now // INTERVAL + 1) * INTERVAL
+            samples = []  # (api_id, latencia real) de los checks UP de esta tanda
+            metrics = CycleMetrics()
+
+            for i, st in enumerate(due):
+                if stop.is_set():
+                    # Las que faltan conservan su turno vencido: se chequean al volver.
+                    print(f"⏸️ {len(due) - i} checks de la tanda quedan para el próximo arranque.")
+                    break
+
+                # Mientras dura la tanda se sigue mirando el catálogo: una API
+                # borrada deja de chequearse en el momento.
+                if time() - last_poll >= CATALOG_POLL_SECONDS:
+                    catalog_version = _apply_catalog_changes(state, catalog_version, detector, pending)
+                    last_poll = time()
+                    if st.api_id not in state:
+                        continue
+
+                st.next_due = batch_next
                 try:
-                    result = check_api(api_url)
-
-                    # 1) Guardar log histórico
-                    save_log_dataBase(api_id, result)
-
-                    # 2) Estado actual y anterior
-                    curr_status = result["status"]
-                    prev_status = get_last_status(api_id)  # None la primera vez
-
-                    status_code = result.get("status_code")
-                    lat = result.get("latency")
-                    lat_txt = f"{lat}s" if lat is not None else "N/A"
-
-                    print(f"{api_name} → {curr_status} ({status_code}) Latency: {lat_txt}")
-
-                    # 3) Reglas alertas:
-                    # - DOWN: alertar inmediato y luego cooldown (persistente)
-                    # - RECOVERED: alertar solo si venía de DOWN
-                    send_alert = False
-                    alert_reason = ""
-
-                    if curr_status == "DOWN":
-                        if telegram_enabled and _cooldown_ok(api_id):
-                            send_alert = True
-                            alert_reason = "DOWN"
-
-                    elif curr_status == "UP" and prev_status == "DOWN":
-                        if telegram_enabled:
-                            send_alert = True
-                            alert_reason = "RECOVERED"
-
-                    # 4) Enviar alerta si corresponde (a TODOS los suscritos)
-                    if telegram_enabled and send_alert:
-                        if alert_reason == "DOWN":
-                            msg = (
-                                "🚨 API DOWN\n"
-                                f"Name: {api_name}\n"
-                                f"URL: {api_url}\n"
-                                f"Code: {status_code}\n"
-                                f"Latency: {lat_txt}\n"
-                            )
-                        else:
-                            msg = (
-                                "✅ API RECOVERED\n"
-                                f"Name: {api_name}\n"
-                                f"URL: {api_url}\n"
-                                f"Code: {status_code}\n"
-                                f"Latency: {lat_txt}\n"
-                            )
-
-                        tried = _send_to_all(bot_token, msg)
-                        touch_alert(api_id)  # persistimos last_alert_at
-                        print(f"📨 Alerta Telegram enviada a {tried} suscriptores.")
-
-                    # 5) Guardar estado actual (para dashboard)
-                    update_state(api_id, curr_status, status_code, lat)
+                    _check_one(st, pending, samples, metrics, telegram_enabled, bot_token)
+                except Exception as e:
+                    print(f"❌ Error inesperado monitoreando {st.url}: {e}")
+
+                # Una alerta enviada se persiste ya (last_alert_at): si el
+                # proceso muere no se repite al reiniciar.
+                if len(pending) >= FLUSH_MAX_PENDING or (pending and pending[-1]["alerted"]):
+                    pending = _flush(pending)
 
+            pending = _flush(pending)
+            if metrics.checks:
+                print(metrics.summary())
+
+            if samples and detector is not None:
+                try:
+                    _alert_latency_anomalies(detector, samples, state, telegram_enabled, bot_token)
                 except Exception as e:
-                    print(f"❌ Error inesperado monitoreando {api_url}: {e}")
+                    print(f"❌ Error en detector de latencia: {e}")
+
+            if archive_enabled:
+                last_archive = _maybe_archive(last_archive)
+
+            # Dormir hasta el próximo check (o hasta el próximo vistazo al catálogo).
+            next_due = min((st.next_due for st in state), default=time() + CATALOG_POLL_SECONDS)
+            stop.wait(max(0.0, min(next_due - time(), CATALOG_POLL_SECONDS)))
 
-            sleep(INTERVAL)
+        pending = _drain(pending)
+        if pending:
+            print(f"⚠️ {len(pending)} checks no se pudieron guardar antes del plazo.")
+        print("🛑 Monitor detenido.")
 
     except KeyboardInterrupt:
+        _flush(pending)
         print("\n🛑 Monitor detenido por el usuario (Ctrl+C).")
+    finally:
+        store.close()  # memoria: última foto a disco
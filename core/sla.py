@@ -0,0 +1,187 @@
+"""
+Motor de SLA: disponibilidad, MTTR, MTBF e incidentes por API en ventanas
+móviles (24h/7d/30d/90d).
+
+Se alimenta de `status_transitions`: cada transición UP<->DOWN guarda los
+acumulados hasta ese instante. El valor de cualquier métrica en un tiempo T se
+obtiene de la última transición <= T (un seek en el índice (api_id, at)), y una
+ventana [T - W, T] es la resta de dos de esos valores. Costo por consulta:
+O(APIs), sin importar cuánto historial haya.
+
+Las funciones reciben la conexión para que las use tanto core/logic.py como
+telegram_bot.py (que tiene su propia conexión).
+
+Limitación: solo se descuenta como no observado lo posterior al último check
+(ver CHECK_INTERVAL_SECONDS). Si el runner estuvo parado y al volver la API
+seguía en el mismo estado, no queda ninguna transición que marque el hueco y
+ese tramo cuenta como UP (o DOWN) observado.
+"""
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+SLA_WINDOWS = {
+    "24h": 24 * 3600,
+    "7d": 7 * 24 * 3600,
+    "30d": 30 * 24 * 3600,
+    "90d": 90 * 24 * 3600,
+}
+
+# Los timestamps de texto de la DB están en UTC-3 (ver TZ_MOD en core/logic.py).
+_DB_TZ = timezone(timedelta(hours=-3))
+
+_ZERO = {"up": 0.0, "down": 0.0, "incidents": 0, "repairs": 0, "repair_seconds": 0.0}
+
+# El último estado conocido vale hasta el último check más un intervalo del
+# runner (INTERVAL en core/runner.py); después de eso no hay observación:
+# una API que dejó de chequearse no suma uptime (ni downtime) para siempre.
+CHECK_INTERVAL_SECONDS = 10
+
+
+def db_ts_to_epoch(ts: str) -> float:
+    return datetime.strptime(ts, "%Y-%m-%d %H:%M:%S").replace(tzinfo=_DB_TZ).timestamp()
+
+
+# ------ ESCRITURA ------
+
+def record_transition(conn: sqlite3.Connection, api_id: int, status: str, at: Optional[float] = None) -> None:
+    """
+    Registra que `api_id` pasó a `status` en `at` (epoch). El llamador decide
+    cuándo hubo cambio (ver update_state en core/logic.py).
+    """
+    at = time.time() if at is None else at
+    prev = conn.execute(
+        """
+        SELECT status, at, cum_up, cum_down, cum_incidents, cum_repairs, cum_repair_seconds
+        FROM status_transitions
+        WHERE api_id = ?
+        ORDER BY at DESC
+        LIMIT 1;
+        """,
+        (api_id,),
+    ).fetchone()
+
+    if prev is None:
+        row = dict(_ZERO, incidents=1 if status == "DOWN" else 0)
+    else:
+        if prev["status"] == status:
+            return
+        elapsed = max(0.0, at - prev["at"])
+        was_down = prev["status"] == "DOWN"
+        row = {
+            "up": prev["cum_up"] + (0.0 if was_down else elapsed),
+            "down": prev["cum_down"] + (elapsed if was_down else 0.0),
+            "incidents": prev["cum_incidents"] + (1 if status == "DOWN" else 0),
+            "repairs": prev["cum_repairs"] + (1 if was_down else 0),
+            "repair_seconds": prev["cum_repair_seconds"] + (elapsed if was_down else 0.0),
+        }
+
+    conn.execute(
+        """
+        INSERT INTO status_transitions
+            (api_id, status, at, cum_up, cum_down, cum_incidents, cum_repairs, cum_repair_seconds)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+        """,
+        (api_id, status, at, row["up"], row["down"], row["incidents"], row["repairs"], row["repair_seconds"]),
+    )
+
+
+def backfill_transitions(conn: sqlite3.Connection) -> None:
+    """
+    Reconstruye las transiciones a partir de `logs` (una sola pasada, ordenada
+    por API y tiempo). Se usa en la migración de DBs que ya tenían historial.
+    """
+    cur = conn.execute("SELECT api_id, status, timestamp FROM logs ORDER BY api_id, id;")
+    last: Dict[int, str] = {}
+    for api_id, status, ts in cur:
+        if last.get(api_id) == status or not ts:
+            continue
+        last[api_id] = status
+        record_transition(conn, api_id, status, db_ts_to_epoch(ts))
+
+
+# ------ LECTURA ------
+
+def _cumulative_at(conn: sqlite3.Connection, t: float, api_ids: Optional[List[int]]) -> Dict[int, Dict[str, Any]]:
+    """
+    Acumulados de cada API en el instante t (un seek por API). El tramo desde
+    la última transición se cuenta solo hasta el último check + CHECK_INTERVAL_SECONDS.
+    """
+    where = ""
+    params: List[Any] = [t]
+    if api_ids is not None:
+        where = f"WHERE a.id IN ({','.join('?' * len(api_ids))})"
+        params.extend(api_ids)
+
+    rows = conn.execute(
+        f"""
+        SELECT a.id AS api_id, t.status, t.at, t.cum_up, t.cum_down,
+               t.cum_incidents, t.cum_repairs, t.cum_repair_seconds, s.last_checked_at
+        FROM APIs a
+        LEFT JOIN api_state s ON s.api_id = a.id
+        LEFT JOIN status_transitions t ON t.id = (
+            SELECT id FROM status_transitions
+            WHERE api_id = a.id AND at <= ?
+            ORDER BY at DESC
+            LIMIT 1
+        )
+        {where};
+        """,
+        params,
+    ).fetchall()
+
+    out = {}
+    for r in rows:
+        if r["status"] is None:
+            out[r["api_id"]] = dict(_ZERO)
+            continue
+        if r["last_checked_at"]:
+            observed_until = min(t, db_ts_to_epoch(r["last_checked_at"]) + CHECK_INTERVAL_SECONDS)
+        else:
+            observed_until = r["at"]  # sin checks registrados: nada observado después de la transición
+        tail = max(0.0, observed_until - r["at"])
+        is_down = r["status"] == "DOWN"
+        out[r["api_id"]] = {
+            "up": r["cum_up"] + (0.0 if is_down else tail),
+            "down": r["cum_down"] + (tail if is_down else 0.0),
+            "incidents": r["cum_incidents"],
+            "repairs": r["cum_repairs"],
+            "repair_seconds": r["cum_repair_seconds"],
+        }
+    return out
+
+
+def _window_metrics(end: Dict[str, Any], start: Dict[str, Any]) -> Dict[str, Any]:
+    d = {k: end[k] - start[k] for k in _ZERO}
+    observed = d["up"] + d["down"]
+    return {
+        "availability": round(100.0 * d["up"] / observed, 4) if observed > 0 else None,
+        "observed_seconds": round(observed, 1),
+        "downtime_seconds": round(d["down"], 1),
+        "incidents": d["incidents"],
+        "mttr_seconds": round(d["repair_seconds"] / d["repairs"], 1) if d["repairs"] else None,
+        "mtbf_seconds": round(d["up"] / d["incidents"], 1) if d["incidents"] else None,
+    }
+
+
+def compute_sla(
+    conn: sqlite3.Connection,
+    api_ids: Optional[Iterable[int]] = None,
+    windows: Optional[Dict[str, int]] = None,
+    now: Optional[float] = None,
+) -> Dict[int, Dict[str, Dict[str, Any]]]:
+    """
+    {api_id: {"24h": {...}, "7d": {...}, ...}} para las APIs pedidas (o todas).
+    """
+    now = time.time() if now is None else now
+    windows = SLA_WINDOWS if windows is None else windows
+    ids = None if api_ids is None else sorted(set(int(x) for x in api_ids))
+
+    end = _cumulative_at(conn, now, ids)
+    out: Dict[int, Dict[str, Dict[str, Any]]] = {api_id: {} for api_id in end}
+    for label, seconds in windows.items():
+        start = _cumulative_at(conn, now - seconds, ids)
+        for api_id, e in end.items():
+            out[api_id][label] = _window_metrics(e, start.get(api_id, _ZERO))
+    return out
@@ -0,0 +1,115 @@
+"""
+Estado de trabajo del runner, en memoria.
+
+Se carga una vez al arrancar (una consulta) y después es la fuente de verdad
+del runner: último status, última alerta (epoch), racha de fallas, próximo
+check y timeout adaptativo (ver core/timeouts.py). La DB se actualiza
+write-behind en lotes (ver save_check_batch en core/logic.py), así cada
+check no hace lecturas ni parseo de timestamps.
+
+ApiRuntimeState usa __slots__ para que la memoria por API sea chica y fija.
+"""
+import json
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from core.assertions import AssertionSet, compile_assertions
+from core.sla import db_ts_to_epoch
+from core.timeouts import LatencyWindow
+
+
+def load_assertions(spec_json: Optional[str], api_id: int) -> Optional[AssertionSet]:
+    """
+    Compila el spec guardado en DB. Un spec roto no frena al runner: se ignora.
+    """
+    if not spec_json:
+        return None
+    try:
+        return compile_assertions(json.loads(spec_json))
+    except ValueError as e:
+        print(f"⚠️ Assertions inválidas para API {api_id}, se ignoran: {e}")
+        return None
+
+
+class ApiRuntimeState:
+    __slots__ = (
+        "api_id", "name", "url", "last_status", "last_alert_ts", "fail_streak", "next_due", "assertions", "probe",
+        "latencies", "timeout", "last_degraded_alert_ts",
+    )
+
+    def __init__(
+        self,
+        api_id: int,
+        name: str,
+        url: str,
+        last_status: Optional[str] = None,
+        last_alert_ts: Optional[float] = None,
+        fail_streak: int = 0,
+        next_due: float = 0.0,
+        assertions: Optional[AssertionSet] = None,
+        probe: str = "http",
+        timeout: Optional[Tuple[float, float]] = None,
+    ):
+        self.api_id = api_id
+        self.name = name
+        self.url = url
+        self.last_status = last_status
+        self.last_alert_ts = last_alert_ts
+        self.fail_streak = fail_streak
+        self.next_due = next_due
+        self.assertions = assertions  # compiladas una vez; se recompilan cuando cambian en DB
+        self.probe = probe            # ver PROBES en core/checker.py
+        self.latencies = LatencyWindow()
+        self.timeout = timeout        # (connect, read) aprendido; None = default del checker
+        self.last_degraded_alert_ts: Optional[float] = None  # cooldown de alertas DEGRADED (solo en memoria)
+
+    def __repr__(self) -> str:
+        return f"ApiRuntimeState(api_id={self.api_id}, last_status={self.last_status!r}, fail_streak={self.fail_streak})"
+
+
+class RunnerState:
+    def __init__(self):
+        self._by_id: Dict[int, ApiRuntimeState] = {}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict]) -> "RunnerState":
+        """
+        rows: salida de get_runner_states() (un único parseo de last_alert_at acá).
+        """
+        st = cls()
+        for r in rows:
+            ts = r.get("last_alert_at")
+            st.add(ApiRuntimeState(
+                r["api_id"],
+                r["name"],
+                r["url"],
+                last_status=r.get("last_status"),
+                last_alert_ts=db_ts_to_epoch(ts) if ts else None,
+                fail_streak=1 if r.get("last_status") == "DOWN" else 0,
+                next_due=r.get("next_due_epoch") or 0.0,  # retoma el schedule guardado
+                assertions=load_assertions(r.get("assertions"), r["api_id"]),
+                probe=r.get("probe") or "http",
+                timeout=(r["timeout_connect"], r["timeout_read"]) if r.get("timeout_read") else None,
+            ))
+        return st
+
+    def add(self, s: ApiRuntimeState) -> ApiRuntimeState:
+        self._by_id[s.api_id] = s
+        return s
+
+    def get(self, api_id: int) -> Optional[ApiRuntimeState]:
+        return self._by_id.get(api_id)
+
+    def remove(self, api_id: int) -> Optional[ApiRuntimeState]:
+        return self._by_id.pop(api_id, None)
+
+    def ids(self):
+        return self._by_id.keys()
+
+    def __iter__(self) -> Iterator[ApiRuntimeState]:
+        return iter(list(self._by_id.values()))
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, api_id: int) -> bool:
+        return api_id in self._by_id
@@ -0,0 +1,85 @@
+"""
+Backends de almacenamiento del runner y el bot (interfaz en base.py).
+
+STORAGE_BACKEND elige el de get_storage():
+
+- sqlite (default): DataBase/dataBase.db, el que comparten runner, API,
+  dashboard y bot.
+- memory: solo para `main.py run`. Vive en el proceso del runner: la API,
+  el dashboard y el bot siguen leyendo SQLite y no ven sus checks. Al
+  arrancar vacío se copia el catálogo de SQLite (ver seed_from).
+"""
+import os
+import threading
+from typing import Optional
+
+from core.storage.base import Storage
+from core.storage.memory import MemoryStorage
+from core.storage.sqlite import SQLiteStorage
+
+BACKENDS = {"sqlite": SQLiteStorage, "memory": MemoryStorage}
+
+_storage: Optional[Storage] = None
+_lock = threading.Lock()
+
+
+def create_storage(backend: Optional[str] = None) -> Storage:
+    backend = (backend or os.getenv("STORAGE_BACKEND", "sqlite")).strip().lower()
+    cls = BACKENDS.get(backend)
+    if cls is None:
+        raise ValueError(f"STORAGE_BACKEND inválido: {backend} (opciones: {', '.join(sorted(BACKENDS))})")
+    return cls()
+
+
+def get_storage() -> Storage:
+    """
+    El backend del proceso (se crea en el primer uso).
+    """
+    global _storage
+    if _storage is None:
+        with _lock:
+            if _storage is None:
+                _storage = create_storage()
+    return _storage
+
+
+def set_storage(storage: Optional[Storage]) -> Optional[Storage]:
+    """
+    Reemplaza el backend del proceso (benchmarks, conformidad); devuelve el anterior.
+    """
+    global _storage
+    with _lock:
+        prev, _storage = _storage, storage
+    return prev
+
+
+def seed_from(dst: Storage, src: Storage) -> int:
+    """
+    Copia a `dst` el catálogo de `src` (con probe, assertions y tags), los
+    suscriptores y sus follows. Los ids de `dst` pueden no coincidir con los
+    de `src`: los follows por API se remapean. Devuelve cuántas APIs copió.
+    """
+    ids = {}
+    for api_id, name, url in src.get_all_apis():
+        new_id = dst.add_api(name, url, src.get_api(api_id)["probe"])
+        spec = src.get_assertions(api_id)
+        if spec:
+            dst.set_assertions(new_id, spec)
+        tags = src.get_api_tags(api_id)
+        if tags:
+            dst.set_api_tags(new_id, tags)
+        ids[api_id] = new_id
+
+    for sub in src.get_subscribers():
+        try:
+            chat_id = int(sub["chat_id"])
+        except (TypeError, ValueError):
+            continue
+        dst.add_subscriber(chat_id, sub["username"], sub["first_name"], sub["last_name"])
+    for chat_id, (api_ids, group_keys) in src.get_follow_specs().items():
+        for api_id in api_ids:
+            if api_id in ids:
+                dst.follow_api(chat_id, ids[api_id])
+        for key in group_keys:
+            dst.follow_group(chat_id, key)
+    return len(ids)
@@ -0,0 +1,257 @@
+"""
+Interfaz de almacenamiento: catálogo, estado, logs, suscriptores y follows.
+
+Es lo que usan el runner y el bot para leer/escribir. Cada backend implementa
+estos métodos con la misma semántica (la verifica core/storage/conformance.py):
+
+- catálogo: alta idempotente por URL, versión creciente y cambios desde una
+  versión (altas/ediciones/bajas) para que el runner aplique solo lo nuevo
+- estado: último resultado por API, escrito en lotes (save_check_batch) y
+  contadores del overview
+- logs: por API del más nuevo al más viejo, o todos en orden de timestamp
+- grupos: tags "tipo:camino" por API; cada grupo incluye a sus subgrupos
+- suscriptores del bot y sus follows, por API o por grupo (un chat sin
+  follows recibe todas)
+
+SLA e incidentes son opcionales (solo SQLite; los demás dan
+NotImplementedError). Archivo Parquet, export y sparklines siguen siendo
+solo de SQLite, en core/logic.py.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from core.logic import EXPORT_CHUNK_ROWS
+
+
+class Storage(ABC):
+    name = "base"
+    shared = True  # lo ven los demás procesos (API, dashboard, bot)
+
+    # ----- catálogo -----
+
+    @abstractmethod
+    def add_api(self, name: str, url: str, probe: Optional[str] = None) -> int:
+        """
+        Alta de una API; devuelve su id (el de la existente si la URL ya estaba).
+        ValueError si el nombre, la URL o el probe son inválidos.
+        """
+
+    @abstractmethod
+    def delete_api(self, api_id: int) -> None:
+        """
+        Baja de una API con su estado, logs, assertions y follows.
+        """
+
+    @abstractmethod
+    def get_api(self, api_id: int) -> Optional[Dict[str, Any]]:
+        """
+        {id, name, url, probe, created_at} o None.
+        """
+
+    @abstractmethod
+    def get_all_apis(self) -> List[Tuple[int, str, str]]:
+        """
+        [(id, name, url)] ordenado por id.
+        """
+
+    @abstractmethod
+    def get_apis_by_ids(self, api_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        {api_id: {api_id, name, url}} de las que existen, en una lectura.
+        """
+
+    @abstractmethod
+    def set_probe(self, api_id: int, probe: Optional[str]) -> bool:
+        """
+        Cambia el probe. False si la API no existe; ValueError si el probe es inválido.
+        """
+
+    @abstractmethod
+    def get_assertions(self, api_id: int) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def set_assertions(self, api_id: int, spec: Optional[Dict[str, Any]]) -> None:
+        """
+        Guarda (o borra, con spec vacío) las assertions. ValueError si el spec es inválido.
+        """
+
+    @abstractmethod
+    def get_catalog_version(self) -> int:
+        ...
+
+    @abstractmethod
+    def get_catalog_changes(self, since_version: int) -> Tuple[int, List[Dict[str, Any]], List[int]]:
+        """
+        (nueva_version, altas/ediciones [{api_id, name, url, probe, assertions}], ids borrados).
+        `assertions` es el spec en JSON (texto) o None.
+        """
+
+    @abstractmethod
+    def prune_catalog_changes(self, upto_version: int) -> None:
+        """
+        Descarta cambios viejos; la versión del catálogo nunca retrocede.
+        """
+
+    # ----- estado -----
+
+    @abstractmethod
+    def get_runner_states(self) -> List[Dict[str, Any]]:
+        """
+        Catálogo + último estado, para RunnerState.from_rows (ver core/state.py).
+        """
+
+    @abstractmethod
+    def save_check_batch(self, checks: List[Dict[str, Any]]) -> None:
+        """
+        Persiste un lote de checks del runner (formato en core/logic.py).
+        """
+
+    @abstractmethod
+    def get_current_states(self) -> List[Dict[str, Any]]:
+        """
+        [{api_id, name, url, last_status, last_status_code, last_latency,
+        last_checked_at}] por id; last_status es "UNKNOWN" si nunca se chequeó.
+        """
+
+    @abstractmethod
+    def get_overview_stats(self) -> Dict[str, Any]:
+        """
+        {total, up, down, unknown, status_codes, latency_buckets}.
+        """
+
+    # ----- logs -----
+
+    @abstractmethod
+    def get_logs(
+        self, api_id: int, limit: int = 200, since: Optional[str] = None, until: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Logs de una API, del más nuevo al más viejo (limit acotado a 2000).
+        """
+
+    @abstractmethod
+    def iter_logs(
+        self,
+        api_ids: Optional[List[int]] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        with_response: bool = True,
+        chunk_rows: int = EXPORT_CHUNK_ROWS,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Todos los logs en orden de timestamp, de a `chunk_rows` filas.
+        """
+
+    # ----- grupos (tags) -----
+
+    @abstractmethod
+    def set_api_tags(self, api_id: int, tags: List[str]) -> bool:
+        """
+        Reemplaza los tags de una API (p.ej. "region:us/east", que también la
+        pone en "region:us"). False si la API no existe; ValueError si algún
+        tag es inválido.
+        """
+
+    @abstractmethod
+    def get_api_tags(self, api_id: int) -> List[str]:
+        """
+        Tags asignados, ordenados.
+        """
+
+    @abstractmethod
+    def get_groups(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        [{key, kind, parent, total, up, down, unknown, status}] ordenado por key
+        (status: ver logic.group_status). Solo grupos con alguna API.
+        """
+
+    @abstractmethod
+    def get_group_member_ids(self, keys: Iterable[str]) -> Set[int]:
+        """
+        APIs de los grupos, incluidas las de sus subgrupos.
+        """
+
+    # ----- suscriptores y follows -----
+
+    @abstractmethod
+    def add_subscriber(self, chat_id: int, username: str = None, first_name: str = None, last_name: str = None) -> None:
+        ...
+
+    @abstractmethod
+    def remove_subscriber(self, chat_id: int) -> None:
+        ...
+
+    @abstractmethod
+    def get_subscribers(self) -> List[Dict[str, Any]]:
+        """
+        [{chat_id, username, first_name, last_name}].
+        """
+
+    @abstractmethod
+    def follow_api(self, chat_id: int, api_id: int) -> None:
+        ...
+
+    @abstractmethod
+    def unfollow_api(self, chat_id: int, api_id: int) -> None:
+        ...
+
+    @abstractmethod
+    def get_followed_api_ids(self, chat_id: int) -> Set[int]:
+        ...
+
+    @abstractmethod
+    def follow_group(self, chat_id: int, group_key: str) -> None:
+        ...
+
+    @abstractmethod
+    def unfollow_group(self, chat_id: int, group_key: str) -> None:
+        ...
+
+    @abstractmethod
+    def get_followed_groups(self, chat_id: int) -> Set[str]:
+        ...
+
+    @abstractmethod
+    def clear_follows(self, chat_id: int) -> None:
+        """
+        Borra los follows (APIs y grupos) del chat: vuelve a recibir todas.
+        """
+
+    @abstractmethod
+    def get_follow_specs(self) -> Dict[int, Tuple[Set[int], Set[str]]]:
+        """
+        {chat_id: (APIs, grupos)} de todos los suscriptores.
+        """
+
+    @abstractmethod
+    def get_chat_ids_following_api(self, api_id: int) -> List[int]:
+        """
+        Chats a avisar por una API: los que la siguen (directo o por un grupo
+        que la contiene) más los suscriptores sin ningún follow.
+        """
+
+    # ----- SLA e incidentes (opcional: solo SQLite) -----
+
+    def get_sla(self, api_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """
+        [{api_id, name, windows}] (ver core/sla.py); None = todas.
+        """
+        raise NotImplementedError(f"{self.name}: sin SLA")
+
+    def get_incidents(self, api_ids: Optional[List[int]] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Incidentes del más nuevo al más viejo; None = de todas las APIs.
+        """
+        raise NotImplementedError(f"{self.name}: sin incidentes")
+
+    # ----- mantenimiento (opcional) -----
+
+    def migrate_log_bodies(self) -> int:
+        return 0
+
+    def archive_logs(self) -> Dict[str, int]:
+        return {"rows": 0, "days": 0}
+
+    def close(self) -> None:
+        pass
@@ -0,0 +1,458 @@
+"""
+Suite de conformidad de los backends de core/storage: los mismos checks
+contra SQLite y contra memoria, cada uno sobre un backend recién creado.
+Cualquier backend nuevo tiene que pasarla entera.
+
+Uso:
+    python -m core.storage.conformance [sqlite|memory|all]
+"""
+import os
+import sys
+import tempfile
+import traceback
+from typing import Callable, Dict, List, Tuple
+
+from core.storage.base import Storage
+from core.storage.memory import MemoryStorage
+from core.storage.sqlite import SQLiteStorage
+
+CHECKS: List[Callable[[Storage], None]] = []
+
+
+def check(fn):
+    CHECKS.append(fn)
+    return fn
+
+
+def _expect_error(fn, *args) -> None:
+    try:
+        fn(*args)
+    except ValueError:
+        return
+    raise AssertionError(f"{fn.__name__}{args} debía dar ValueError")
+
+
+def _check(api_id: int, status: str, ts: str, *, code=None, latency=0.1, response=None, alerted=False, next_due=None, timeout=None):
+    """
+    Un item de save_check_batch como los que arma el runner.
+    """
+    code = code if code is not None else (200 if status == "UP" else 503)
+    return {
+        "api_id": api_id,
+        "result": {"status": status, "status_code": code, "latency": latency, "response": response},
+        "checked_at": ts,
+        "checked_epoch": 0.0,
+        "prev_status": None,
+        "alerted": alerted,
+        "next_due": next_due,
+        "timeout": timeout,
+    }
+
+
+# ----- catálogo -----
+
+@check
+def add_api_is_idempotent_by_url(s: Storage) -> None:
+    a = s.add_api("Uno", "https://uno.example.com/health")
+    b = s.add_api("Dos", "https://dos.example.com/health", "head")
+    assert isinstance(a, int) and a != b
+    assert s.add_api("Otro nombre", " https://uno.example.com/health ") == a
+
+    api = s.get_api(b)
+    assert {k: api[k] for k in ("id", "name", "url", "probe")} == {
+        "id": b, "name": "Dos", "url": "https://dos.example.com/health", "probe": "head"
+    }, api
+    assert api["created_at"]
+    assert s.get_api(a)["name"] == "Uno" and s.get_api(a)["probe"] == "http"
+    assert s.get_api(999) is None
+    assert s.get_all_apis() == [(a, "Uno", "https://uno.example.com/health"), (b, "Dos", "https://dos.example.com/health")]
+
+
+@check
+def add_api_validates(s: Storage) -> None:
+    _expect_error(s.add_api, "", "https://x.example.com")
+    _expect_error(s.add_api, "X", "no-es-una-url")
+    _expect_error(s.add_api, "X", "https://x.example.com", "ftp")
+    assert s.get_all_apis() == []
+
+
+@check
+def set_probe(s: Storage) -> None:
+    a = s.add_api("Uno", "https://uno.example.com")
+    assert s.set_probe(a, "tcp") is True
+    assert s.get_api(a)["probe"] == "tcp"
+    assert s.set_probe(999, "tcp") is False
+    _expect_error(s.set_probe, a, "gopher")
+    assert s.get_api(a)["probe"] == "tcp"
+
+
+@check
+def assertions_roundtrip(s: Storage) -> None:
+    a = s.add_api("Uno", "https://uno.example.com")
+    assert s.get_assertions(a) is None
+    spec = {"status": [200], "body_contains": "ok"}
+    s.set_assertions(a, spec)
+    assert s.get_assertions(a) == spec
+    _expect_error(s.set_assertions, a, {"status": "nope"})
+    assert s.get_assertions(a) == spec
+    s.set_assertions(a, None)
+    assert s.get_assertions(a) is None
+
+
+@check
+def assertions_by_probe(s: Storage) -> None:
+    a = s.add_api("Uno", "https://uno.example.com", "tcp")
+    _expect_error(s.set_assertions, a, {"body_contains": "ok"})
+    assert s.get_assertions(a) is None
+    s.set_assertions(a, {"max_latency_ms": 500})
+    assert s.get_assertions(a) == {"max_latency_ms": 500}
+
+    # Cambiar a un probe que no puede evaluar las assertions que ya tiene
+    b = s.add_api("Dos", "https://dos.example.com")
+    s.set_assertions(b, {"status": [200], "body_contains": "ok"})
+    _expect_error(s.set_probe, b, "head")
+    assert s.get_api(b)["probe"] == "http"
+    s.set_assertions(b, {"status": [200]})
+    assert s.set_probe(b, "head") is True
+
+
+@check
+def api_tags(s: Storage) -> None:
+    a = s.add_api("Uno", "https://uno.example.com")
+    assert s.get_api_tags(a) == []
+    assert s.set_api_tags(a, [" Team:Pagos ", "region:us/east", "team:pagos"]) is True
+    assert s.get_api_tags(a) == ["region:us/east", "team:pagos"]
+    _expect_error(s.set_api_tags, a, ["sin-tipo"])
+    assert s.get_api_tags(a) == ["region:us/east", "team:pagos"]
+    assert s.set_api_tags(999, ["team:pagos"]) is False
+    assert s.set_api_tags(a, []) is True
+    assert s.get_api_tags(a) == []
+
+
+@check
+def groups(s: Storage) -> None:
+    a = s.add_api("Uno", "https://uno.example.com")
+    b = s.add_api("Dos", "https://dos.example.com")
+    s.set_api_tags(a, ["region:us/east"])
+    s.set_api_tags(b, ["region:us/west", "team:pagos"])
+    s.save_check_batch([_check(a, "UP", "2026-01-01 00:00:00"), _check(b, "DOWN", "2026-01-01 00:00:00")])
+
+    got = {g["key"]: g for g in s.get_groups("region")}
+    assert list(got) == ["region:us", "region:us/east", "region:us/west"]
+    assert {k: got["region:us"][k] for k in ("kind", "parent", "total", "up", "down", "unknown", "status")} == {
+        "kind": "region", "parent": None, "total": 2, "up": 1, "down": 1, "unknown": 0, "status": "MIXED"
+    }, got["region:us"]
+    assert got["region:us/east"]["parent"] == "region:us" and got["region:us/east"]["status"] == "UP"
+    assert [g["key"] for g in s.get_groups()] == ["region:us", "region:us/east", "region:us/west", "team:pagos"]
+
+    assert s.get_group_member_ids(["region:us"]) == {a, b}
+    assert s.get_group_member_ids(["team:pagos", "region:us/east"]) == {a, b}
+    assert s.get_group_member_ids(["region:eu"]) == set() and s.get_group_member_ids([]) == set()
+
+    # Un grupo sin APIs desaparece
+    s.set_api_tags(b, ["team:pagos"])
+    assert [g["key"] for g in s.get_groups("region")] == ["region:us", "region:us/east"]
+    assert s.get_group_member_ids(["region:us"]) == {a}
+
+
+@check
+def group_follows(s: Storage) -> None:
+    a = s.add_api("Uno", "https://uno.example.com")
+    b = s.add_api("Dos", "https://dos.example.com")
+    s.set_api_tags(a, ["team:pagos/core", "env:prod"])
+    for chat_id in (1, 2, 3):
+        s.add_subscriber(chat_id)
+    s.follow_group(1, "team:pagos")
+    s.follow_group(1, "team:pagos")
+    s.follow_group(3, "env:staging")
+    assert s.get_followed_groups(1) == {"team:pagos"}
+
+    # 1 recibe `a` por el grupo padre, 2 no sigue nada (todas) y 3 sigue un
+    # grupo sin APIs: seguir solo un grupo ya cuenta como tener follows
+    assert sorted(s.get_chat_ids_following_api(a)) == [1, 2]
+    assert sorted(s.get_chat_ids_following_api(b)) == [2]
+
+    # Sacarle el tag a la API la saca del grupo
+    s.set_api_tags(a, ["env:prod"])
+    assert sorted(s.get_chat_ids_following_api(a)) == [2]
+    s.set_api_tags(b, ["team:pagos"])
+    assert sorted(s.get_chat_ids_following_api(b)) == [1, 2]
+
+    s.follow_api(1, a)
+    assert s.get_follow_specs() == {1: ({a}, {"team:pagos"}), 2: (set(), set()), 3: (set(), {"env:staging"})}
+
+    s.unfollow_group(1, "team:pagos")
+    assert s.get_followed_groups(1) == set()
+    assert sorted(s.get_chat_ids_following_api(b)) == [2]
+    s.follow_group(1, "env:prod")
+    s.clear_follows(1)
+    assert s.get_follow_specs()[1] == (set(), set())
+    assert sorted(s.get_chat_ids_following_api(a)) == [1, 2]
+
+    # Borrar la API la saca de sus grupos
+    s.follow_group(3, "team:pagos")
+    s.delete_api(b)
+    c = s.add_api("Tres", "https://tres.example.com")
+    assert sorted(s.get_chat_ids_following_api(c)) == [1, 2]
+
+
+@check
+def catalog_changes(s: Storage) -> None:
+    v0 = s.get_catalog_version()
+    assert s.get_catalog_changes(v0) == (v0, [], [])
+
+    a = s.add_api("Uno", "https://uno.example.com")
+    b = s.add_api("Dos", "https://dos.example.com")
+    v1, upserts, deleted = s.get_catalog_changes(v0)
+    assert v1 > v0 and v1 == s.get_catalog_version()
+    assert [u["api_id"] for u in upserts] == [a, b] and deleted == []
+    assert upserts[0] == {"api_id": a, "name": "Uno", "url": "https://uno.example.com", "probe": "http", "assertions": None}
+
+    # Ediciones: probe y assertions (que viajan como JSON)
+    s.set_probe(b, "head")
+    s.set_assertions(b, {"status": [204]})
+    v2, upserts, deleted = s.get_catalog_changes(v1)
+    assert v2 > v1 and deleted == []
+    assert len(upserts) == 1 and upserts[0]["api_id"] == b and upserts[0]["probe"] == "head"
+    assert upserts[0]["assertions"] is not None and "204" in upserts[0]["assertions"]
+
+    # Baja, y alta + baja entre dos lecturas (cuenta como baja)
+    s.delete_api(a)
+    c = s.add_api("Tres", "https://tres.example.com")
+    s.delete_api(c)
+    v3, upserts, deleted = s.get_catalog_changes(v2)
+    assert upserts == [] and sorted(deleted) == sorted([a, c])
+
+    # Podar no hace retroceder la versión ni repite cambios
+    s.prune_catalog_changes(v3)
+    assert s.get_catalog_version() == v3
+    assert s.get_catalog_changes(v3) == (v3, [], [])
+    s.add_api("Cuatro", "https://cuatro.example.com")
+    v4, upserts, _ = s.get_catalog_changes(v3)
+    assert v4 > v3 and [u["name"] for u in upserts] == ["Cuatro"]
+
+
+# ----- estado -----
+
+@check
+def save_check_batch_updates_state(s: Storage) -> None:
+    a = s.add_api("Uno", "https://uno.example.com")
+    b = s.add_api("Dos", "https://dos.example.com")
+    s.save_check_batch([])
+
+    rows = {r["api_id"]: r for r in s.get_runner_states()}
+    assert list(rows) == [a, b]
+    assert rows[a]["last_status"] is None and rows[a]["next_due_epoch"] is None and rows[a]["assertions"] is None
+
+    s.save_check_batch([
+        _check(a, "UP", "2026-01-01 00:00:00", next_due=100.0, timeout=(1.5, 3.0)),
+        _check(b, "DOWN", "2026-01-01 00:00:01", alerted=True),
+    ])
+    rows = {r["api_id"]: r for r in s.get_runner_states()}
+    assert rows[a]["last_status"] == "UP" and rows[a]["next_due_epoch"] == 100.0
+    assert (rows[a]["timeout_connect"], rows[a]["timeout_read"]) == (1.5, 3.0)
+    assert rows[a]["last_alert_at"] is None
+    assert rows[b]["last_status"] == "DOWN" and rows[b]["last_alert_at"] == "2026-01-01 00:00:01"
+    assert rows[b]["timeout_read"] is None
+
+    # Un check sin alerta no borra la última alerta
+    s.save_check_batch([_check(b, "UP", "2026-01-01 00:00:11")])
+    rows = {r["api_id"]: r for r in s.get_runner_states()}
+    assert rows[b]["last_status"] == "UP" and rows[b]["last_alert_at"] == "2026-01-01 00:00:01"
+
+
+@check
+def current_states(s: Storage) -> None:
+    a = s.add_api("Uno", "https://uno.example.com")
+    b = s.add_api("Dos", "https://dos.example.com")
+    s.save_check_batch([_check(b, "DOWN", "2026-01-01 00:00:00", latency=None)])
+    assert s.get_current_states() == [
+        {"api_id": a, "name": "Uno", "url": "https://uno.example.com", "last_status": "UNKNOWN",
+         "last_status_code": None, "last_latency": None, "last_checked_at": None},
+        {"api_id": b, "name": "Dos", "url": "https://dos.example.com", "last_status": "DOWN",
+         "last_status_code": 503, "last_latency": None, "last_checked_at": "2026-01-01 00:00:00"},
+    ]
+    assert s.get_apis_by_ids([b, 999]) == {b: {"api_id": b, "name": "Dos", "url": "https://dos.example.com"}}
+    assert s.get_apis_by_ids([]) == {}
+
+
+@check
+def overview_counters(s: Storage) -> None:
+    a = s.add_api("Uno", "https://uno.example.com")
+    b = s.add_api("Dos", "https://dos.example.com")
+    c = s.add_api("Tres", "https://tres.example.com")
+    o = s.get_overview_stats()
+    assert (o["total"], o["up"], o["down"], o["unknown"]) == (3, 0, 0, 3)
+    assert o["status_codes"] == {} and o["latency_buckets"] == {}
+
+    s.save_check_batch([
+        _check(a, "UP", "2026-01-01 00:00:00", latency=0.05),
+        _check(b, "UP", "2026-01-01 00:00:00", latency=0.05),
+        _check(c, "DOWN", "2026-01-01 00:00:00", latency=None),
+    ])
+    o = s.get_overview_stats()
+    assert (o["total"], o["up"], o["down"], o["unknown"]) == (3, 2, 1, 0)
+    assert o["status_codes"] == {"200": 2, "503": 1}
+    assert sum(o["latency_buckets"].values()) == 3 and o["latency_buckets"]["none"] == 1
+
+    s.save_check_batch([_check(b, "DOWN", "2026-01-01 00:00:10", latency=None)])
+    o = s.get_overview_stats()
+    assert (o["up"], o["down"]) == (1, 2) and o["status_codes"] == {"200": 1, "503": 2}
+
+    s.delete_api(c)
+    o = s.get_overview_stats()
+    assert (o["total"], o["up"], o["down"], o["unknown"]) == (2, 1, 1, 0)
+    assert o["status_codes"] == {"200": 1, "503": 1}
+
+
+# ----- logs -----
+
+def _seed_logs(s: Storage) -> Tuple[int, int]:
+    a = s.add_api("Uno", "https://uno.example.com")
+    b = s.add_api("Dos", "https://dos.example.com")
+    for i in range(5):
+        s.save_check_batch([
+            _check(a, "UP", f"2026-01-01 00:00:{i * 10:02d}", response=f"ok {i}"),
+            _check(b, "DOWN" if i == 2 else "UP", f"2026-01-01 00:00:{i * 10 + 5:02d}", response="same body"),
+        ])
+    return a, b
+
+
+@check
+def get_logs_newest_first(s: Storage) -> None:
+    a, b = _seed_logs(s)
+    logs = s.get_logs(a)
+    assert [r["timestamp"] for r in logs] == [f"2026-01-01 00:00:{i * 10:02d}" for i in (4, 3, 2, 1, 0)]
+    assert logs[0]["response"] == "ok 4" and logs[0]["api_id"] == a
+    assert set(logs[0]) == {"id", "api_id", "status", "status_code", "latency", "response", "timestamp"}
+    assert {r["id"] for r in logs}.isdisjoint(r["id"] for r in s.get_logs(b))
+
+    assert [r["response"] for r in s.get_logs(a, limit=2)] == ["ok 4", "ok 3"]
+    window = s.get_logs(a, since="2026-01-01 00:00:10", until="2026-01-01 00:00:30")
+    assert [r["response"] for r in window] == ["ok 3", "ok 2", "ok 1"]
+    assert [r["status"] for r in s.get_logs(b)] == ["UP", "UP", "DOWN", "UP", "UP"]
+    assert s.get_logs(999) == []
+
+
+@check
+def iter_logs_in_timestamp_order(s: Storage) -> None:
+    a, b = _seed_logs(s)
+    chunks = list(s.iter_logs(chunk_rows=3))
+    assert [len(c) for c in chunks] == [3, 3, 3, 1]
+    rows = [r for c in chunks for r in c]
+    assert [r["timestamp"] for r in rows] == sorted(r["timestamp"] for r in rows)
+    assert [r["api_id"] for r in rows] == [a, b] * 5
+    assert rows[1]["response"] == "same body"
+
+    only_b = [r for c in s.iter_logs([b], since="2026-01-01 00:00:15", until="2026-01-01 00:00:35") for r in c]
+    assert [r["timestamp"] for r in only_b] == ["2026-01-01 00:00:15", "2026-01-01 00:00:25", "2026-01-01 00:00:35"]
+
+    light = next(iter(s.iter_logs(with_response=False)))
+    assert "response" not in light[0] and light[0]["status"] == "UP"
+    assert list(s.iter_logs([])) == []
+
+
+@check
+def delete_api_drops_logs_and_state(s: Storage) -> None:
+    a, b = _seed_logs(s)
+    s.delete_api(a)
+    assert s.get_api(a) is None
+    assert s.get_logs(a) == []
+    assert [r["api_id"] for r in s.get_runner_states()] == [b]
+    assert {r["api_id"] for c in s.iter_logs() for r in c} == {b}
+
+
+# ----- suscriptores y follows -----
+
+@check
+def subscribers(s: Storage) -> None:
+    assert s.get_subscribers() == []
+    s.add_subscriber(10, "ana", "Ana")
+    s.add_subscriber(20)
+    s.add_subscriber(10)  # re-suscribirse no borra los datos
+    subs = {x["chat_id"]: x for x in s.get_subscribers()}
+    assert set(subs) == {10, 20}
+    assert subs[10] == {"chat_id": 10, "username": "ana", "first_name": "Ana", "last_name": None}
+    s.add_subscriber(10, "ana2")
+    assert {x["chat_id"]: x for x in s.get_subscribers()}[10]["username"] == "ana2"
+    s.remove_subscriber(20)
+    s.remove_subscriber(30)
+    assert [x["chat_id"] for x in s.get_subscribers()] == [10]
+
+
+@check
+def follows(s: Storage) -> None:
+    a = s.add_api("Uno", "https://uno.example.com")
+    b = s.add_api("Dos", "https://dos.example.com")
+    for chat_id in (10, 20, 30):
+        s.add_subscriber(chat_id)
+
+    s.follow_api(10, a)
+    s.follow_api(10, a)
+    s.follow_api(20, b)
+    assert s.get_followed_api_ids(10) == {a}
+    assert s.get_followed_api_ids(30) == set()
+
+    # 30 no sigue nada: recibe todas
+    assert sorted(s.get_chat_ids_following_api(a)) == [10, 30]
+    assert sorted(s.get_chat_ids_following_api(b)) == [20, 30]
+
+    s.unfollow_api(10, a)
+    s.unfollow_api(10, b)
+    assert s.get_followed_api_ids(10) == set()
+    assert sorted(s.get_chat_ids_following_api(a)) == [10, 30]
+
+    # Borrar la API borra sus follows: 20 vuelve a recibir todas
+    s.delete_api(b)
+    assert s.get_followed_api_ids(20) == set()
+    assert sorted(s.get_chat_ids_following_api(a)) == [10, 20, 30]
+
+
+def run(factory: Callable[[str], Storage], only: List[str] = None) -> List[Tuple[str, str]]:
+    """
+    Corre los checks, cada uno con un backend nuevo de factory(nombre_del_check).
+    Devuelve [(check, error)] de los que fallaron.
+    """
+    failures = []
+    for fn in CHECKS:
+        if only and fn.__name__ not in only:
+            continue
+        store = factory(fn.__name__)
+        try:
+            fn(store)
+        except Exception:
+            failures.append((fn.__name__, traceback.format_exc()))
+        finally:
+            store.close()
+    return failures
+
+
+def factories(tmp: str) -> Dict[str, Callable[[str], Storage]]:
+    return {
+        "sqlite": lambda name: SQLiteStorage(os.path.join(tmp, f"{name}.db")),
+        "memory": lambda name: MemoryStorage(snapshot_path=None),
+    }
+
+
+def main(argv: List[str]) -> int:
+    which = argv[0] if argv else "all"
+    tmp = tempfile.mkdtemp(prefix="storage_conformance_")
+    backends = factories(tmp)
+    if which != "all" and which not in backends:
+        print(f"Backend desconocido: {which} (opciones: {', '.join(backends)}, all)")
+        return 2
+
+    failed = 0
+    for name, factory in backends.items():
+        if which not in ("all", name):
+            continue
+        failures = run(factory)
+        print(f"{'✅' if not failures else '❌'} {name}: {len(CHECKS) - len(failures)}/{len(CHECKS)} checks")
+        for check_name, tb in failures:
+            print(f"   ✗ {check_name}\n{tb}")
+        failed += len(failures)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,547 @@
+"""
+Backend en memoria: benchmarks, la suite de conformidad y `main.py run` con
+STORAGE_BACKEND=memory (los demás procesos no lo ven, ver __init__.py).
+
+Todo vive en dicts indexados (APIs por id y por URL, estado por API, follows
+en los dos sentidos, grupos -> APIs con los ancestros de cada tag) y los logs en un ring buffer por API de LOG_RING_SIZE
+checks: la memoria queda acotada sin importar cuánto corra. Los contadores
+del overview se mantienen al escribir (como los triggers de SQLite), así que
+leerlos es O(1).
+
+Opcionalmente se guarda una foto JSON a disco cada SNAPSHOT_EVERY_SECONDS
+(escritura atómica: archivo temporal + os.replace) y al cerrar, y se carga al
+arrancar: un reinicio no pierde catálogo, estado, suscriptores ni los logs
+del ring. Sin MEMORY_SNAPSHOT_PATH no se toca el disco.
+
+No implementa SLA, incidentes ni el archivo Parquet (ver base.py).
+"""
+import heapq
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from collections import Counter, deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from core.assertions import check_probe_assertions, compile_assertions
+from core.logic import EXPORT_CHUNK_ROWS, check_probe, db_now, latency_bucket, validate_api
+from core.logic import group_status, parse_tag, tag_chain
+from core.storage.base import Storage
+
+LOG_RING_SIZE = int(os.getenv("MEMORY_LOG_RING", "1000"))          # logs por API
+SNAPSHOT_PATH = os.getenv("MEMORY_SNAPSHOT_PATH") or None
+SNAPSHOT_EVERY_SECONDS = float(os.getenv("MEMORY_SNAPSHOT_SECONDS", "60"))
+
+# Un log es una tupla (mucho más chica que un dict); se arma el dict al leer.
+_LOG_COLS = ("id", "api_id", "status", "status_code", "latency", "response", "timestamp")
+_TS = _LOG_COLS.index("timestamp")
+
+_STATE_COLS = (
+    "last_status", "last_status_code", "last_latency", "last_latency_bucket", "last_checked_at", "last_alert_at",
+    "next_due_epoch", "timeout_connect", "timeout_read",
+)
+
+
+def _counter_keys(st: Dict[str, Any]) -> Tuple[str, str, str]:
+    # Mismas claves que overview_counters en SQLite
+    code = st["last_status_code"]
+    return (
+        st["last_status"] or "UNKNOWN",
+        str(code) if code is not None else "none",
+        st["last_latency_bucket"] or "none",
+    )
+
+
+class MemoryStorage(Storage):
+    name = "memory"
+    shared = False
+
+    def __init__(
+        self,
+        log_ring: int = LOG_RING_SIZE,
+        snapshot_path: Optional[str] = SNAPSHOT_PATH,
+        snapshot_every: float = SNAPSHOT_EVERY_SECONDS,
+    ):
+        # Un solo lock (reentrante): el runner escribe y el hilo de snapshot
+        # (o un lector) puede leer a la vez. Cada operación es O(lote).
+        self._lock = threading.RLock()
+        self.log_ring = log_ring
+        self.snapshot_path = snapshot_path
+
+        self._apis: Dict[int, Dict[str, Any]] = {}
+        self._by_url: Dict[str, int] = {}
+        self._next_api_id = 1
+        self._assertions: Dict[int, str] = {}      # spec en JSON, como en SQLite
+        self._version = 0
+        self._changes: List[Tuple[int, int, str]] = []  # (version, api_id, op), ordenado por version
+
+        self._state: Dict[int, Dict[str, Any]] = {}
+        self._counters = {"status": Counter(), "status_code": Counter(), "latency": Counter()}
+        self._logs: Dict[int, deque] = {}
+        self._next_log_id = 1
+
+        self._tags: Dict[int, Set[str]] = {}       # API -> tags asignados
+        self._members: Dict[str, Set[int]] = {}    # grupo (y ancestros) -> APIs; sin grupos vacíos
+
+        self._subscribers: Dict[int, Dict[str, Any]] = {}
+        self._follows: Dict[int, Set[int]] = {}    # chat -> APIs
+        self._followers: Dict[int, Set[int]] = {}  # API -> chats
+        self._group_follows: Dict[int, Set[str]] = {}  # chat -> keys de grupo
+        self._group_followers: Dict[str, Set[int]] = {}  # key de grupo -> chats
+
+        if snapshot_path and os.path.exists(snapshot_path):
+            self._load(snapshot_path)
+
+        self._stop = threading.Event()
+        self._thread = None
+        if snapshot_path and snapshot_every > 0:
+            self._thread = threading.Thread(
+                target=self._snapshot_loop, args=(snapshot_every,), name="memory-snapshot", daemon=True
+            )
+            self._thread.start()
+
+    # ----- catálogo -----
+
+    def _change(self, api_id: int, op: str) -> None:
+        self._version += 1
+        self._changes.append((self._version, api_id, op))
+
+    def add_api(self, name: str, url: str, probe: Optional[str] = None) -> int:
+        name, url, probe = validate_api(name, url, probe)
+        with self._lock:
+            api_id = self._by_url.get(url)
+            if api_id is not None:
+                return api_id
+            api_id = self._next_api_id
+            self._next_api_id += 1
+            self._apis[api_id] = {"id": api_id, "name": name, "url": url, "probe": probe, "created_at": db_now()}
+            self._by_url[url] = api_id
+            self._change(api_id, "upsert")
+            return api_id
+
+    def delete_api(self, api_id: int) -> None:
+        with self._lock:
+            api = self._apis.pop(api_id, None)
+            if api is None:
+                return
+            del self._by_url[api["url"]]
+            self._assertions.pop(api_id, None)
+            self._logs.pop(api_id, None)
+            st = self._state.pop(api_id, None)
+            if st is not None:
+                for counter, key in zip(self._counters.values(), _counter_keys(st)):
+                    counter[key] -= 1
+            for chat_id in self._followers.pop(api_id, ()):
+                self._follows[chat_id].discard(api_id)
+            self._set_membership(api_id, set())
+            self._change(api_id, "delete")
+
+    def get_api(self, api_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            api = self._apis.get(api_id)
+            return dict(api) if api else None
+
+    def get_all_apis(self) -> List[Tuple[int, str, str]]:
+        with self._lock:
+            return [(a["id"], a["name"], a["url"]) for a in sorted(self._apis.values(), key=lambda a: a["id"])]
+
+    def get_apis_by_ids(self, api_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        with self._lock:
+            return {
+                i: {"api_id": i, "name": self._apis[i]["name"], "url": self._apis[i]["url"]}
+                for i in set(api_ids) if i in self._apis
+            }
+
+    def set_probe(self, api_id: int, probe: Optional[str]) -> bool:
+        probe = check_probe(probe)
+        with self._lock:
+            api = self._apis.get(api_id)
+            if api is None:
+                return False
+            spec = self._assertions.get(api_id)
+            if spec:
+                check_probe_assertions(probe, json.loads(spec))
+            api["probe"] = probe
+            self._change(api_id, "upsert")
+            return True
+
+    def get_assertions(self, api_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            spec = self._assertions.get(api_id)
+        return json.loads(spec) if spec else None
+
+    def set_assertions(self, api_id: int, spec: Optional[Dict[str, Any]]) -> None:
+        compile_assertions(spec)
+        with self._lock:
+            if api_id not in self._apis:
+                return
+            check_probe_assertions(self._apis[api_id]["probe"], spec)
+            if not spec:
+                if self._assertions.pop(api_id, None) is not None:
+                    self._change(api_id, "upsert")
+                return
+            self._assertions[api_id] = json.dumps(spec)
+            self._change(api_id, "upsert")
+
+    def get_catalog_version(self) -> int:
+        with self._lock:
+            return self._version
+
+    def get_catalog_changes(self, since_version: int) -> Tuple[int, List[Dict[str, Any]], List[int]]:
+        with self._lock:
+            i = bisect_right(self._changes, since_version, key=lambda c: c[0])
+            rows = self._changes[i:]
+            if not rows:
+                return since_version, [], []
+
+            last_op: Dict[int, str] = {}
+            for _, api_id, op in rows:
+                last_op[api_id] = op
+
+            upserts = []
+            deleted = []
+            for api_id, op in last_op.items():
+                api = self._apis.get(api_id)
+                if op == "delete" or api is None:
+                    deleted.append(api_id)
+                else:
+                    upserts.append({
+                        "api_id": api_id, "name": api["name"], "url": api["url"], "probe": api["probe"],
+                        "assertions": self._assertions.get(api_id),
+                    })
+            return rows[-1][0], upserts, deleted
+
+    def prune_catalog_changes(self, upto_version: int) -> None:
+        with self._lock:
+            i = bisect_left(self._changes, upto_version, key=lambda c: c[0])
+            del self._changes[:i]
+
+    # ----- estado -----
+
+    def get_runner_states(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            out = []
+            for api_id in sorted(self._apis):
+                api = self._apis[api_id]
+                st = self._state.get(api_id) or {}
+                out.append({
+                    "api_id": api_id, "name": api["name"], "url": api["url"], "probe": api["probe"],
+                    "last_status": st.get("last_status"), "last_alert_at": st.get("last_alert_at"),
+                    "next_due_epoch": st.get("next_due_epoch"),
+                    "timeout_connect": st.get("timeout_connect"), "timeout_read": st.get("timeout_read"),
+                    "assertions": self._assertions.get(api_id),
+                })
+            return out
+
+    def save_check_batch(self, checks: List[Dict[str, Any]]) -> None:
+        if not checks:
+            return
+        with self._lock:
+            for c in checks:
+                api_id = c["api_id"]
+                if api_id not in self._apis:
+                    continue  # borrada mientras el lote esperaba
+                r = c["result"]
+                lat = r.get("latency")
+
+                ring = self._logs.get(api_id)
+                if ring is None:
+                    ring = self._logs[api_id] = deque(maxlen=self.log_ring)
+                ring.append((self._next_log_id, api_id, r["status"], r.get("status_code"), lat, r.get("response"), c["checked_at"]))
+                self._next_log_id += 1
+
+                st = self._state.get(api_id)
+                if st is None:
+                    st = self._state[api_id] = dict.fromkeys(_STATE_COLS)
+                    old_keys = None
+                else:
+                    old_keys = _counter_keys(st)
+                connect, read = c.get("timeout") or (None, None)
+                st.update(
+                    last_status=r["status"], last_status_code=r.get("status_code"), last_latency=lat,
+                    last_latency_bucket=latency_bucket(lat), last_checked_at=c["checked_at"],
+                    next_due_epoch=c.get("next_due"), timeout_connect=connect, timeout_read=read,
+                )
+                if c.get("alerted"):
+                    st["last_alert_at"] = c["checked_at"]
+
+                new_keys = _counter_keys(st)
+                if new_keys != old_keys:
+                    for counter, old, new in zip(self._counters.values(), old_keys or (None,) * 3, new_keys):
+                        if old != new:
+                            if old is not None:
+                                counter[old] -= 1
+                            counter[new] += 1
+
+    def get_current_states(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            out = []
+            for api_id in sorted(self._apis):
+                api = self._apis[api_id]
+                st = self._state.get(api_id) or {}
+                out.append({
+                    "api_id": api_id, "name": api["name"], "url": api["url"],
+                    "last_status": st.get("last_status") or "UNKNOWN",
+                    "last_status_code": st.get("last_status_code"), "last_latency": st.get("last_latency"),
+                    "last_checked_at": st.get("last_checked_at"),
+                })
+            return out
+
+    def get_overview_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = len(self._apis)
+            status = self._counters["status"]
+            up, down = status["UP"], status["DOWN"]
+            return {
+                "total": total,
+                "up": up,
+                "down": down,
+                "unknown": total - up - down,
+                "status_codes": {k: n for k, n in self._counters["status_code"].items() if n > 0},
+                "latency_buckets": {k: n for k, n in self._counters["latency"].items() if n > 0},
+            }
+
+    # ----- logs -----
+
+    def get_logs(
+        self, api_id: int, limit: int = 200, since: Optional[str] = None, until: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        limit = max(1, min(int(limit), 2000))
+        out = []
+        with self._lock:
+            for row in reversed(self._logs.get(api_id, ())):
+                ts = row[_TS]
+                if until and ts > until:
+                    continue
+                if since and ts < since:
+                    break  # el ring está en orden de timestamp
+                out.append(dict(zip(_LOG_COLS, row)))
+                if len(out) >= limit:
+                    break
+        return out
+
+    def iter_logs(
+        self,
+        api_ids: Optional[List[int]] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        with_response: bool = True,
+        chunk_rows: int = EXPORT_CHUNK_ROWS,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        # Foto de los rings (el runner sigue escribiendo) y merge por timestamp.
+        with self._lock:
+            ids = self._logs.keys() if api_ids is None else [i for i in api_ids if i in self._logs]
+            rings = [list(self._logs[i]) for i in ids]
+
+        chunk: List[Dict[str, Any]] = []
+        for row in heapq.merge(*rings, key=lambda r: r[_TS]):
+            ts = row[_TS]
+            if (since and ts < since) or (until and ts > until):
+                continue
+            d = dict(zip(_LOG_COLS, row))
+            if not with_response:
+                del d["response"]
+            chunk.append(d)
+            if len(chunk) >= chunk_rows:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    # ----- grupos (tags) -----
+
+    def _groups_of(self, api_id: int) -> Set[str]:
+        return {key for tag in self._tags.get(api_id, ()) for key in tag_chain(tag)}
+
+    def _set_membership(self, api_id: int, tags: Set[str]) -> None:
+        old = self._groups_of(api_id)
+        if tags:
+            self._tags[api_id] = tags
+        else:
+            self._tags.pop(api_id, None)
+        new = self._groups_of(api_id)
+        for key in old - new:
+            members = self._members[key]
+            members.discard(api_id)
+            if not members:
+                del self._members[key]
+        for key in new - old:
+            self._members.setdefault(key, set()).add(api_id)
+
+    def set_api_tags(self, api_id: int, tags: List[str]) -> bool:
+        clean = {parse_tag(t) for t in tags or []}
+        with self._lock:
+            if api_id not in self._apis:
+                return False
+            self._set_membership(api_id, clean)
+            return True
+
+    def get_api_tags(self, api_id: int) -> List[str]:
+        with self._lock:
+            return sorted(self._tags.get(api_id, ()))
+
+    def get_groups(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        # Sin contadores por grupo: se cuentan los miembros (O(miembros)).
+        with self._lock:
+            out = []
+            for key in sorted(self._members):
+                k = key.split(":", 1)[0]
+                if kind and k != kind:
+                    continue
+                statuses = Counter((self._state.get(i) or {}).get("last_status") for i in self._members[key])
+                total, up, down = len(self._members[key]), statuses["UP"], statuses["DOWN"]
+                chain = tag_chain(key)
+                out.append({
+                    "key": key, "kind": k, "parent": chain[-2] if len(chain) > 1 else None,
+                    "total": total, "up": up, "down": down, "unknown": total - up - down,
+                    "status": group_status(up, down, total),
+                })
+            return out
+
+    def get_group_member_ids(self, keys: Iterable[str]) -> Set[int]:
+        with self._lock:
+            return {i for key in set(keys) for i in self._members.get(key, ())}
+
+    # ----- suscriptores y follows -----
+
+    def add_subscriber(self, chat_id: int, username: str = None, first_name: str = None, last_name: str = None) -> None:
+        with self._lock:
+            sub = self._subscribers.setdefault(
+                chat_id, {"chat_id": chat_id, "username": None, "first_name": None, "last_name": None}
+            )
+            for k, v in (("username", username), ("first_name", first_name), ("last_name", last_name)):
+                if v is not None:
+                    sub[k] = v
+
+    def remove_subscriber(self, chat_id: int) -> None:
+        with self._lock:
+            self._subscribers.pop(chat_id, None)
+
+    def get_subscribers(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(s) for s in self._subscribers.values()]
+
+    def follow_api(self, chat_id: int, api_id: int) -> None:
+        with self._lock:
+            if api_id not in self._apis:
+                return
+            self._follows.setdefault(chat_id, set()).add(api_id)
+            self._followers.setdefault(api_id, set()).add(chat_id)
+
+    def unfollow_api(self, chat_id: int, api_id: int) -> None:
+        with self._lock:
+            self._follows.get(chat_id, set()).discard(api_id)
+            self._followers.get(api_id, set()).discard(chat_id)
+
+    def get_followed_api_ids(self, chat_id: int) -> Set[int]:
+        with self._lock:
+            return set(self._follows.get(chat_id, ()))
+
+    def follow_group(self, chat_id: int, group_key: str) -> None:
+        with self._lock:
+            self._group_follows.setdefault(chat_id, set()).add(group_key)
+            self._group_followers.setdefault(group_key, set()).add(chat_id)
+
+    def unfollow_group(self, chat_id: int, group_key: str) -> None:
+        with self._lock:
+            self._group_follows.get(chat_id, set()).discard(group_key)
+            self._group_followers.get(group_key, set()).discard(chat_id)
+
+    def get_followed_groups(self, chat_id: int) -> Set[str]:
+        with self._lock:
+            return set(self._group_follows.get(chat_id, ()))
+
+    def clear_follows(self, chat_id: int) -> None:
+        with self._lock:
+            for api_id in self._follows.pop(chat_id, ()):
+                self._followers.get(api_id, set()).discard(chat_id)
+            for key in self._group_follows.pop(chat_id, ()):
+                self._group_followers.get(key, set()).discard(chat_id)
+
+    def get_follow_specs(self) -> Dict[int, Tuple[Set[int], Set[str]]]:
+        with self._lock:
+            return {
+                c: (set(self._follows.get(c, ())), set(self._group_follows.get(c, ())))
+                for c in self._subscribers
+            }
+
+    def get_chat_ids_following_api(self, api_id: int) -> List[int]:
+        with self._lock:
+            ids = set(self._followers.get(api_id, ()))
+            for key in self._groups_of(api_id):
+                ids.update(self._group_followers.get(key, ()))
+            ids.update(c for c in self._subscribers if not self._follows.get(c) and not self._group_follows.get(c))
+            return list(ids)
+
+    # ----- snapshot -----
+
+    def snapshot(self, path: Optional[str] = None) -> None:
+        """
+        Escribe la foto a disco (atómico: nunca queda un archivo a medias).
+        """
+        path = path or self.snapshot_path
+        if not path:
+            return
+        with self._lock:
+            data = {
+                "apis": list(self._apis.values()),
+                "next_api_id": self._next_api_id,
+                "assertions": self._assertions,
+                "catalog_version": self._version,
+                "state": self._state,
+                "logs": {api_id: list(ring) for api_id, ring in self._logs.items()},
+                "next_log_id": self._next_log_id,
+                "subscribers": list(self._subscribers.values()),
+                "follows": {chat_id: sorted(ids) for chat_id, ids in self._follows.items() if ids},
+                "group_follows": {chat_id: sorted(keys) for chat_id, keys in self._group_follows.items() if keys},
+                "tags": {api_id: sorted(tags) for api_id, tags in self._tags.items()},
+            }
+            raw = json.dumps(data, separators=(",", ":"))
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(raw)
+        os.replace(tmp, path)
+
+    def _load(self, path: str) -> None:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        # JSON no tiene claves enteras: se convierten de vuelta.
+        for api in data["apis"]:
+            self._apis[api["id"]] = api
+            self._by_url[api["url"]] = api["id"]
+        self._next_api_id = data["next_api_id"]
+        self._assertions = {int(k): v for k, v in data["assertions"].items()}
+        # Sin historial de cambios: quien arranque lee el catálogo entero.
+        self._version = data["catalog_version"]
+        self._state = {int(k): v for k, v in data["state"].items()}
+        for st in self._state.values():
+            for counter, key in zip(self._counters.values(), _counter_keys(st)):
+                counter[key] += 1
+        for k, rows in data["logs"].items():
+            self._logs[int(k)] = deque((tuple(r) for r in rows), maxlen=self.log_ring)
+        self._next_log_id = data["next_log_id"]
+        self._subscribers = {s["chat_id"]: s for s in data["subscribers"]}
+        for k, ids in data["follows"].items():
+            for api_id in ids:
+                self._follows.setdefault(int(k), set()).add(api_id)
+                self._followers.setdefault(api_id, set()).add(int(k))
+        for k, keys in data.get("group_follows", {}).items():
+            self._group_follows[int(k)] = set(keys)
+            for key in keys:
+                self._group_followers.setdefault(key, set()).add(int(k))
+        for k, tags in data.get("tags", {}).items():
+            self._set_membership(int(k), set(tags))
+
+    def _snapshot_loop(self, every: float) -> None:
+        while not self._stop.wait(every):
+            try:
+                self.snapshot()
+            except Exception as e:
+                print(f"❌ Error guardando snapshot en {self.snapshot_path}: {e}")
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.snapshot()
@@ -0,0 +1,206 @@
+"""
+Backend SQLite: el de siempre (DataBase/dataBase.db o DB_PATH).
+
+Delega en las funciones de core/logic.py, que siguen siendo la
+implementación (y las que usan directo la API y el dashboard).
+"""
+from contextlib import nullcontext
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from core import logic
+from core.storage.base import EXPORT_CHUNK_ROWS, Storage
+
+
+class SQLiteStorage(Storage):
+    name = "sqlite"
+
+    def __init__(self, db_path: Optional[str] = None):
+        # Sin db_path: la DB del proceso (DB_PATH). Con db_path (p.ej. la suite
+        # de conformidad) cada llamada corre adentro de logic.using_db().
+        self.db_path = db_path
+
+    def _db(self):
+        return logic.using_db(self.db_path) if self.db_path is not None else nullcontext()
+
+    # ----- catálogo -----
+
+    def add_api(self, name: str, url: str, probe: Optional[str] = None) -> int:
+        with self._db():
+            return logic.add_API_database(name, url, probe)
+
+    def delete_api(self, api_id: int) -> None:
+        with self._db():
+            logic.delete_api(api_id)
+
+    def get_api(self, api_id: int) -> Optional[Dict[str, Any]]:
+        with self._db():
+            return logic.get_api(api_id)
+
+    def get_all_apis(self) -> List[Tuple[int, str, str]]:
+        with self._db():
+            return logic.get_all_apis()
+
+    def get_apis_by_ids(self, api_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        with self._db():
+            return logic.get_apis_by_ids(api_ids)
+
+    def set_probe(self, api_id: int, probe: Optional[str]) -> bool:
+        with self._db():
+            return logic.set_probe(api_id, probe)
+
+    def get_assertions(self, api_id: int) -> Optional[Dict[str, Any]]:
+        with self._db():
+            return logic.get_assertions(api_id)
+
+    def set_assertions(self, api_id: int, spec: Optional[Dict[str, Any]]) -> None:
+        with self._db():
+            logic.set_assertions(api_id, spec)
+
+    def get_catalog_version(self) -> int:
+        with self._db():
+            return logic.get_catalog_version()
+
+    def get_catalog_changes(self, since_version: int) -> Tuple[int, List[Dict[str, Any]], List[int]]:
+        with self._db():
+            return logic.get_catalog_changes(since_version)
+
+    def prune_catalog_changes(self, upto_version: int) -> None:
+        with self._db():
+            logic.prune_catalog_changes(upto_version)
+
+    # ----- estado -----
+
+    def get_runner_states(self) -> List[Dict[str, Any]]:
+        with self._db():
+            return logic.get_runner_states()
+
+    def save_check_batch(self, checks: List[Dict[str, Any]]) -> None:
+        with self._db():
+            logic.save_check_batch(checks)
+
+    def get_current_states(self) -> List[Dict[str, Any]]:
+        with self._db():
+            return logic.get_current_states()
+
+    def get_overview_stats(self) -> Dict[str, Any]:
+        with self._db():
+            return logic.get_overview_stats()
+
+    # ----- logs -----
+
+    def get_logs(
+        self, api_id: int, limit: int = 200, since: Optional[str] = None, until: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        with self._db():
+            return logic.get_logs(api_id, limit, since, until)
+
+    def iter_logs(
+        self,
+        api_ids: Optional[List[int]] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        with_response: bool = True,
+        chunk_rows: int = EXPORT_CHUNK_ROWS,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        # Generador: cada tramo corre con la DB de este storage, no solo el primero
+        chunks = logic.iter_logs(api_ids, since, until, with_response, chunk_rows)
+        while True:
+            with self._db():
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
+
+    # ----- grupos (tags) -----
+
+    def set_api_tags(self, api_id: int, tags: List[str]) -> bool:
+        with self._db():
+            return logic.set_api_tags(api_id, tags)
+
+    def get_api_tags(self, api_id: int) -> List[str]:
+        with self._db():
+            return logic.get_api_tags(api_id)
+
+    def get_groups(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._db():
+            return logic.get_groups(kind)
+
+    def get_group_member_ids(self, keys: Iterable[str]) -> Set[int]:
+        with self._db():
+            return logic.get_group_member_ids(keys)
+
+    # ----- suscriptores y follows -----
+
+    def add_subscriber(self, chat_id: int, username: str = None, first_name: str = None, last_name: str = None) -> None:
+        with self._db():
+            logic.add_subscriber(chat_id, username, first_name, last_name)
+
+    def remove_subscriber(self, chat_id: int) -> None:
+        with self._db():
+            logic.remove_subscriber(chat_id)
+
+    def get_subscribers(self) -> List[Dict[str, Any]]:
+        with self._db():
+            return logic.get_subscribers()
+
+    def follow_api(self, chat_id: int, api_id: int) -> None:
+        with self._db():
+            logic.follow_api(chat_id, api_id)
+
+    def unfollow_api(self, chat_id: int, api_id: int) -> None:
+        with self._db():
+            logic.unfollow_api(chat_id, api_id)
+
+    def get_followed_api_ids(self, chat_id: int) -> Set[int]:
+        with self._db():
+            return logic.get_followed_api_ids(chat_id)
+
+    def follow_group(self, chat_id: int, group_key: str) -> None:
+        with self._db():
+            logic.follow_group(chat_id, group_key)
+
+    def unfollow_group(self, chat_id: int, group_key: str) -> None:
+        with self._db():
+            logic.unfollow_group(chat_id, group_key)
+
+    def get_followed_groups(self, chat_id: int) -> Set[str]:
+        with self._db():
+            return logic.get_followed_groups(chat_id)
+
+    def clear_follows(self, chat_id: int) -> None:
+        with self._db():
+            logic.clear_follows(chat_id)
+
+    def get_follow_specs(self) -> Dict[int, Tuple[Set[int], Set[str]]]:
+        with self._db():
+            return logic.get_follow_specs()
+
+    def get_chat_ids_following_api(self, api_id: int) -> List[int]:
+        with self._db():
+            return logic.get_chat_ids_following_api(api_id)
+
+    # ----- SLA e incidentes -----
+
+    def get_sla(self, api_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        with self._db():
+            return logic.get_sla(api_ids)
+
+    def get_incidents(self, api_ids: Optional[List[int]] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._db():
+            return logic.get_incidents(limit=limit, api_ids=api_ids)
+
+    # ----- mantenimiento -----
+
+    def migrate_log_bodies(self) -> int:
+        with self._db():
+            return logic.migrate_log_bodies()
+
+    def archive_logs(self) -> Dict[str, int]:
+        with self._db():
+            return logic.archive_logs()
+
+    def close(self) -> None:
+        # Solo con DB propia: la del proceso la siguen usando la API y el runner
+        if self.db_path is not None:
+            with self._db():
+                logic.close_conn()
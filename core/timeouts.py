@@ -0,0 +1,96 @@
+"""
+Timeouts adaptativos por API, aprendidos de su propia latencia.
+
+Con un timeout fijo de 10s, una API interna que responde en 50ms pero se
+cuelga tiene al runner esperando 10s, y una API batch que tarda 12s da DOWN
+aunque funcione. Acá cada API usa:
+
+    p99 de sus últimas WINDOW respuestas × FACTOR, acotado a [MIN, MAX]
+
+con connect y read por separado (connect tiene su propio techo: un servidor
+que no acepta la conexión en unos segundos no va a responder). Hasta juntar
+MIN_SAMPLES se usa el timeout por defecto de core/checker.py. Si un check
+corta por timeout, el próximo usa el doble (backoff, hasta BACKOFF_MAX × el
+valor aprendido): una API que solo se puso más lenta -o una batch que nunca
+entró en los 10s- llega a responder y su ventana se pone al día, y una que
+está colgada de verdad no vuelve a ocupar al runner el máximo entero.
+
+El runner guarda la ventana y el timeout en memoria (ApiRuntimeState) y el
+timeout en api_state, así un reinicio no vuelve a los 10s fijos.
+"""
+import os
+from array import array
+from typing import Optional
+
+from core.checker import DEFAULT_TIMEOUT, Timeout
+
+ENABLED = os.getenv("ADAPTIVE_TIMEOUTS", "1") == "1"
+FACTOR = float(os.getenv("TIMEOUT_P99_FACTOR", "3"))
+MIN_SECONDS = float(os.getenv("TIMEOUT_MIN_SECONDS", "1"))
+MAX_SECONDS = float(os.getenv("TIMEOUT_MAX_SECONDS", "30"))
+CONNECT_MAX_SECONDS = float(os.getenv("CONNECT_TIMEOUT_MAX_SECONDS", "5"))
+
+WINDOW = 50        # latencias por API
+MIN_SAMPLES = 20   # antes de esto se usa DEFAULT_TIMEOUT
+QUANTILE = 0.99
+BACKOFF_MAX = 4    # tope del backoff, en múltiplos del timeout aprendido
+
+
+class LatencyWindow:
+    """
+    Ring buffer de las últimas `size` latencias (array de doubles, tamaño fijo).
+    """
+    __slots__ = ("_buf", "_pos", "n")
+
+    def __init__(self, size: int = WINDOW):
+        self._buf = array("d", bytes(8 * size))
+        self._pos = 0
+        self.n = 0
+
+    def add(self, x: float) -> None:
+        self._buf[self._pos] = x
+        self._pos = (self._pos + 1) % len(self._buf)
+        self.n = min(self.n + 1, len(self._buf))
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Cuantil con interpolación lineal (como np.quantile).
+        """
+        if not self.n:
+            return None
+        s = sorted(self._buf[:self.n])
+        pos = (self.n - 1) * q
+        lo = int(pos)
+        hi = min(lo + 1, self.n - 1)
+        return s[lo] + (s[hi] - s[lo]) * (pos - lo)
+
+    def clear(self) -> None:
+        self._pos = 0
+        self.n = 0
+
+
+def _clamp(x: float, hi: float) -> float:
+    return round(min(max(x, MIN_SECONDS), hi), 3)
+
+
+def compute(window: LatencyWindow) -> Optional[Timeout]:
+    """
+    (connect, read) para la ventana, o None si todavía no hay muestras suficientes.
+    """
+    if window.n < MIN_SAMPLES:
+        return None
+    base = window.quantile(QUANTILE) * FACTOR
+    return _clamp(base, CONNECT_MAX_SECONDS), _clamp(base, MAX_SECONDS)
+
+
+def backoff(timeout: Optional[Timeout], window: LatencyWindow) -> Timeout:
+    """
+    Timeout para el check siguiente a uno que cortó: el doble del actual, sin
+    pasar BACKOFF_MAX × el aprendido (o el default) ni los techos.
+    """
+    connect, read = timeout or DEFAULT_TIMEOUT
+    base_connect, base_read = compute(window) or DEFAULT_TIMEOUT
+    return (
+        min(connect * 2, base_connect * BACKOFF_MAX, CONNECT_MAX_SECONDS),
+        min(read * 2, base_read * BACKOFF_MAX, MAX_SECONDS),
+    )
@@ -1,5 +1,5 @@
 import React, { useEffect, useMemo, useState } from "react";
-import { addApi, deleteApi, getApis, getLogs, getOverview, uploadApisTxt } from "./api.js";
+import { addApi, deleteApi, exportLogsUrl, getApis, getGroups, getIncidents, getLogs, getLogsBatch, getOverview, getProbes, getSla, uploadApisTxt } from "./api.js";
 
 function StatusBadge({ s }) {
   const cls = s === "UP" ? "badge up" : s === "DOWN" ? "badge down" : "badge";
@@ -59,15 +59,59 @@ function SineWave({ latency, seed = 0, status }) {
   );
 }
 
+// Latencia guardada en logs de los últimos minutos, promediada por bucket (/logs/batch).
+// Es la onda senoidal de demo de core/checker.py, no el tiempo real del request.
+// Los buckets con algún DOWN van en rojo.
+function Sparkline({ latency, status }) {
+  const w = 120;
+  const h = 24;
+  const pad = 2;
+  const vals = latency.filter((v) => v != null);
+  const max = Math.max(...vals, 0.001);
+  const x = (i) => (i / Math.max(1, latency.length - 1)) * w;
+  const y = (v) => h - pad - (v / max) * (h - pad * 2);
+
+  // Un tramo por cada racha de buckets con datos (los huecos quedan vacíos)
+  const segments = [];
+  let cur = [];
+  latency.forEach((v, i) => {
+    if (v == null) {
+      if (cur.length) segments.push(cur);
+      cur = [];
+    } else {
+      cur.push(`${x(i).toFixed(2)},${y(v).toFixed(2)}`);
+    }
+  });
+  if (cur.length) segments.push(cur);
+
+  return (
+    <svg className="wave" width={w} height={h} viewBox={`0 0 ${w} ${h}`} aria-hidden="true">
+      {segments.map((pts, k) => (
+        <polyline key={k} points={pts.join(" ")} fill="none" stroke="currentColor" strokeWidth="1.5" />
+      ))}
+      {status.map((s, i) =>
+        s === 0 ? <circle key={i} className="spark-down" cx={x(i)} cy={h - pad} r="1.8" fill="currentColor" /> : null
+      )}
+    </svg>
+  );
+}
+
 export default function App() {
-  const [overview, setOverview] = useState({ total: 0, up: 0, down: 0 });
+  const [overview, setOverview] = useState({ total: 0, up: 0, down: 0, unknown: 0 });
   const [apis, setApis] = useState([]);
+  const [series, setSeries] = useState(new Map());
   const [selectedId, setSelectedId] = useState(null);
   const [logs, setLogs] = useState([]);
+  const [sla, setSla] = useState(null);
+  const [incidents, setIncidents] = useState([]);
+  const [group, setGroup] = useState("");  // "" = todas
+  const [groups, setGroups] = useState([]);
   const [err, setErr] = useState("");
 
   const [name, setName] = useState("");
   const [url, setUrl] = useState("");
+  const [probe, setProbe] = useState("");  // "" = el default del server
+  const [probes, setProbes] = useState([]);
 
   const [txtFile, setTxtFile] = useState(null);
   const [uploadMsg, setUploadMsg] = useState("");
@@ -76,24 +120,49 @@ export default function App() {
   async function refresh() {
     setErr("");
     try {
-      const [ov, list] = await Promise.all([getOverview(), getApis()]);
+      // Sparklines en paralelo con el resto: un round trip para todo el fleet.
+      // Si falla el batch, la tabla sigue y cada fila cae a la SineWave.
+      const batchReq = getLogsBatch().catch(() => null);
+      const gs = await getGroups().catch(() => null);
+      if (gs) setGroups(gs);
+      // Si el grupo elegido ya no existe (le sacaron los tags), volver a todas
+      const g = group && (!gs || gs.some((x) => x.key === group)) ? group : null;
+      if (group && !g) setGroup("");
+      const [ov, list] = await Promise.all([getOverview(g), getApis(g)]);
       setOverview(ov);
       setApis(list);
+      const batch = await batchReq;
+      setSeries(
+        batch
+          ? new Map(batch.ids.map((id, i) => [id, { latency: batch.latency[i], status: batch.status[i] }]))
+          : new Map()
+      );
 
       if (selectedId) {
-        const l = await getLogs(selectedId, 200);
+        // SLA e incidentes son un extra: si fallan, los logs se muestran igual
+        const [l, s, inc] = await Promise.all([
+          getLogs(selectedId, 200),
+          getSla(selectedId).catch(() => null),
+          getIncidents(selectedId, 5).catch(() => []),
+        ]);
         setLogs(l);
+        setSla(s);
+        setIncidents(inc);
       }
     } catch (e) {
       setErr(String(e?.message || e));
     }
   }
 
+  useEffect(() => {
+    getProbes().then((p) => setProbes(p.probes)).catch(() => setProbes([]));
+  }, []);
+
   useEffect(() => {
     refresh();
     const t = setInterval(refresh, 5000);
     return () => clearInterval(t);
-  }, [selectedId]);
+  }, [selectedId, group]);
 
   const selectedApi = useMemo(
     () => apis.find((a) => a.id === selectedId) || null,
@@ -104,9 +173,10 @@ export default function App() {
     e.preventDefault();
     setErr("");
     try {
-      await addApi(name.trim(), url.trim());
+      await addApi(name.trim(), url.trim(), probe || null);
       setName("");
       setUrl("");
+      setProbe("");
       await refresh();
     } catch (e2) {
       setErr(String(e2?.message || e2));
@@ -120,6 +190,8 @@ export default function App() {
       if (selectedId === apiId) {
         setSelectedId(null);
         setLogs([]);
+        setSla(null);
+        setIncidents([]);
       }
       await refresh();
     } catch (e2) {
@@ -179,6 +251,10 @@ export default function App() {
             <div className="kpiLabel">DOWN</div>
             <div className="kpiValue">{overview.down}</div>
           </div>
+          <div className="kpi">
+            <div className="kpiLabel">UNKNOWN</div>
+            <div className="kpiValue">{overview.unknown ?? 0}</div>
+          </div>
         </div>
       </header>
 
@@ -188,6 +264,19 @@ export default function App() {
         <section className="card">
           <h2>APIs</h2>
 
+          {groups.length ? (
+            <div className="row">
+              <select value={group} onChange={(e) => setGroup(e.target.value)} title="Grupo">
+                <option value="">Todas las APIs</option>
+                {groups.map((g) => (
+                  <option key={g.key} value={g.key}>
+                    {g.key} ({g.up}/{g.total} UP)
+                  </option>
+                ))}
+              </select>
+            </div>
+          ) : null}
+
           <form className="row" onSubmit={onAdd}>
             <input
               placeholder="Nombre"
@@ -201,6 +290,14 @@ export default function App() {
               onChange={(e) => setUrl(e.target.value)}
               required
             />
+            {probes.length ? (
+              <select value={probe} onChange={(e) => setProbe(e.target.value)} title="Probe">
+                <option value="">probe</option>
+                {probes.map((p) => (
+                  <option key={p} value={p}>{p}</option>
+                ))}
+              </select>
+            ) : null}
             <button type="submit">Agregar</button>
           </form>
 
@@ -247,7 +344,11 @@ export default function App() {
                     <td className="mono">{a.name}</td>
                     <td>
                       <div>{a.last_latency != null ? `${a.last_latency}s` : "—"}</div>
-                      <SineWave latency={a.last_latency} seed={a.id} status={a.last_status} />
+                      {series.get(a.id)?.latency.some((v) => v != null) ? (
+                        <Sparkline {...series.get(a.id)} />
+                      ) : (
+                        <SineWave latency={a.last_latency} seed={a.id} status={a.last_status} />
+                      )}
                     </td>
                     <td className="mono">{a.last_checked_at || "—"}</td>
                     <td>
@@ -278,6 +379,31 @@ export default function App() {
             <div className="sub">
               <div><b>{selectedApi.name}</b></div>
               <div className="mono">{selectedApi.url}</div>
+              <div>
+                {/* Descarga directa: el navegador baja el export en streaming */}
+                <a href={exportLogsUrl({ ids: [selectedApi.id] })} download>
+                  Exportar logs (ndjson.gz)
+                </a>
+              </div>
+              {sla?.api_id === selectedApi.id ? (
+                <div className="row mono muted">
+                  {["24h", "7d", "30d"].map((w) => (
+                    <span key={w}>
+                      SLA {w}: {sla.windows[w]?.availability != null ? `${sla.windows[w].availability.toFixed(2)}%` : "—"}
+                    </span>
+                  ))}
+                </div>
+              ) : null}
+              {incidents.length && incidents[0].api_id === selectedApi.id ? (
+                <div className="mono muted">
+                  {incidents.map((i) => (
+                    <div key={i.id} className="clip">
+                      🚨 {i.opened_at} · {i.closed_at ? `${Math.round(i.duration_seconds)}s` : "abierto"}
+                      {i.last_error ? ` · ${i.last_error}` : ""}
+                    </div>
+                  ))}
+                </div>
+              ) : null}
             </div>
           ) : (
             <div className="muted">Seleccioná una API para ver logs.</div>
@@ -1,22 +1,26 @@
 const API_BASE = import.meta.env.VITE_API_BASE || "http://localhost:8001";
 
-export async function getOverview() {
-  const r = await fetch(`${API_BASE}/stats/overview`);
+function groupQuery(group) {
+  return group ? `?group=${encodeURIComponent(group)}` : "";
+}
+
+export async function getOverview(group = null) {
+  const r = await fetch(`${API_BASE}/stats/overview${groupQuery(group)}`);
   if (!r.ok) throw new Error("Error GET /stats/overview");
   return r.json();
 }
 
-export async function getApis() {
-  const r = await fetch(`${API_BASE}/apis`);
+export async function getApis(group = null) {
+  const r = await fetch(`${API_BASE}/apis${groupQuery(group)}`);
   if (!r.ok) throw new Error("Error GET /apis");
   return r.json();
 }
 
-export async function addApi(name, url) {
+export async function addApi(name, url, probe = null) {
   const r = await fetch(`${API_BASE}/apis`, {
     method: "POST",
     headers: { "Content-Type": "application/json" },
-    body: JSON.stringify({ name, url })
+    body: JSON.stringify(probe ? { name, url, probe } : { name, url })
   });
   if (!r.ok) {
     const body = await r.json().catch(() => ({}));
@@ -31,6 +35,25 @@ export async function getLogs(apiId, limit = 200) {
   return r.json();
 }
 
+// Series recientes de todas las APIs (o de `ids`) en un request, formato columnar:
+// { since, step, points, ids: [...], latency: [[...]], status: [[...]] }
+export async function getLogsBatch(ids = null, points = 60, minutes = 15) {
+  const q = new URLSearchParams({ points: String(points), minutes: String(minutes) });
+  if (ids?.length) q.set("ids", ids.join(","));
+  const r = await fetch(`${API_BASE}/logs/batch?${q}`);
+  if (!r.ok) throw new Error("Error GET /logs/batch");
+  return r.json();
+}
+
+// URL de descarga (se usa en un <a href> o window.open: el navegador la baja en streaming)
+export function exportLogsUrl({ ids = null, since = null, until = null, format = "ndjson", gzip = true } = {}) {
+  const q = new URLSearchParams({ format, gzip: String(gzip) });
+  if (ids?.length) q.set("ids", ids.join(","));
+  if (since) q.set("since", since);
+  if (until) q.set("until", until);
+  return `${API_BASE}/logs/export?${q}`;
+}
+
 export async function deleteApi(apiId) {
   const r = await fetch(`${API_BASE}/apis/${apiId}`, { method: "DELETE" });
   if (!r.ok) throw new Error("Error DELETE /apis/{id}");
@@ -52,3 +75,30 @@ export async function uploadApisTxt(file) {
   }
   return body;
 }
+
+export async function getSla(apiId) {
+  const path = apiId == null ? "/sla" : `/apis/${apiId}/sla`;
+  const r = await fetch(`${API_BASE}${path}`);
+  if (!r.ok) throw new Error(`Error GET ${path}`);
+  return r.json();
+}
+
+export async function getIncidents(apiId, limit = 50) {
+  const path = apiId == null ? "/incidents" : `/apis/${apiId}/incidents`;
+  const r = await fetch(`${API_BASE}${path}?limit=${limit}`);
+  if (!r.ok) throw new Error(`Error GET ${path}`);
+  return r.json();
+}
+
+export async function getProbes() {
+  const r = await fetch(`${API_BASE}/probes`);
+  if (!r.ok) throw new Error("Error GET /probes");
+  return r.json();
+}
+
+export async function getGroups(kind = null) {
+  const q = kind ? `?kind=${encodeURIComponent(kind)}` : "";
+  const r = await fetch(`${API_BASE}/groups${q}`);
+  if (!r.ok) throw new Error("Error GET /groups");
+  return r.json();
+}
@@ -2,10 +2,19 @@ from dotenv import load_dotenv
 load_dotenv()  # carga .env automáticamente
 
 import sys
-import threading
 
-from core.logic import add_API_database
-from core.runner import empezar_monitoreo
+# Cada subcomando importa solo lo que usa: `add` no necesita el runner
+# (requests, numpy, notifier) ni `serve` el detector de anomalías. Ver
+# benchmarks/bench_startup.py.
+
+COMMANDS = {}
+
+
+def command(name):
+    def deco(fn):
+        COMMANDS[name] = fn
+        return fn
+    return deco
 
 
 def help_msg():
@@ -14,24 +23,48 @@ def help_msg():
         "  python main.py run\n"
         "  python main.py serve\n"
         "  python main.py both\n"
-        "  python main.py add \"Nombre\" \"URL\"\n"
-        "  python main.py add   (modo interactivo)\n\n"
+        "  python main.py add \"Nombre\" \"URL\" [http|head|tcp|tls|dns]\n"
+        "  python main.py add   (modo interactivo)\n"
+        "  python main.py migrate-bodies\n"
+        "  python main.py archive [dias_a_conservar]\n\n"
         "Ejemplo:\n"
         "  python main.py add \"Cat Facts\" \"https://catfact.ninja/fact\"\n"
         "  python main.py both\n"
     )
 
 
-def add_interactive():
-    print("📝 Agregar API (modo interactivo)")
-    name = input("Nombre de la API: ").strip()
-    url = input("URL de la API (http/https): ").strip()
+def _not_shared(store) -> bool:
+    if store.shared:
+        return False
+    print(
+        f"❌ STORAGE_BACKEND={store.name} es solo para `run`: vive en el proceso del runner "
+        "y la API/dashboard (que leen SQLite) no verían sus cambios."
+    )
+    return True
+
 
+def add_api(name, url, probe=None) -> bool:
+    from core.storage import get_storage
+
+    store = get_storage()
+    if _not_shared(store):
+        return False
     try:
-        add_API_database(name, url)
+        store.add_api(name, url, probe)
         print("✅ API agregada/ya existente.")
+        return True
     except ValueError as e:
         print(f"❌ {e}")
+        return False
+    finally:
+        store.close()
+
+
+def add_interactive():
+    print("📝 Agregar API (modo interactivo)")
+    name = input("Nombre de la API: ").strip()
+    url = input("URL de la API (http/https): ").strip()
+    add_api(name, url)
 
 
 def serve_api():
@@ -39,45 +72,103 @@ def serve_api():
     uvicorn.run("core.api_server:app", host="0.0.0.0", port=8001, reload=False)
 
 
-if __name__ == "__main__":
-    if len(sys.argv) == 1:
-        empezar_monitoreo()
-        raise SystemExit(0)
+@command("run")
+def cmd_run(args) -> int:
+    from core import lifecycle
+    from core.runner import empezar_monitoreo
+    from core.storage import SQLiteStorage, get_storage, seed_from
 
-    cmd = sys.argv[1].lower()
+    store = get_storage()
+    if not store.shared and not store.get_all_apis():
+        # Backend local vacío (sin foto previa): arranca con lo que hay en SQLite
+        n = seed_from(store, SQLiteStorage())
+        print(f"🧠 STORAGE_BACKEND={store.name}: {n} APIs copiadas de SQLite. La API, el dashboard y el bot no ven este backend.")
 
-    if cmd == "run":
-        empezar_monitoreo()
-        raise SystemExit(0)
+    lifecycle.install_signal_handlers()
+    empezar_monitoreo()
+    return 0
 
-    if cmd == "serve":
-        serve_api()
-        raise SystemExit(0)
 
-    if cmd == "both":
-        t = threading.Thread(target=empezar_monitoreo, daemon=True)
-        t.start()
+@command("serve")
+def cmd_serve(args) -> int:
+    serve_api()
+    return 0
+
+
+@command("both")
+def cmd_both(args) -> int:
+    import threading
+
+    from core import lifecycle
+    from core.runner import empezar_monitoreo
+    from core.storage import get_storage
+
+    if _not_shared(get_storage()):
+        return 1
+
+    # uvicorn atrapa SIGINT/SIGTERM mientras sirve y al terminar los
+    # re-emite: llegan a estos handlers. El runner ya no es un hilo que se
+    # mata a mitad de escritura: se le pide parar y se lo espera.
+    lifecycle.install_signal_handlers()
+    t = threading.Thread(target=empezar_monitoreo, name="runner", daemon=True)
+    t.start()
+    try:
         serve_api()
-        raise SystemExit(0)
+    finally:
+        lifecycle.request_shutdown("servidor detenido")
+        t.join(lifecycle.time_left())
+        if t.is_alive():
+            print("⚠️ El runner no terminó dentro del plazo de apagado.")
+    return 0
+
+
+@command("add")
+def cmd_add(args) -> int:
+    # Interactivo
+    if len(args) < 2:
+        add_interactive()
+        return 0
+
+    # No interactivo
+    name = args[0].strip()
+    url = args[1].strip()
+    probe = args[2] if len(args) > 2 else None
+    return 0 if add_api(name, url, probe) else 1
 
-    if cmd == "add":
-        # Interactivo
-        if len(sys.argv) < 4:
-            add_interactive()
-            raise SystemExit(0)
 
-        # No interactivo
-        name = sys.argv[2].strip()
-        url = sys.argv[3].strip()
+@command("migrate-bodies")
+def cmd_migrate_bodies(args) -> int:
+    from core.logic import migrate_log_bodies
 
-        try:
-            add_API_database(name, url)
-            print("✅ API agregada/ya existente.")
-        except ValueError as e:
-            print(f"❌ {e}")
-            raise SystemExit(1)
+    n = migrate_log_bodies()
+    print(f"✅ {n} logs migrados al store de respuestas deduplicadas.")
+    return 0
 
-        raise SystemExit(0)
 
-    help_msg()
-    raise SystemExit(1)
+@command("archive")
+def cmd_archive(args) -> int:
+    from core.logic import archive_logs
+
+    keep = int(args[0]) if args else None
+    try:
+        res = archive_logs() if keep is None else archive_logs(keep)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"✅ Archivados {res['rows']} logs ({res['days']} días).")
+    return 0
+
+
+def main(argv) -> int:
+    if not argv:
+        return cmd_run([])
+
+    fn = COMMANDS.get(argv[0].lower())
+    if fn is None:
+        help_msg()
+        return 1
+    return fn(argv[1:])
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -1,12 +1,17 @@
 import os
 import sqlite3
 import asyncio
+import functools
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 
 from telegram import Update
+from telegram.error import RetryAfter
 from telegram.ext import Application, CommandHandler, ContextTypes
 
+from core.storage import SQLiteStorage
+
 load_dotenv()
 
 TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
@@ -15,44 +20,291 @@ TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "")
 DEFAULT_DB_PATH = Path(__file__).parent / "DataBase" / "dataBase.db"
 DB_PATH = Path(os.getenv("DB_PATH", str(DEFAULT_DB_PATH)))
 
+MAX_MESSAGE_CHARS = 4096                                        # límite de Telegram por mensaje
+COMMAND_RATE = float(os.getenv("BOT_COMMAND_RATE", "0.5"))      # comandos/seg sostenidos por chat
+COMMAND_BURST = int(os.getenv("BOT_COMMAND_BURST", "5"))        # ráfaga permitida por chat
+BROADCAST_RATE = float(os.getenv("BOT_BROADCAST_RATE", "25"))   # mensajes/seg globales (Telegram corta cerca de 30)
+BROADCAST_CONCURRENCY = int(os.getenv("BOT_BROADCAST_CONCURRENCY", "16"))
+SEND_RETRIES = 3                                                # reintentos ante 429 (RetryAfter)
+
 _last_status_by_api_id: dict[int, str] = {}
 _bootstrap_sent = False
 
 
-def _db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Todas las lecturas y escrituras pasan por la interfaz de storage. Siempre
+# SQLite: es lo que escribe el runner (STORAGE_BACKEND=memory vive en el
+# proceso del runner y el bot no lo ve). Solo las versiones para el cache
+# de respuestas se leen aparte, de una conexión fija (ver _version_db).
+_store = SQLiteStorage()
+
+
+# -----------------------------------------------------------------------------
+# Cache de respuestas + rate limit por chat
+# -----------------------------------------------------------------------------
+# Las respuestas se cachean por (comando, follow set, versión). Cada comando
+# usa la versión más gruesa que cubre lo que muestra:
+#   /apis           -> versión del catálogo (altas/bajas/ediciones)
+#   /groups, /my    -> catálogo + generación de estado (cambios de status o
+#                      de tags, ver state_generation en schema.sql)
+#   /status, /sla   -> PRAGMA data_version: muestran latencia, último check y
+#                      ventanas de SLA, que cambian con cada flush del runner.
+
+_version_conn: sqlite3.Connection | None = None
+
+
+def _version_db() -> sqlite3.Connection:
+    global _version_conn
+    if _version_conn is None:
+        _version_conn = sqlite3.connect(DB_PATH)
+    return _version_conn
+
+
+def get_state_version() -> int:
+    """
+    PRAGMA data_version de una conexión fija: cambia cada vez que OTRA
+    conexión (runner, API, o el _store del bot) commitea algo.
+    """
+    return _version_db().execute("PRAGMA data_version").fetchone()[0]
+
+
+def get_catalog_version() -> int:
+    return _version_db().execute("SELECT COALESCE(MAX(version), 0) FROM catalog_changes;").fetchone()[0]
+
+
+def get_groups_version() -> tuple[int, int]:
+    """
+    (versión del catálogo, generación de estado): no se mueve con los checks
+    que no cambian ningún status.
+    """
+    return _version_db().execute(
+        "SELECT (SELECT COALESCE(MAX(version), 0) FROM catalog_changes), (SELECT gen FROM state_generation);"
+    ).fetchone()
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 2048):
+        self.max_entries = max_entries
+        self._versions: dict[str, object] = {}
+        self._data: dict[tuple, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, command: str, follow: frozenset | None, version, render) -> str:
+        if version != self._versions.get(command):
+            # cambió lo que muestra este comando: lo suyo cacheado quedó viejo
+            self._data = {k: v for k, v in self._data.items() if k[0] != command}
+            self._versions[command] = version
+
+        key = (command, follow, version)
+        text = self._data.get(key)
+        if text is not None:
+            self.hits += 1
+            return text
+
+        self.misses += 1
+        text = render()
+        if len(self._data) >= self.max_entries:
+            self._data.clear()
+        self._data[key] = text
+        return text
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._versions.clear()
+
+
+class ChatRateLimiter:
+    """
+    Token bucket por chat: `burst` comandos de una, después `rate` por segundo.
+    Cada SWEEP_SECONDS se olvidan los chats con el bucket lleno otra vez
+    (recrearlo da lo mismo), así el dict no crece con cada chat que pasó.
+    """
+
+    SWEEP_SECONDS = 60.0
+
+    def __init__(self, rate: float = COMMAND_RATE, burst: int = COMMAND_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: dict[int, tuple[float, float]] = {}
+        self._warned: set[int] = set()
+        self._next_sweep: float | None = None
+
+    def _sweep(self, now: float) -> None:
+        full = [
+            chat_id for chat_id, (tokens, last) in self._buckets.items()
+            if tokens + (now - last) * self.rate >= self.burst
+        ]
+        for chat_id in full:
+            del self._buckets[chat_id]
+            self._warned.discard(chat_id)
+        self._next_sweep = now + self.SWEEP_SECONDS
+
+    def allow(self, chat_id: int, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        if self._next_sweep is None or now >= self._next_sweep:
+            self._sweep(now)
+        tokens, last = self._buckets.get(chat_id, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+        if tokens < 1.0:
+            self._buckets[chat_id] = (tokens, now)
+            return False
+        self._buckets[chat_id] = (tokens - 1.0, now)
+        self._warned.discard(chat_id)
+        return True
+
+    def should_warn(self, chat_id: int) -> bool:
+        """
+        Avisar una sola vez por racha de comandos frenados.
+        """
+        if chat_id in self._warned:
+            return False
+        self._warned.add(chat_id)
+        return True
+
+
+_responses = ResponseCache()
+_limiter = ChatRateLimiter()
+_known_subscribers: set[int] = set()
+# (APIs, grupos) que sigue cada chat, por versión de la DB: los escribe el
+# bot, pero borrar una API o un grupo (trigger trg_apis_follow_del y los FK)
+# también los cambia. Ambos vacíos = todas.
+_follows: dict[int, tuple[frozenset[int], frozenset[str]]] = {}
+_follows_version = None
+_members: dict[frozenset[str], frozenset[int]] = {}  # grupos -> APIs, por get_groups_version()
+_members_version = None
+
+
+def rate_limited(handler):
+    @functools.wraps(handler)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        chat_id = update.effective_chat.id
+        if not _limiter.allow(chat_id):
+            if _limiter.should_warn(chat_id):
+                await update.message.reply_text("⏳ Demasiados comandos seguidos, esperá unos segundos.")
+            return
+        await handler(update, context)
+    return wrapper
+
+
+def chunk_message(text: str, limit: int = MAX_MESSAGE_CHARS) -> list[str]:
+    """
+    Parte un texto largo en mensajes <= limit, cortando por líneas (así no se
+    rompe el Markdown de cada línea). Una línea más larga que el límite se corta.
+    """
+    if len(text) <= limit:
+        return [text]
+
+    chunks: list[str] = []
+    buf: list[str] = []
+    size = 0
+    for line in text.split("\n"):
+        while len(line) > limit:
+            if buf:
+                chunks.append("\n".join(buf))
+                buf, size = [], 0
+            chunks.append(line[:limit])
+            line = line[limit:]
+        extra = len(line) + (1 if buf else 0)
+        if size + extra > limit:
+            chunks.append("\n".join(buf))
+            buf, size = [], 0
+            extra = len(line)
+        buf.append(line)
+        size += extra
+    if buf:
+        chunks.append("\n".join(buf))
+    return chunks
+
+
+async def send_text(bot, chat_id: int, text: str, parse_mode: str | None = "Markdown") -> None:
+    for chunk in chunk_message(text):
+        await bot.send_message(chat_id=chat_id, text=chunk, parse_mode=parse_mode)
+
+
+# -----------------------------------------------------------------------------
+# Envíos masivos (snapshot inicial, avisos de cambios)
+# -----------------------------------------------------------------------------
+
+class AsyncRateLimiter:
+    """
+    Limitador global: espacia los envíos a `rate` por segundo entre todas las
+    corutinas. Un 429 frena a todas (Telegram limita por bot, no por chat).
+    """
+
+    def __init__(self, rate: float = BROADCAST_RATE):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+
+    async def acquire(self) -> None:
+        # Sin awaits entre leer y reservar el turno: atómico dentro del loop.
+        now = time.monotonic()
+        start = max(now, self._next)
+        self._next = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    def pause(self, seconds: float) -> None:
+        self._next = max(self._next, time.monotonic() + seconds)
+
+
+def _retry_seconds(e: RetryAfter) -> float:
+    ra = e.retry_after
+    return ra.total_seconds() if hasattr(ra, "total_seconds") else float(ra)
+
+
+async def send_with_retry(bot, chat_id: int, text: str, limiter: AsyncRateLimiter) -> None:
+    for chunk in chunk_message(text):
+        for attempt in range(SEND_RETRIES + 1):
+            await limiter.acquire()
+            try:
+                await bot.send_message(chat_id=chat_id, text=chunk, parse_mode="Markdown")
+                break
+            except RetryAfter as e:
+                limiter.pause(_retry_seconds(e))
+                if attempt == SEND_RETRIES:
+                    raise
+
+
+async def broadcast(bot, messages: dict[int, str], limiter: AsyncRateLimiter | None = None) -> tuple[int, int]:
+    """
+    Manda {chat_id: texto} en paralelo (BROADCAST_CONCURRENCY a la vez) bajo
+    el limitador global. Devuelve (enviados, fallidos).
+    """
+    limiter = limiter or _broadcast_limiter
+    sem = asyncio.Semaphore(BROADCAST_CONCURRENCY)
+
+    async def one(chat_id: int, text: str) -> bool:
+        async with sem:
+            try:
+                await send_with_retry(bot, chat_id, text, limiter)
+                return True
+            except Exception:
+                return False
+
+    results = await asyncio.gather(*(one(c, t) for c, t in messages.items()))
+    sent = sum(results)
+    return sent, len(results) - sent
+
+
+_broadcast_limiter = AsyncRateLimiter()
 
 
 def ensure_tables():
-    with _db() as conn:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS subscriber_apis (
-              chat_id TEXT NOT NULL,
-              api_id INTEGER NOT NULL,
-              PRIMARY KEY (chat_id, api_id)
-            )
-            """
-        )
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_subapis_api ON subscriber_apis(api_id)")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_subapis_chat ON subscriber_apis(chat_id)")
+    # subscriber_apis / subscriber_groups están en schema.sql: abrir la DB
+    # por core/logic.py aplica schema y migraciones.
+    _store.get_catalog_version()
 
 
 def ensure_subscriber(chat_id: int):
-    with _db() as conn:
-        conn.execute(
-            "INSERT OR IGNORE INTO subscribers(chat_id) VALUES (?)",
-            (str(chat_id),),
-        )
+    if chat_id in _known_subscribers:
+        return
+    _store.add_subscriber(chat_id)
+    _known_subscribers.add(chat_id)
 
 
 def get_all_subscribers() -> list[int]:
-    with _db() as conn:
-        rows = conn.execute("SELECT chat_id FROM subscribers").fetchall()
     out = []
-    for r in rows:
+    for r in _store.get_subscribers():
         try:
             out.append(int(r["chat_id"]))
         except Exception:
@@ -61,95 +313,137 @@ def get_all_subscribers() -> list[int]:
 
 
 def get_current_states():
-    q = """
-    SELECT
-      a.id as api_id,
-      a.name as name,
-      a.url as url,
-      COALESCE(s.last_status, 'UNKNOWN') as last_status,
-      s.last_status_code as last_status_code,
-      s.last_latency as last_latency,
-      s.last_checked_at as last_checked_at
-    FROM APIs a
-    LEFT JOIN api_state s ON s.api_id = a.id
-    ORDER BY a.id ASC
-    """
-    with _db() as conn:
-        return conn.execute(q).fetchall()
+    return _store.get_current_states()
 
 
 def get_api_by_id(api_id: int):
-    with _db() as conn:
-        return conn.execute(
-            """
-            SELECT a.id as api_id, a.name as name, a.url as url,
-                   COALESCE(s.last_status, 'UNKNOWN') as last_status
-            FROM APIs a
-            LEFT JOIN api_state s ON s.api_id = a.id
-            WHERE a.id = ?
-            """,
-            (api_id,),
-        ).fetchone()
+    return _store.get_apis_by_ids([api_id]).get(api_id)
+
+
+def get_recent_incidents(api_ids: set[int] | None = None, limit: int = 10):
+    return _store.get_incidents(None if api_ids is None else sorted(api_ids), limit)
+
+
+def get_apis_by_ids(api_ids) -> dict[int, dict]:
+    return _store.get_apis_by_ids(api_ids)
 
 
 def list_apis_brief():
-    with _db() as conn:
-        return conn.execute("SELECT id, name, url FROM APIs ORDER BY id ASC").fetchall()
+    return _store.get_all_apis()
+
+
+def get_groups(kind: str | None = None):
+    return _store.get_groups(kind)
+
+
+def get_sla(api_ids) -> dict:
+    """
+    {api_id: ventanas} (ver core/sla.py); None = todas.
+    """
+    rows = _store.get_sla(None if api_ids is None else sorted(api_ids))
+    return {r["api_id"]: r["windows"] for r in rows}
 
 
 def set_follow_all(chat_id: int):
-    with _db() as conn:
-        conn.execute("DELETE FROM subscriber_apis WHERE chat_id = ?", (str(chat_id),))
+    _store.clear_follows(chat_id)
+    _follows[chat_id] = (frozenset(), frozenset())
+
+
+def follow_group(chat_id: int, group_key: str):
+    _store.follow_group(chat_id, group_key)
+    _follows.pop(chat_id, None)
+
+
+def unfollow_group(chat_id: int, group_key: str):
+    _store.unfollow_group(chat_id, group_key)
+    _follows.pop(chat_id, None)
+
+
+def get_followed_groups(chat_id: int) -> set[str]:
+    return _store.get_followed_groups(chat_id)
+
+
+def get_group_member_ids(keys) -> frozenset[int]:
+    """
+    APIs de los grupos (y sus subgrupos).
+    """
+    return frozenset(_store.get_group_member_ids(keys))
 
 
 def follow_api(chat_id: int, api_id: int):
-    with _db() as conn:
-        conn.execute(
-            "INSERT OR IGNORE INTO subscriber_apis(chat_id, api_id) VALUES (?, ?)",
-            (str(chat_id), api_id),
-        )
+    _store.follow_api(chat_id, api_id)
+    _follows.pop(chat_id, None)
 
 
 def unfollow_api(chat_id: int, api_id: int):
-    with _db() as conn:
-        conn.execute(
-            "DELETE FROM subscriber_apis WHERE chat_id = ? AND api_id = ?",
-            (str(chat_id), api_id),
-        )
+    _store.unfollow_api(chat_id, api_id)
+    _follows.pop(chat_id, None)
 
 
 def get_followed_api_ids(chat_id: int) -> set[int]:
-    with _db() as conn:
-        rows = conn.execute(
-            "SELECT api_id FROM subscriber_apis WHERE chat_id = ?",
-            (str(chat_id),),
-        ).fetchall()
-    return {int(r["api_id"]) for r in rows}
+    return _store.get_followed_api_ids(chat_id)
+
+
+def get_all_follow_specs() -> dict[int, tuple[frozenset[int], frozenset[str]]]:
+    """
+    (APIs, grupos) seguidos por todos los suscriptores, en una pasada.
+    """
+    return {
+        chat_id: (frozenset(apis), frozenset(groups))
+        for chat_id, (apis, groups) in _store.get_follow_specs().items()
+    }
+
+
+def resolve_follows(spec: tuple[frozenset[int], frozenset[str]]) -> frozenset[int] | None:
+    """
+    APIs efectivas de un follow spec; None = todas. Los miembros de cada
+    combinación de grupos se cachean hasta que cambian los tags.
+    """
+    global _members_version
+    apis, groups = spec
+    if not apis and not groups:
+        return None
+    if not groups:
+        return apis
+
+    version = get_groups_version()
+    if version != _members_version:
+        _members.clear()
+        _members_version = version
+    members = _members.get(groups)
+    if members is None:
+        members = _members[groups] = get_group_member_ids(groups)
+    return apis | members
+
+
+def _sync_follows() -> None:
+    global _follows_version
+    version = get_state_version()
+    if version != _follows_version:
+        _follows.clear()
+        _follows_version = version
+
+
+def get_follow_spec(chat_id: int) -> tuple[frozenset[int], frozenset[str]]:
+    _sync_follows()
+    spec = _follows.get(chat_id)
+    if spec is None:
+        spec = _follows[chat_id] = (
+            frozenset(get_followed_api_ids(chat_id)),
+            frozenset(get_followed_groups(chat_id)),
+        )
+    return spec
+
+
+def get_follows(chat_id: int) -> frozenset[int] | None:
+    """
+    APIs que sigue el chat (directas + de sus grupos); None = todas.
+    """
+    return resolve_follows(get_follow_spec(chat_id))
 
 
 def get_chat_ids_following_api(api_id: int) -> list[int]:
-    with _db() as conn:
-        specific = conn.execute(
-            "SELECT DISTINCT chat_id FROM subscriber_apis WHERE api_id = ?",
-            (api_id,),
-        ).fetchall()
-
-        no_filters = conn.execute(
-            """
-            SELECT s.chat_id
-            FROM subscribers s
-            LEFT JOIN subscriber_apis sa ON sa.chat_id = s.chat_id
-            WHERE sa.chat_id IS NULL
-            """
-        ).fetchall()
-
-    ids = set()
-    for r in specific + no_filters:
-        try:
-            ids.add(int(r["chat_id"]))
-        except Exception:
-            pass
-    return list(ids)
+    return _store.get_chat_ids_following_api(api_id)
 
 
 def _emoji(status: str) -> str:
@@ -186,14 +480,146 @@ def format_snapshot(rows, only_api_ids: set[int] | None = None) -> str:
     return "\n".join(lines) if shown else "📭 No hay APIs para mostrar (según tus filtros)."
 
 
+def _fmt_pct(v) -> str:
+    return "—" if v is None else f"{v:.2f}%"
+
+
+def _fmt_secs(v) -> str:
+    if v is None:
+        return "—"
+    if v < 120:
+        return f"{v:.0f}s"
+    if v < 7200:
+        return f"{v / 60:.0f}m"
+    if v < 172800:
+        return f"{v / 3600:.1f}h"
+    return f"{v / 86400:.1f}d"
+
+
+def format_sla(rows, sla: dict, only_api_ids: set[int] | None = None) -> str:
+    lines = ["📈 *Disponibilidad (24h | 7d | 30d | 90d)*"]
+    for r in rows:
+        api_id = int(r["api_id"])
+        if only_api_ids is not None and api_id not in only_api_ids:
+            continue
+        w = sla.get(api_id)
+        if not w:
+            continue
+        pcts = " | ".join(_fmt_pct(w[k]["availability"]) for k in ("24h", "7d", "30d", "90d"))
+        lines.append(f"*[{api_id}]* *{r['name']}* — {pcts}")
+    return "\n".join(lines) if len(lines) > 1 else "📭 No hay APIs para mostrar (según tus filtros)."
+
+
+def format_sla_detail(api, windows: dict) -> str:
+    lines = [f"📈 *SLA de [{api['api_id']}] {api['name']}*"]
+    for label, m in windows.items():
+        lines.append(
+            f"*{label}*: {_fmt_pct(m['availability'])} · caídas={m['incidents']} · "
+            f"down={_fmt_secs(m['downtime_seconds'])} · MTTR={_fmt_secs(m['mttr_seconds'])} · "
+            f"MTBF={_fmt_secs(m['mtbf_seconds'])}"
+        )
+    return "\n".join(lines)
+
+
+def format_incidents(rows) -> str:
+    if not rows:
+        return "🎉 Sin incidentes registrados."
+
+    lines = ["🧯 *Últimos incidentes*"]
+    for r in rows:
+        if r["closed_at"]:
+            state = f"duró {_fmt_secs(r['duration_seconds'])}"
+        else:
+            state = "*ABIERTO*"
+        code = r["last_status_code"] if r["last_status_code"] is not None else "—"
+        lines.append(
+            f"🚨 *[{r['api_id']}]* *{r['name']}* — {r['opened_at']} · {state} · "
+            f"checks={r['check_count']} · code={code}"
+        )
+    return "\n".join(lines)
+
+
+def format_apis(rows) -> str:
+    if not rows:
+        return "📭 No hay APIs cargadas."
+    lines = ["📋 *APIs disponibles:*"]
+    for api_id, name, url in rows:
+        lines.append(f"*{api_id}* — *{name}* — `{url}`")
+    return "\n".join(lines)
+
+
+def _group_emoji(status: str) -> str:
+    return {"UP": "✅", "DOWN": "🚨", "MIXED": "⚠️", "PARTIAL": "🟡"}.get(status, "❔")
+
+
+def format_groups(groups) -> str:
+    if not groups:
+        return "🏷️ No hay grupos. Se arman con tags (p.ej. team:pagos) desde el dashboard/API."
+    lines = ["🏷️ *Grupos:*"]
+    for g in groups:
+        indent = "    " * g["key"].count("/")
+        lines.append(
+            f"{indent}{_group_emoji(g['status'])} `{g['key']}` — {g['up']}/{g['total']} UP"
+            + (f", {g['down']} DOWN" if g["down"] else "")
+        )
+    return "\n".join(lines)
+
+
+def format_my(api_ids, apis: dict, groups) -> str:
+    lines = []
+    if api_ids:
+        lines.append("🎯 *Tus APIs:*")
+        for api_id in sorted(api_ids):
+            api = apis.get(api_id)
+            if api:
+                lines.append(f"*[{api_id}]* *{api['name']}* — `{api['url']}`")
+            else:
+                lines.append(f"*[{api_id}]* (ya no existe)")
+    if groups:
+        lines.append("🏷️ *Tus grupos:*")
+        lines.extend(f"`{g['key']}` — {g['up']}/{g['total']} UP ({g['status']})" for g in groups)
+    return "\n".join(lines)
+
+
+def render_snapshot(follows: frozenset[int] | None) -> str:
+    return _responses.get_or_render(
+        "status", follows, get_state_version(),
+        lambda: format_snapshot(get_current_states(), only_api_ids=follows),
+    )
+
+
 async def send_snapshot_to(chat_id: int, app: Application):
-    rows = get_current_states()
-    followed = get_followed_api_ids(chat_id)
-    only = None if not followed else followed
-    msg = format_snapshot(rows, only_api_ids=only)
-    await app.bot.send_message(chat_id=chat_id, text=msg, parse_mode="Markdown")
+    await send_text(app.bot, chat_id, render_snapshot(get_follows(chat_id)))
+
+
+async def broadcast_snapshots(app: Application, rows) -> None:
+    """
+    Snapshot inicial a todos los suscriptores: follow sets en una pasada, un
+    render por follow set distinto y envíos en paralelo bajo el rate limit.
+    """
+    t0 = time.perf_counter()
+    specs = get_all_follow_specs()
+    _sync_follows()
+    _follows.update(specs)
+    _known_subscribers.update(specs)
+
+    rendered: dict[frozenset[int] | None, str] = {}
+    messages: dict[int, str] = {}
+    for chat_id, spec in specs.items():
+        follows = resolve_follows(spec)
+        text = rendered.get(follows)
+        if text is None:
+            text = rendered[follows] = format_snapshot(rows, only_api_ids=follows)
+        messages[chat_id] = text
+
+    sent, failed = await broadcast(app.bot, messages)
+    print(
+        f"📣 Snapshot inicial: {sent} chats ({len(rendered)} mensajes distintos), "
+        f"{failed} fallidos, {time.perf_counter() - t0:.1f}s"
+    )
 
 
+@rate_limited
 async def start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     ensure_subscriber(chat_id)
@@ -207,9 +633,12 @@ async def start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "🛠️ *Comandos:*\n"
         "/status  → ver estado actual\n"
         "/apis    → listar APIs\n"
-        "/follow X   → seguir API X\n"
-        "/unfollow X → dejar de seguir API X\n"
+        "/follow X   → seguir API X (o un grupo: /follow team:pagos)\n"
+        "/unfollow X → dejar de seguir API X (o un grupo)\n"
+        "/groups  → grupos y su estado\n"
         "/my      → ver tus APIs\n"
+        "/sla [X] → disponibilidad 24h/7d/30d/90d\n"
+        "/incidents [X] → últimas caídas\n"
         "/all     → volver a todas\n\n"
         "🔔 *No necesitás escribir nada más:* el bot avisa solo."
     )
@@ -218,29 +647,34 @@ async def start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await send_snapshot_to(chat_id, context.application)
 
 
+@rate_limited
 async def status_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ensure_subscriber(update.effective_chat.id)
     await send_snapshot_to(update.effective_chat.id, context.application)
 
 
+@rate_limited
 async def apis_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    rows = list_apis_brief()
-    if not rows:
-        await update.message.reply_text("📭 No hay APIs cargadas.")
-        return
-
-    lines = ["📋 *APIs disponibles:*"]
-    for r in rows:
-        lines.append(f"*{r['id']}* — *{r['name']}* — `{r['url']}`")
-    await update.message.reply_text("\n".join(lines), parse_mode="Markdown")
+    msg = _responses.get_or_render("apis", None, get_catalog_version(), lambda: format_apis(list_apis_brief()))
+    await send_text(context.bot, update.effective_chat.id, msg)
 
 
+@rate_limited
 async def follow_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     ensure_subscriber(chat_id)
 
     if not context.args:
-        await update.message.reply_text("Uso: /follow <api_id>")
+        await update.message.reply_text("Uso: /follow <api_id> | /follow <grupo>")
+        return
+
+    if ":" in context.args[0]:
+        key = context.args[0].strip().lower()
+        if not any(g["key"] == key for g in get_groups(key.split(":", 1)[0])):
+            await update.message.reply_text("Grupo inexistente. Usá /groups.")
+            return
+        follow_group(chat_id, key)
+        await update.message.reply_text(f"✅ Ahora seguís el grupo `{key}`", parse_mode="Markdown")
         return
 
     try:
@@ -258,12 +692,22 @@ async def follow_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(f"✅ Ahora seguís *{api['name']}*", parse_mode="Markdown")
 
 
+@rate_limited
 async def unfollow_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     ensure_subscriber(chat_id)
 
     if not context.args:
-        await update.message.reply_text("Uso: /unfollow <api_id>")
+        await update.message.reply_text("Uso: /unfollow <api_id> | /unfollow <grupo>")
+        return
+
+    if get_follows(chat_id) is None:
+        await update.message.reply_text("Estás en modo *todas*. Para filtrar, usá /follow X.", parse_mode="Markdown")
+        return
+
+    if ":" in context.args[0]:
+        unfollow_group(chat_id, context.args[0].strip().lower())
+        await update.message.reply_text("🧹 Listo.")
         return
 
     try:
@@ -272,37 +716,88 @@ async def unfollow_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("El api_id tiene que ser un número. Usá /apis.")
         return
 
-    followed = get_followed_api_ids(chat_id)
-    if not followed:
-        await update.message.reply_text("Estás en modo *todas*. Para filtrar, usá /follow X.", parse_mode="Markdown")
-        return
-
     unfollow_api(chat_id, api_id)
     await update.message.reply_text("🧹 Listo.")
 
 
+@rate_limited
 async def all_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     set_follow_all(update.effective_chat.id)
     await update.message.reply_text("🌐 Volviste a seguir todas las APIs.")
 
 
+@rate_limited
 async def my_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     ensure_subscriber(chat_id)
 
-    followed = get_followed_api_ids(chat_id)
-    if not followed:
+    api_ids, group_keys = get_follow_spec(chat_id)
+    if not api_ids and not group_keys:
         await update.message.reply_text("🌐 Seguís todas las APIs.")
         return
 
-    lines = ["🎯 *Tus APIs:*"]
-    for api_id in sorted(followed):
+    def render():
+        # Una sola consulta para todas las APIs seguidas (antes, una por API).
+        groups = [g for g in get_groups() if g["key"] in group_keys] if group_keys else []
+        return format_my(api_ids, get_apis_by_ids(api_ids), groups)
+
+    msg = _responses.get_or_render("my", (api_ids, group_keys), get_groups_version(), render)
+    await send_text(context.bot, chat_id, msg)
+
+
+@rate_limited
+async def groups_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    kind = context.args[0].strip().lower() if context.args else None
+    msg = _responses.get_or_render("groups", kind, get_groups_version(), lambda: format_groups(get_groups(kind)))
+    await send_text(context.bot, update.effective_chat.id, msg)
+
+
+@rate_limited
+async def sla_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    ensure_subscriber(chat_id)
+
+    if context.args:
+        try:
+            api_id = int(context.args[0])
+        except ValueError:
+            await update.message.reply_text("El api_id tiene que ser un número. Usá /apis.")
+            return
+
         api = get_api_by_id(api_id)
-        if api:
-            lines.append(f"*[{api_id}]* *{api['name']}* — `{api['url']}`")
-        else:
-            lines.append(f"*[{api_id}]* (ya no existe)")
-    await update.message.reply_text("\n".join(lines), parse_mode="Markdown")
+        if not api:
+            await update.message.reply_text("API inexistente. Usá /apis.")
+            return
+
+        sla = get_sla([api_id])
+        await update.message.reply_text(format_sla_detail(api, sla[api_id]), parse_mode="Markdown")
+        return
+
+    followed = get_follows(chat_id)
+
+    def render():
+        return format_sla(get_current_states(), get_sla(followed), only_api_ids=followed)
+
+    msg = _responses.get_or_render("sla", followed, get_state_version(), render)
+    await send_text(context.bot, chat_id, msg)
+
+
+@rate_limited
+async def incidents_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    chat_id = update.effective_chat.id
+    ensure_subscriber(chat_id)
+
+    if context.args:
+        try:
+            only = {int(context.args[0])}
+        except ValueError:
+            await update.message.reply_text("El api_id tiene que ser un número. Usá /apis.")
+            return
+    else:
+        only = get_follows(chat_id)
+
+    msg = format_incidents(get_recent_incidents(only))
+    await send_text(context.bot, chat_id, msg)
 
 
 async def poll_and_notify(app: Application):
@@ -316,12 +811,7 @@ async def poll_and_notify(app: Application):
         for r in rows:
             _last_status_by_api_id[int(r["api_id"])] = r["last_status"]
 
-        for chat_id in get_all_subscribers():
-            try:
-                await send_snapshot_to(chat_id, app)
-            except Exception:
-                pass
-
+        await broadcast_snapshots(app, rows)
         _bootstrap_sent = True
         return
 
@@ -342,15 +832,11 @@ async def poll_and_notify(app: Application):
             for chat_id in get_chat_ids_following_api(api_id):
                 per_chat.setdefault(chat_id, []).append(line)
 
-    for chat_id, lines in per_chat.items():
-        try:
-            await app.bot.send_message(
-                chat_id=chat_id,
-                text="🔔 *Cambios detectados*\n" + "\n".join(lines),
-                parse_mode="Markdown",
-            )
-        except Exception:
-            pass
+    if per_chat:
+        await broadcast(
+            app.bot,
+            {chat_id: "🔔 *Cambios detectados*\n" + "\n".join(lines) for chat_id, lines in per_chat.items()},
+        )
 
 
 async def notifier_loop(app: Application, interval_seconds: int = 10):
@@ -390,6 +876,9 @@ def main():
     app.add_handler(CommandHandler("unfollow", unfollow_cmd))
     app.add_handler(CommandHandler("all", all_cmd))
     app.add_handler(CommandHandler("my", my_cmd))
+    app.add_handler(CommandHandler("groups", groups_cmd))
+    app.add_handler(CommandHandler("sla", sla_cmd))
+    app.add_handler(CommandHandler("incidents", incidents_cmd))
 
     app.run_polling(allowed_updates=Update.ALL_TYPES)
 